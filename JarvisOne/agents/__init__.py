@@ -1,5 +1,7 @@
 import asyncio
-from typing import Set, Any, List
+from typing import Set, Any, Dict, List, Tuple
+
+from ..services.executor_events import channel_for, executor_events
 
 try:
 	from fastapi import WebSocket
@@ -18,6 +20,8 @@ class BoardAgentManager:
 		self._clients = set()
 		self._lock = asyncio.Lock()
 		self._bg_task = None
+		# (websocket, strategy_id) -> task forwarding that strategy's executor events
+		self._channels: Dict[Tuple[Any, str], asyncio.Task] = {}
 
 	def user_joined(self, websocket: Any) -> None:
 		self._clients.add(websocket)
@@ -25,6 +29,38 @@ class BoardAgentManager:
 	def user_left(self, websocket: Any) -> None:
 		if websocket in self._clients:
 			self._clients.remove(websocket)
+		for ws, strategy_id in list(self._channels):
+			if ws is websocket:
+				self.unsubscribe_executor(websocket, strategy_id)
+
+	def subscribe_executor(self, websocket: Any, strategy_id: str) -> None:
+		"""Send the strategy's executor snapshot to this client, then its live events."""
+		if not strategy_id or (websocket, strategy_id) in self._channels:
+			return
+		snapshot, queue = executor_events.subscribe(strategy_id)
+		self._channels[(websocket, strategy_id)] = asyncio.create_task(
+			self._forward_executor(websocket, strategy_id, snapshot, queue)
+		)
+
+	def unsubscribe_executor(self, websocket: Any, strategy_id: str) -> None:
+		task = self._channels.pop((websocket, strategy_id), None)
+		if task:
+			task.cancel()
+
+	async def _forward_executor(self, websocket: Any, strategy_id: str, snapshot: Dict[str, Any], queue: asyncio.Queue) -> None:
+		try:
+			await websocket.send_json({"type": "executor_snapshot", "channel": channel_for(strategy_id), "state": snapshot})
+			while True:
+				await websocket.send_json(await queue.get())
+		except asyncio.CancelledError:
+			raise
+		except Exception:
+			# Client went away; the WS handler cleans up via user_left
+			pass
+		finally:
+			executor_events.unsubscribe(strategy_id, queue)
+			if self._channels.get((websocket, strategy_id)) is asyncio.current_task():
+				del self._channels[(websocket, strategy_id)]
 
 	async def notify_clients(self) -> None:
 		# Broadcast a simple tick that causes UIs to refetch
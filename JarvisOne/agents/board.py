@@ -6,16 +6,29 @@ import json
 import uuid
 from datetime import datetime
 import sqlite3
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 
 import httpx
 
 from groq import Groq
 
-from .prompts import AGENT_PROMPTS, TURN_ORDER
-from ..database.database import get_connection
+from .prompts import AGENT_PROMPTS, TURN_ORDER, turn_dependencies
+from .history import ConversationHistory
+from .plan import (
+    parse_plan, validate_plan, extract_plan_object, invalid_fragments, apply_fragments,
+    drop_invalid_missions, fragment_repair_messages, reformat_messages, render_plan,
+)
+from ..database.database import get_connection, ensure_migration
 from . import board_agent
-from ..config import GROQ_API_KEY, DEEPSEEK_API_KEY, PLANNER_PROVIDER, PLANNER_MODEL
+from ..config import GROQ_API_KEY, DEEPSEEK_API_KEY, GROQ_BASE_URL, DEEPSEEK_BASE_URL, PLANNER_PROVIDER, PLANNER_MODEL, BOARD_PARALLEL_TURNS, BOARD_HISTORY_TOKEN_BUDGET, PLAN_REPAIR_MAX_ROUNDS
+from ..services.llm_cache import llm_cache, make_cache_key
+from ..services.provider_router import provider_router
+from ..services.rate_limiter import call_with_rate_limit
+from ..services.telemetry import llm_call_context, record_llm_call
+from ..services.budgets import budget_tracker, BudgetExceeded
+from ..services.tokens import estimate_messages_tokens, estimate_tokens
 
 # Custom Leader AI system prompt (can be overridden via env LEADER_AI_PROMPT)
 LEADER_AI_SYSTEM_PROMPT = (
@@ -24,6 +37,11 @@ LEADER_AI_SYSTEM_PROMPT = (
 )
 
 
+# Prefix of the message logged when every provider failed for a turn; such turns
+# are not counted as completed and run again when a discussion is resumed
+AGENT_ERROR_PREFIX = "Error: Could not get a response from"
+BOARD_RUNS_MIGRATION = "003_board_runs.sql"
+
 
 class _PlannerLLM:
     def __init__(self):
@@ -40,21 +58,24 @@ class _PlannerLLM:
         }
 
     def _ensure(self, provider: str):
+        if provider == "mock":
+            return
         if provider == "groq":
             if not GROQ_API_KEY:
                 raise RuntimeError("GROQ_API_KEY is not set")
             if not self._groq:
+                # max_retries=0: 429s are retried by call_with_rate_limit, which honors Retry-After
                 try:
                     http_client = httpx.Client(trust_env=False)
-                    self._groq = Groq(api_key=GROQ_API_KEY, http_client=http_client)
+                    self._groq = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, http_client=http_client, max_retries=0)
                 except TypeError:
-                    self._groq = Groq(api_key=GROQ_API_KEY)
+                    self._groq = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, max_retries=0)
         elif provider == "deepseek":
             if not DEEPSEEK_API_KEY:
                 raise RuntimeError("DEEPSEEK_API_KEY is not set")
             if not self._deepseek:
                 from openai import OpenAI
-                self._deepseek = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com/v1")
+                self._deepseek = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0)
         else:
             raise RuntimeError(f"Unsupported provider: {provider}")
 
@@ -63,53 +84,132 @@ class _PlannerLLM:
         if PLANNER_PROVIDER in {"groq", "deepseek"}:
             provider = PLANNER_PROVIDER
         else:
-            # auto: prefer Groq (free-tier), then DeepSeek
-            provider = "groq" if GROQ_API_KEY else ("deepseek" if DEEPSEEK_API_KEY else "mock")
+            # auto: prefer Groq (free-tier), then DeepSeek; the router demotes
+            # a provider whose circuit is open or whose latency/error rate is worse
+            configured = [p for p, key in (("groq", GROQ_API_KEY), ("deepseek", DEEPSEEK_API_KEY)) if key]
+            if not configured:
+                provider = "mock"
+            else:
+                ranked = provider_router.rank([(p, self._model_for(p, default_model)) for p in configured])
+                provider = ranked[0][0]
 
+        return provider, self._model_for(provider, default_model)
+
+    def _model_for(self, provider: str, default_model: str) -> str:
         # Model: env override > agent default > provider default
         if PLANNER_MODEL:
-            model = PLANNER_MODEL
-        else:
-            if provider == "groq":
-                model = default_model or "llama-3.1-8b-instant"
-            elif provider == "deepseek":
-                model = default_model if default_model.lower().startswith("deepseek") else "deepseek-coder"
-            else:
-                model = default_model or "llama-3.1-8b-instant"
+            return PLANNER_MODEL
+        if provider == "groq":
+            return default_model or "llama-3.1-8b-instant"
+        if provider == "deepseek":
+            return default_model if default_model.lower().startswith("deepseek") else "deepseek-coder"
+        return default_model or "llama-3.1-8b-instant"
+
+    def candidates(self, default_model: str, agent_name: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Primary (provider, model) followed by fallbacks with configured keys."""
+        provider, model = self.pick_provider_and_model(default_model, agent_name)
+        out = [(provider, model)]
+        if provider == "groq" and DEEPSEEK_API_KEY:
+            out.append(("deepseek", model if model.lower().startswith("deepseek") else "deepseek-coder"))
+        elif provider == "deepseek" and GROQ_API_KEY:
+            out.append(("groq", "llama-3.1-8b-instant" if model.lower().startswith("deepseek") else model))
+        return out
+
+    def chat(
+        self,
+        provider: str,
+        model: str,
+        messages: list,
+        temperature: float = 0.2,
+        max_tokens: int = 4096,
+        agent_name: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> str:
+        # mock responses are canned already; never cache them
+        cacheable = provider != "mock" and llm_cache.applies(temperature, agent_name, opt_out=not use_cache)
+        cache_key = None
+        lookup_started = time.perf_counter()
+        if cacheable:
+            cache_key = make_cache_key(provider, model, messages, temperature, max_tokens)
+            hit = llm_cache.get(cache_key)
+            if hit is not None:
+                print(f"[LLMCache] hit for {agent_name or 'planner'} ({provider}:{model})")
+                record_llm_call(provider, model, latency_s=time.perf_counter() - lookup_started, cached=True, agent=agent_name)
+                return hit["response"]
+
+        started = time.perf_counter()
+        try:
+            text, usage, queue_wait_s = self._complete(provider, model, messages, temperature, max_tokens, agent_name)
+        except Exception as e:
+            record_llm_call(provider, model, latency_s=time.perf_counter() - started, error=e, agent=agent_name)
+            raise
+        latency_ms = (time.perf_counter() - started - queue_wait_s) * 1000.0
+        # mock calls report no usage; estimate so offline runs still produce token totals
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        record_llm_call(
+            provider,
+            model,
+            prompt_tokens=estimate_messages_tokens(messages) if prompt_tokens is None else prompt_tokens,
+            completion_tokens=estimate_tokens(text) if completion_tokens is None else completion_tokens,
+            queue_wait_s=queue_wait_s,
+            latency_s=latency_ms / 1000.0,
+            agent=agent_name,
+        )
+        if cache_key:
+            llm_cache.put(
+                cache_key,
+                provider,
+                model,
+                text,
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                latency_ms=latency_ms,
+            )
+        return text
 
-        return provider, model
+    def _complete(self, provider: str, model: str, messages: list, temperature: float, max_tokens: int, agent_name: Optional[str]):
+        """Call the provider under the shared rate limiter.
 
-    def chat(self, provider: str, model: str, messages: list, temperature: float = 0.2, max_tokens: int = 4096, agent_name: Optional[str] = None) -> str:
+        Returns (text, usage, queue_wait_s); usage is None for mock.
+        """
         self._ensure(provider)
-        if provider == "groq":
-            resp = self._groq.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            return resp.choices[0].message.content or ""
-        elif provider == "deepseek":
-            resp = self._deepseek.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            return resp.choices[0].message.content or ""
+        if provider in {"groq", "deepseek"}:
+            client = self._groq if provider == "groq" else self._deepseek
+
+            def _call():
+                raw = client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+                resp = raw.parse()
+                return resp.choices[0].message.content or "", getattr(resp, "usage", None), raw.headers
+
+            return call_with_rate_limit(provider, model, messages, max_tokens, _call)
         else:  # mock
             # pick a deterministic response based on agent_name if provided
             name = agent_name or "LeadAgent"
-            return self._mock_responses.get(name, "Mock response")
+            return self._mock_responses.get(name, "Mock response"), None, 0.0
 
 planner_llm = _PlannerLLM()
 
+class BoardRunActive(ValueError):
+    """Raised when a discussion for the strategy is already running in this process."""
+
+
 class Board:
     """
     The Board manages the agent discussion process, from initialization to completion.
     It orchestrates the conversation turn by turn, logs all messages, and saves
     the final strategy to the database.
     """
+    # strategy_ids whose discussion is running (or about to run) in this process,
+    # shared by the API event loop and the background board loop
+    _active: set = set()
+    _active_lock = threading.Lock()
+
     def __init__(self, topic: str, user_id: int):
         self.strategy_id = str(uuid.uuid4())
         self.topic = topic
@@ -117,10 +217,231 @@ class Board:
         self.turn_number = 0
         self.discussion_log = []
         self.current_agent_name = TURN_ORDER[0]
+        # Agent outputs as soon as each turn finishes (may run ahead of discussion_log),
+        # token-counted once and rendered per turn within the agent's budget
+        self.history = ConversationHistory()
+        self._dependencies = turn_dependencies() if BOARD_PARALLEL_TURNS else {
+            name: TURN_ORDER[:idx] for idx, name in enumerate(TURN_ORDER)
+        }
+        # Checkpoint state: which turns are logged and who served them
+        self.turn_providers: Dict[str, Dict[str, str]] = {}
+        self._completed_agents: set = set()
+        self._resumed = False
+        self._claimed = False
+        # Prompt-history totals of earlier processes (a resumed run rebuilds its history from scratch)
+        self._prompt_tokens_before = {"full_prompt_tokens": 0, "sent_prompt_tokens": 0}
+
+    @classmethod
+    def is_running(cls, strategy_id: str) -> bool:
+        with cls._active_lock:
+            return strategy_id in cls._active
+
+    @classmethod
+    def _claim(cls, strategy_id: str) -> None:
+        with cls._active_lock:
+            if strategy_id in cls._active:
+                raise BoardRunActive(f"Board discussion for strategy {strategy_id} is already running")
+            cls._active.add(strategy_id)
+
+    @classmethod
+    def _release(cls, strategy_id: str) -> None:
+        with cls._active_lock:
+            cls._active.discard(strategy_id)
+
+    @classmethod
+    def resume(cls, strategy_id: str) -> "Board":
+        """Rehydrate an unfinished discussion from board_runs and board_messages.
+
+        Turns whose message is already logged are kept; failed turns (logged
+        as an error message) and missing turns run again on run_discussion().
+        The strategy is claimed until that run ends, so a second resume raises
+        BoardRunActive instead of running the same turns twice.
+        """
+        ensure_migration(BOARD_RUNS_MIGRATION)
+        conn = get_connection()
+        try:
+            run = conn.execute("SELECT * FROM board_runs WHERE strategy_id = ?", (strategy_id,)).fetchone()
+            if not run:
+                raise ValueError(f"No board run found for strategy {strategy_id}")
+            if run["status"] == "completed":
+                raise ValueError(f"Board run for strategy {strategy_id} already completed")
+            rows = conn.execute(
+                "SELECT actor, type, message, timestamp FROM board_messages WHERE strategy_id = ? ORDER BY msg_id ASC",
+                (strategy_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        cls._claim(strategy_id)
+        board = cls(topic=run["topic"], user_id=run["user_id"])
+        board.strategy_id = strategy_id
+        board._resumed = True
+        board._claimed = True
+        try:
+            board.turn_providers = json.loads(run["providers"] or "{}")
+        except ValueError:
+            board.turn_providers = {}
+        board._prompt_tokens_before = {k: int(run[k] or 0) for k in board._prompt_tokens_before}
+        board.history.set_topic("CEO", board.topic)
+        for row in rows:
+            board.discussion_log.append({
+                "agent": row["actor"],
+                "message": row["message"],
+                "type": row["type"],
+                "timestamp": row["timestamp"],
+            })
+            actor, message = row["actor"], row["message"] or ""
+            if actor in AGENT_PROMPTS and actor in TURN_ORDER:
+                if message.startswith(AGENT_ERROR_PREFIX):
+                    board._completed_agents.discard(actor)
+                else:
+                    board.history.add(actor, message)
+                    board._completed_agents.add(actor)
+        board.turn_number = len(board._completed_agents)
+        pending = [a for a in TURN_ORDER if a not in board._completed_agents]
+        board.current_agent_name = pending[0] if pending else TURN_ORDER[-1]
+        print(f"[Board] Resuming {strategy_id} at {board.current_agent_name} ({board.turn_number}/{len(TURN_ORDER)} turns done)")
+        return board
+
+    @classmethod
+    def fork(cls, source_strategy_id: str, topic: str, user_id: int, rerun=("LeadAgent",)) -> "Board":
+        """Start a discussion on topic that reuses another strategy's agent turns.
+
+        Agents in rerun, and every agent that depends on them, take their turn
+        again; the other turns are copied from the source discussion.
+        """
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT actor, message FROM board_messages WHERE strategy_id = ? ORDER BY msg_id ASC",
+                (source_strategy_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        latest: Dict[str, str] = {}
+        for row in rows:
+            if row["actor"] in TURN_ORDER and not (row["message"] or "").startswith(AGENT_ERROR_PREFIX):
+                latest[row["actor"]] = row["message"]
+        if not latest:
+            raise ValueError(f"No board discussion found for strategy {source_strategy_id}")
+
+        deps = turn_dependencies()
+        redo = set(rerun)
+        for agent in TURN_ORDER:
+            if redo.intersection(deps.get(agent, [])):
+                redo.add(agent)
+        kept = [a for a in TURN_ORDER if a in latest and a not in redo]
+
+        board = cls(topic=topic, user_id=user_id)
+        board._resumed = True
+        board._log_message("CEO", topic, msg_type="topic")
+        board.history.set_topic("CEO", topic)
+        board._log_message(
+            "System",
+            f"Forked from strategy {source_strategy_id}; reusing turns from {', '.join(kept) or 'no agents'}.",
+            msg_type="system",
+        )
+        for agent in kept:
+            board._log_message(agent, latest[agent])
+            board.history.add(agent, latest[agent])
+            board._completed_agents.add(agent)
+        board.turn_number = len(board._completed_agents)
+        board._checkpoint("running")
+        print(f"[Board] Forked {source_strategy_id} into {board.strategy_id}; reusing {len(kept)} of {len(TURN_ORDER)} turns")
+        return board
+
+    def prompt_stats(self) -> Dict[str, int]:
+        """Prompt tokens the discussion history would have cost in full, what was sent, and the difference."""
+        current = self.history.stats()
+        full = self._prompt_tokens_before["full_prompt_tokens"] + current["full_prompt_tokens"]
+        sent = self._prompt_tokens_before["sent_prompt_tokens"] + current["sent_prompt_tokens"]
+        return {"full_prompt_tokens": full, "sent_prompt_tokens": sent, "saved_prompt_tokens": max(0, full - sent)}
+
+    @staticmethod
+    def run_state(strategy_id: str) -> Optional[Dict[str, object]]:
+        """The board_runs checkpoint of a discussion, including its prompt-history token savings."""
+        ensure_migration(BOARD_RUNS_MIGRATION)
+        conn = get_connection()
+        try:
+            row = conn.execute("SELECT * FROM board_runs WHERE strategy_id = ?", (strategy_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def incomplete_runs() -> List[Dict[str, object]]:
+        """Board runs that never reached 'completed' (e.g. the process died mid-discussion)."""
+        ensure_migration(BOARD_RUNS_MIGRATION)
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT strategy_id, user_id, topic, status, turn_index, sent_prompt_tokens, saved_prompt_tokens, "
+                "updated_at FROM board_runs "
+                "WHERE status != 'completed' ORDER BY updated_at DESC"
+            ).fetchall()
+            return [dict(r) for r in rows]
+        except sqlite3.Error as e:
+            print(f"Database error in incomplete_runs: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _checkpoint(self, status: str = "running"):
+        """Upserts the board_runs row with the turns completed so far and the prompt tokens saved."""
+        conn = None
+        stats = self.prompt_stats()
+        try:
+            ensure_migration(BOARD_RUNS_MIGRATION)
+            conn = get_connection()
+            conn.execute(
+                """
+                INSERT INTO board_runs (strategy_id, user_id, topic, status, turn_index, completed_agents, providers,
+                                        full_prompt_tokens, sent_prompt_tokens, saved_prompt_tokens, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(strategy_id) DO UPDATE SET
+                    status = excluded.status,
+                    turn_index = excluded.turn_index,
+                    completed_agents = excluded.completed_agents,
+                    providers = excluded.providers,
+                    full_prompt_tokens = excluded.full_prompt_tokens,
+                    sent_prompt_tokens = excluded.sent_prompt_tokens,
+                    saved_prompt_tokens = excluded.saved_prompt_tokens,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (
+                    self.strategy_id,
+                    self.user_id,
+                    self.topic,
+                    status,
+                    self.turn_number,
+                    json.dumps([a for a in TURN_ORDER if a in self._completed_agents]),
+                    json.dumps(self.turn_providers),
+                    stats["full_prompt_tokens"],
+                    stats["sent_prompt_tokens"],
+                    stats["saved_prompt_tokens"],
+                ),
+            )
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Database error in _checkpoint: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def get_conversation_history(self, agent_name: Optional[str] = None) -> str:
+        """Returns a formatted string of the conversation history.
 
-    def get_conversation_history(self) -> str:
-        """Returns a formatted string of the conversation history."""
-        return "\n\n".join([f"**{msg['agent']}**: {msg['message']}" for msg in self.discussion_log])
+        With agent_name, only the topic and that agent's declared dependencies
+        are included, in TURN_ORDER order, compacted to the agent's token budget.
+        The dependencies are what lets independent turns run concurrently, so
+        an agent only reads turns it has waited for (see depends_on in
+        agents/prompts.py); with BOARD_PARALLEL_TURNS=0 every earlier turn is
+        included, as before turns were scheduled.
+        """
+        if agent_name is None:
+            return "\n\n".join([f"**{msg['agent']}**: {msg['message']}" for msg in self.discussion_log])
+        budget = AGENT_PROMPTS.get(agent_name, {}).get("history_budget", BOARD_HISTORY_TOKEN_BUDGET)
+        return self.history.render(self._dependencies.get(agent_name, []), budget)
 
     def _log_message(self, actor: str, message: str, msg_type: str = "text"):
         """Logs a message to the internal messages list and the database."""
@@ -155,13 +476,40 @@ class Board:
             if conn:
                 conn.close()
 
+    async def _complete(self, agent_name: str, candidates, messages: list, max_tokens: int, use_cache: bool):
+        """Runs one chat completion for agent_name through the provider router."""
+        attempts = []
+
+        def _chat(provider: str, model: str) -> str:
+            # Any attempt after the first one is a fallback (or hedge) for telemetry
+            attempts.append((provider, model))
+            with llm_call_context(strategy_id=self.strategy_id, source="board", fallback=len(attempts) > 1):
+                return planner_llm.chat(provider, model, messages, 0.2, max_tokens, agent_name, use_cache)
+
+        return await provider_router.call(
+            candidates, _chat, hedge=bool(AGENT_PROMPTS[agent_name].get("latency_critical")),
+        )
+
+    def _admitted_candidates(self, agent_name: str, max_tokens: int = 4096):
+        """Provider/model candidates for agent_name after budget admission, and the clipped max_tokens."""
+        default_model = AGENT_PROMPTS[agent_name]["model"]
+        candidates = []
+        for provider, model in planner_llm.candidates(default_model, agent_name):
+            # Raises BudgetExceeded once the strategy or user budget is spent
+            admitted, clipped = budget_tracker.admit(self.strategy_id, model, max_tokens)
+            if admitted != model:
+                print(f"[Budget] {agent_name}: downgrading {model} -> {admitted}")
+            if (provider, admitted) not in candidates:
+                candidates.append((provider, admitted))
+        return candidates, (clipped if candidates else max_tokens)
+
     async def _call_agent(self, agent_name: str) -> str:
         """Calls the specified agent using the selected provider and returns the response."""
         system_prompt = AGENT_PROMPTS[agent_name]["system_prompt"]
-        default_model = AGENT_PROMPTS[agent_name]["model"]
-        provider, model = planner_llm.pick_provider_and_model(default_model, agent_name)
+        use_cache = AGENT_PROMPTS[agent_name].get("cache", True)
+        candidates, max_tokens = self._admitted_candidates(agent_name)
 
-        history = self.get_conversation_history()
+        history = self.get_conversation_history(agent_name)
         user_prompt = f"The discussion topic is: {self.topic}"
         if history:
             user_prompt = history
@@ -178,74 +526,54 @@ class Board:
         ]
 
         try:
-            response_text = await asyncio.to_thread(
-                planner_llm.chat,
-                provider,
-                model,
-                messages,
-                0.2,
-                4096,
-                agent_name,
-            )
-            label = "Groq" if provider == "groq" else ("DeepSeek" if provider == "deepseek" else "OpenAI")
-            if provider == "mock":
-                label = "Mock"
-            print(f"[{label} Board:{model}] {agent_name} responded.")
-            return response_text
+            response_text, (provider, model), info = await self._complete(agent_name, candidates, messages, max_tokens, use_cache)
         except Exception as e:
-            print(f"Primary provider '{provider}' failed for {agent_name}: {e}")
-            fallback_order = []
-            if provider == "groq":
-                if DEEPSEEK_API_KEY:
-                    fallback_order.append("deepseek")
-            elif provider == "deepseek":
-                if GROQ_API_KEY:
-                    fallback_order.append("groq")
-
-            for fb in fallback_order:
-                try:
-                    fb_model = model
-                    if fb == "deepseek" and not model.lower().startswith("deepseek"):
-                        fb_model = "deepseek-coder"
-                    if fb == "groq" and model.lower().startswith("deepseek"):
-                        fb_model = "llama-3.1-8b-instant"
-                    response_text = await asyncio.to_thread(
-                        planner_llm.chat,
-                        fb,
-                        fb_model,
-                        messages,
-                        0.2,
-                        4096,
-                        agent_name,
-                    )
-                    label = "Groq" if fb == "groq" else ("DeepSeek" if fb == "deepseek" else "OpenAI")
-                    if fb == "mock":
-                        label = "Mock"
-                    print(f"[{label} Board:{fb_model}] {agent_name} responded (fallback).")
-                    return response_text
-                except Exception as fe:
-                    print(f"Fallback provider '{fb}' also failed for {agent_name}: {fe}")
-
-            return f"Error: Could not get a response from {agent_name}."
+            print(f"All providers failed for {agent_name}: {e}")
+            return f"{AGENT_ERROR_PREFIX} {agent_name}."
+
+        self.turn_providers[agent_name] = {"provider": provider, "model": model}
+
+        label = "Groq" if provider == "groq" else ("DeepSeek" if provider == "deepseek" else "OpenAI")
+        if provider == "mock":
+            label = "Mock"
+        suffix = ""
+        if info.get("fallback"):
+            suffix = " (hedged)" if info.get("hedged") else " (fallback)"
+        print(f"[{label} Board:{model}] {agent_name} responded{suffix}.")
+        return response_text
+
+    async def _repair_call(self, messages: list) -> Optional[str]:
+        """One uncached LeadAgent call for a plan repair prompt; None if every provider failed."""
+        candidates, max_tokens = self._admitted_candidates("LeadAgent")
+        try:
+            text, _, _ = await self._complete("LeadAgent", candidates, messages, max_tokens, False)
+            return text
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"[Board] Plan repair call failed: {e}")
+            return None
 
-    def _parse_final_plan(self, text: str) -> dict:
+    async def _finalize_plan(self, text: str) -> dict:
         """
-        Parses the final JSON plan from the LeadAgent's output.
-        Handles cases where the JSON is embedded within other text.
+        Parses and validates the final JSON plan from the LeadAgent's output.
+        Unparseable output is re-prompted once as a whole; invalid fragments
+        (top-level fields or single missions) are re-prompted up to
+        PLAN_REPAIR_MAX_ROUNDS times, and missions still invalid after that are
+        dropped. A plan that changed on the way is logged again as the
+        LeadAgent's plan so the executor reads the validated version.
         """
-        try:
-            # Find the start and end of the JSON block
-            json_start = text.find("<<JSON_START>>") + len("<<JSON_START>>")
-            json_end = text.find("<<JSON_END>>")
-            
-            if json_start == -1 or json_end == -1:
-                # Fallback for plain JSON
-                return json.loads(text)
-
-            json_str = text[json_start:json_end].strip()
-            return json.loads(json_str)
-        except (json.JSONDecodeError, IndexError) as e:
-            print(f"Error parsing final plan JSON: {e}")
+        result = parse_plan(text)
+        changed = result.repaired
+        if result.plan is None and PLAN_REPAIR_MAX_ROUNDS > 0:
+            print(f"[Board] Final plan could not be parsed ({result.issues[0].message}); asking LeadAgent to re-emit it.")
+            retry = await self._repair_call(reformat_messages(text, result.issues[0].message))
+            if retry:
+                result = parse_plan(retry)
+                changed = True
+
+        if result.plan is None:
+            print(f"Error parsing final plan JSON: {result.issues[0].message}")
             print(f"Raw text received:\n{text}")
             return {
                 "strategy_title": "Plan Parsing Failed",
@@ -254,6 +582,39 @@ class Board:
                 "missions": []
             }
 
+        plan, issues = result.plan, result.issues
+        for round_no in range(1, PLAN_REPAIR_MAX_ROUNDS + 1):
+            if not issues:
+                break
+            fragments = invalid_fragments(plan, issues)
+            print(f"[Board] Plan has {len(issues)} issue(s) in {', '.join(fragments)}; repair round {round_no}.")
+            reply = await self._repair_call(fragment_repair_messages(self.topic, plan, fragments))
+            fixes = extract_plan_object(reply) if reply else None
+            if not fixes:
+                continue
+            apply_fragments(plan, {k: v for k, v in fixes.items() if k in fragments})
+            issues = validate_plan(plan)
+            changed = True
+
+        if issues:
+            dropped = drop_invalid_missions(plan, issues)
+            residual = validate_plan(plan)
+            details = "; ".join(str(i) for i in issues[:10])
+            print(f"[Board] Plan still invalid after repair: {details}")
+            if dropped:
+                self._log_message(
+                    "System", f"Rejected invalid missions {', '.join(dropped)}: {details}", msg_type="system"
+                )
+                changed = True
+            if residual:
+                self._log_message(
+                    "System", "Plan issues left unresolved: " + "; ".join(str(i) for i in residual[:10]), msg_type="system"
+                )
+
+        if changed:
+            self._log_message("LeadAgent", render_plan(plan), msg_type="plan_summary")
+        return plan
+
     def _save_strategy(self, plan: dict):
         """Saves the final strategy and its missions to the database."""
         conn = get_connection()
@@ -313,23 +674,78 @@ class Board:
     async def run_discussion(self):
         """
         Runs the entire agent discussion from start to finish.
+        Returns the final plan, or None when a budget stopped the discussion.
         """
-        print("\nStarting discussion...")
-        self._log_message("CEO", self.topic, msg_type="topic")
+        if not self._claimed:
+            self._claim(self.strategy_id)
+            self._claimed = True
+        try:
+            with budget_tracker.run(self.strategy_id, self.user_id):
+                try:
+                    return await self._run_discussion()
+                except BudgetExceeded as e:
+                    print(f"[Budget] Hard stop for strategy {self.strategy_id}: {e}")
+                    self._log_message("System", f"Discussion stopped: {e}.", msg_type="system")
+                    return None
+        finally:
+            self._claimed = False
+            self._release(self.strategy_id)
 
-        for agent_name in TURN_ORDER:
-            self.current_agent_name = agent_name
+    async def _run_discussion(self):
+        if self._resumed:
+            print("\nContinuing discussion...")
+        else:
+            print("\nStarting discussion...")
+            self._log_message("CEO", self.topic, msg_type="topic")
+            self.history.set_topic("CEO", self.topic)
+        self._checkpoint("running")
+
+        # Each turn starts as soon as the turns it depends on have finished,
+        # while messages are still logged strictly in TURN_ORDER.
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_turn(agent_name: str) -> Optional[str]:
+            if agent_name in self._completed_agents:
+                return None
+            deps = self._dependencies.get(agent_name, [])
+            if deps:
+                await asyncio.gather(*(tasks[d] for d in deps))
             response = await self._call_agent(agent_name)
-            
-            msg_type = "text"
-            if agent_name == "LeadAgent":
-                msg_type = "plan_summary"
+            self.history.add(agent_name, response)
+            return response
 
-            self._log_message(agent_name, response, msg_type=msg_type)
+        for agent_name in TURN_ORDER:
+            tasks[agent_name] = asyncio.create_task(run_turn(agent_name))
 
-        # After the loop, the last message is from the LeadAgent
-        final_plan_text = self.discussion_log[-1]["message"]
-        final_plan = self._parse_final_plan(final_plan_text)
+        try:
+            for agent_name in TURN_ORDER:
+                self.current_agent_name = agent_name
+                response = await tasks[agent_name]
+                if agent_name in self._completed_agents:
+                    continue
+
+                msg_type = "text"
+                if agent_name == "LeadAgent":
+                    msg_type = "plan_summary"
+
+                self._log_message(agent_name, response, msg_type=msg_type)
+                if not response.startswith(AGENT_ERROR_PREFIX):
+                    self._completed_agents.add(agent_name)
+                    self.turn_number += 1
+                self._checkpoint("running")
+        except BaseException:
+            self._checkpoint("failed")
+            raise
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        # The LeadAgent's latest message holds the final plan (also after a resume)
+        final_plan_text = next(
+            (m["message"] for m in reversed(self.discussion_log) if m["agent"] == "LeadAgent"), ""
+        )
+        final_plan = await self._finalize_plan(final_plan_text)
 
         # Save strategy even if missions are absent; missions saved only when present
         if isinstance(final_plan, dict):
@@ -337,6 +753,12 @@ class Board:
             self._log_message("System", f"Strategy {self.strategy_id} has been finalized and saved.", msg_type="system")
         else:
             self._log_message("System", f"Strategy {self.strategy_id} could not be finalized due to invalid plan format.", msg_type="system")
-        
+        self._checkpoint("completed")
+
+        saved = self.prompt_stats()
+        print(
+            f"[Board] Prompt history: sent {saved['sent_prompt_tokens']} of "
+            f"{saved['full_prompt_tokens']} tokens (saved {saved['saved_prompt_tokens']})."
+        )
         print("Board discussion finished.")
         return final_plan
\ No newline at end of file
@@ -7,48 +7,170 @@ code generator that writes files to disk.
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
 import json
 import os
 import re
+import signal
 import sqlite3
+import subprocess
+import tarfile
+import time
+import uuid
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from groq import Groq
+from groq import AsyncGroq
 import httpx
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from ..config import GROQ_API_KEY, DEEPSEEK_API_KEY, APPS_ROOT
-from ..database.database import get_connection
+from ..config import (
+    GROQ_API_KEY, DEEPSEEK_API_KEY, GROQ_BASE_URL, DEEPSEEK_BASE_URL, APPS_ROOT,
+    EXECUTOR_MAX_PARALLEL_MISSIONS, EXECUTOR_MAX_PARALLEL_STEPS, EXECUTOR_LLM_TIMEOUT_SECONDS, EXECUTOR_LOG_LEVEL,
+    FILE_EDITOR_MODE, FILE_EDITOR_CONTEXT_CHARS,
+    TERMINAL_RING_LINES, TERMINAL_LOG_SPOOL, TERMINAL_ACTIVITY_INTERVAL_SECONDS,
+    WORKSPACE_DEFAULT_TEMPLATE, DEPENDENCY_CACHE_ROOT, DEPENDENCY_CACHE_OFFLINE, BUILD_CACHE_MAX_ENTRIES,
+    WORKSPACE_SNAPSHOTS, WORKSPACE_SNAPSHOT_MISSIONS, WORKSPACE_SNAPSHOT_MODE, WORKSPACE_SNAPSHOT_KEEP,
+    WORKSPACE_SNAPSHOT_MAX_AGE_DAYS,
+)
+from ..database.database import get_connection, ensure_migration
+from ..services.rate_limiter import call_with_rate_limit_async
+from ..services.telemetry import llm_call_context, record_llm_call
+from ..services.budgets import budget_tracker, BudgetExceeded
+from ..services.action_log import action_logger
+from .plan import extract_plan
+from .mission_graph import MissionGraph, MissionCycleError
+from .step_batches import plan_batches, buffered_output
+from .patching import (
+    PATCH_SYSTEM_PROMPT,
+    PatchError,
+    apply_patch_response,
+    check_python_syntax,
+    split_regions,
+    region_prompt,
+)
+from ..services.codegen_manifest import CodegenManifest, inputs_hash
+from ..services.output_stream import OutputCapture
+from ..services.executor_events import executor_events
+from ..services.workspace_bootstrap import (
+    CommandRewrite, DependencyCache, materialize_template, template_variables, write_atomic,
+)
+from ..services.snapshots import SnapshotStore
+from ..services.plan_cache import plan_cache
+from ..services.build_cache import BuildCache, BuildCacheError, declared as declared_build_io, step_key
+
+
+EXECUTOR_STEPS_MIGRATION = "005_executor_steps.sql"
+# Mission/step being executed, for tools that report progress (terminal output)
+_current_step: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("executor_step", default=None)
+
+
+def _debug(message: str) -> None:
+    """Per-step detail, printed only with EXECUTOR_LOG_LEVEL=debug (actions_log records it either way)."""
+    if EXECUTOR_LOG_LEVEL == "debug":
+        print(message)
 
 
 class ExecutorAgent:
     """Executes the missions defined in a strategy plan."""
 
-    def __init__(self, strategy_id: str):
+    def __init__(self, strategy_id: str, force_regenerate: bool = False, resume: bool = False,
+                 user_id: Optional[int] = None):
         self.strategy_id = strategy_id
+        # Regenerate every file even when the codegen manifest says it is up to date
+        self.force_regenerate = force_regenerate
         self.plan: Optional[Dict[str, Any]] = None
         self.db_conn = get_connection()
         try:
             self.db_conn.row_factory = sqlite3.Row
         except Exception:
             pass
-        self._groq_client: Optional[Groq] = None
-        self._deepseek_client: Optional[OpenAI] = None
+        # Owner whose daily token budget this run is charged to (looked up when the caller does not pass it)
+        self.user_id = user_id if user_id is not None else self.user_id_for(strategy_id, self.db_conn)
+        # Async clients, so LLM calls never block the event loop the API server runs on
+        self._groq_client: Optional[AsyncGroq] = None
+        self._deepseek_client: Optional[AsyncOpenAI] = None
+        self._halted = False
+        # Per-run outcome: completed/failed/skipped missions, durations and critical path
+        self.report: Optional[Dict[str, Any]] = None
+        self._manifests: Dict[str, CodegenManifest] = {}
+        # Resume mode skips steps recorded as completed in executor_steps by an earlier run
+        self.resume = resume
+        self._step_states: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.resume_stats = {"skipped": 0}
+        self.codegen_stats = {"hits": 0, "generated": 0, "time_saved_s": 0.0}
+        # Shared node_modules store and package caches for templates and install commands
+        self._deps = DependencyCache(Path(DEPENDENCY_CACHE_ROOT), offline=DEPENDENCY_CACHE_OFFLINE)
+        # Input-hash cache of terminal steps that declare inputs/outputs, one per app
+        self._build_caches: Dict[str, BuildCache] = {}
+        self.build_stats = {"hits": 0, "misses": 0, "stored": 0, "time_saved_s": 0.0, "restored_files": 0}
+        # Snapshots of app directories taken during this run (services/snapshots.py)
+        self.snapshots: List[Dict[str, Any]] = []
 
     # ---------------- Plan loading (minimal/no-op) ----------------
     def _load_plan(self):
-        print(f"[Executor] Loading plan for strategy_id: {self.strategy_id}")
-        plan: Dict[str, Any] = {"strategy_id": self.strategy_id, "missions": []}
-        cur = self.db_conn.cursor()
+        """Sets self.plan from the compiled-plan cache, compiling it if the strategy changed."""
+        compile_plan = functools.partial(self._compile_plan, self.strategy_id)
+        try:
+            self.plan, cached = plan_cache.get(self.strategy_id, compile_plan, self.db_conn)
+        except sqlite3.Error as e:
+            print(f"[Executor] Plan cache unavailable ({e}); compiling directly")
+            self.plan, cached = compile_plan(self.db_conn, None), False
+        print(f"[Executor] Loaded plan for strategy_id: {self.strategy_id}" + (" (cached)" if cached else ""))
+
+    @classmethod
+    def app_name_for(cls, strategy_id: str) -> Optional[str]:
+        """The plan's app_name without constructing an agent; O(1) while the strategy is unchanged."""
+        return plan_cache.peek(strategy_id, "app_name", functools.partial(cls._compile_plan, strategy_id))
+
+    @staticmethod
+    def user_id_for(strategy_id: str, conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+        """The user who owns the strategy (strategies, else its board run), or None."""
+        if not strategy_id:
+            return None
+        own = conn is None
+        conn = conn or get_connection()
+        try:
+            row = conn.execute(
+                """
+                SELECT COALESCE((SELECT user_id FROM strategies WHERE strategy_id = ?),
+                                (SELECT user_id FROM board_runs WHERE strategy_id = ?))
+                """,
+                (strategy_id, strategy_id),
+            ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+        finally:
+            if own:
+                conn.close()
+
+    @classmethod
+    def app_names_for(cls, strategy_id: str) -> List[str]:
+        """Every app directory the plan writes: the plan's app_name, mission app_names and step-level ones."""
+        plan, _ = plan_cache.get(strategy_id, functools.partial(cls._compile_plan, strategy_id))
+        names = [plan.get("app_name")]
+        for mission in plan.get("missions") or []:
+            names.append(mission.get("app_name"))
+            names.extend((st.get("params") or {}).get("app_name") for st in mission.get("steps") or [])
+        return list(dict.fromkeys(str(name) for name in names if name))
+
+    @classmethod
+    def _compile_plan(cls, strategy_id: str, conn: sqlite3.Connection, schema_version: Optional[int]) -> Dict[str, Any]:
+        """Builds the plan (strategy fields, final plan metadata, missions with normalized steps) from the DB."""
+        print(f"[Executor] Compiling plan for strategy_id: {strategy_id}")
+        plan: Dict[str, Any] = {"strategy_id": strategy_id, "missions": []}
+        cur = conn.cursor()
 
         # Strategy (basic fields from table)
         try:
-            cur.execute("PRAGMA table_info(strategies)")
-            strat_cols = {row[1] for row in cur.fetchall()}
+            strat_cols = plan_cache.columns(conn, "strategies", schema_version)
             cur.execute(
                 "SELECT * FROM strategies WHERE strategy_id = ?",
-                (self.strategy_id,),
+                (strategy_id,),
             )
             srow = cur.fetchone()
             if srow:
@@ -65,7 +187,7 @@ class ExecutorAgent:
             pass
 
         # Enhance with metadata from the LeadAgent's final plan JSON stored in board_messages
-        meta = self._load_final_plan_meta()
+        meta = cls._final_plan_meta(strategy_id, conn)
         if meta:
             title = meta.get("strategy_title") or meta.get("title")
             if title:
@@ -75,19 +197,17 @@ class ExecutorAgent:
             if "tldr" not in plan and meta.get("tldr"):
                 plan["tldr"] = meta.get("tldr")
             if meta.get("app_name"):
-                plan["app_name"] = self._slugify_name(str(meta.get("app_name")))
+                plan["app_name"] = cls._slugify_name(str(meta.get("app_name")))
 
         # Missions
         try:
-            cur.execute("PRAGMA table_info(missions)")
-            mcols = [tuple(r) for r in cur.fetchall()]
-            mcol_names = {r[1] for r in mcols}
+            mcol_names = plan_cache.columns(conn, "missions", schema_version)
 
             base_query = "SELECT * FROM missions"
             params = []
             if "strategy_id" in mcol_names:
                 base_query += " WHERE strategy_id = ?"
-                params.append(self.strategy_id)
+                params.append(strategy_id)
             base_query += " ORDER BY rowid ASC"
 
             cur.execute(base_query, tuple(params))
@@ -102,6 +222,13 @@ class ExecutorAgent:
                 }
                 if "app_name" in mcol_names and r["app_name"] is not None:
                     mission["app_name"] = r["app_name"]
+                mission["dependencies"] = []
+                if "dependencies" in mcol_names and r["dependencies"]:
+                    try:
+                        deps = json.loads(r["dependencies"])
+                        mission["dependencies"] = deps if isinstance(deps, list) else [deps]
+                    except ValueError:
+                        mission["dependencies"] = [r["dependencies"]]
                 # Steps JSON extraction
                 steps_json = None
                 for cand in ("steps", "actions", "tasks"):
@@ -140,21 +267,25 @@ class ExecutorAgent:
         # Derive a default app_name if not present
         if "app_name" not in plan:
             title = meta.get("strategy_title") if meta else None
-            title = title or plan.get("strategy_title") or self.strategy_id
-            plan["app_name"] = self._slugify_name(str(title))
-        self.plan = plan
+            title = title or plan.get("strategy_title") or strategy_id
+            plan["app_name"] = cls._slugify_name(str(title))
+        return plan
 
     def _load_final_plan_meta(self) -> Optional[Dict[str, Any]]:
         """Fetch and parse the LeadAgent's final plan JSON from board_messages for this strategy."""
+        return self._final_plan_meta(self.strategy_id, self.db_conn)
+
+    @staticmethod
+    def _final_plan_meta(strategy_id: str, conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
         try:
-            cur = self.db_conn.cursor()
+            cur = conn.cursor()
             cur.execute(
                 """
                 SELECT message FROM board_messages
                 WHERE strategy_id = ? AND actor = 'LeadAgent'
                 ORDER BY msg_id DESC LIMIT 1
                 """,
-                (self.strategy_id,),
+                (strategy_id,),
             )
             row = cur.fetchone()
             if not row:
@@ -162,30 +293,46 @@ class ExecutorAgent:
             text = row[0] if isinstance(row, (tuple, list)) else row["message"]
             if not isinstance(text, str):
                 return None
-            # Extract JSON between sentinels if present
-            start = text.find("<<JSON_START>>")
-            end = text.find("<<JSON_END>>")
-            if start != -1 and end != -1 and end > start:
-                json_str = text[start + len("<<JSON_START>>"):end].strip()
-            else:
-                json_str = text.strip()
-            try:
-                meta = json.loads(json_str)
-                if isinstance(meta, dict):
-                    return meta
-            except Exception:
-                return None
+            # Tolerant extraction (sentinels, fences, light JSON repair) shared with the Board
+            return extract_plan(text)
         except sqlite3.Error:
             return None
         return None
 
     # ---------------- Public execute entry ----------------
     async def execute(self):
+        try:
+            # Without a strategy there is nothing to charge the run's time and tokens to
+            budget = budget_tracker.run(self.strategy_id, self.user_id) if self.strategy_id else contextlib.nullcontext()
+            with budget:
+                await self._execute_missions()
+        except BaseException as e:
+            self._emit("execution_finished", status="failed", error=str(e) or type(e).__name__, report=self.report)
+            raise
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """Close the async LLM clients (they are recreated on the next call) and the database connection."""
+        conn, self.db_conn = self.db_conn, None
+        if conn is not None:
+            conn.close()
+        for attr in ("_groq_client", "_deepseek_client"):
+            client = getattr(self, attr)
+            setattr(self, attr, None)
+            if client is not None:
+                try:
+                    await client.close()
+                except Exception:
+                    pass
+
+    async def _execute_missions(self):
         self._load_plan()
         missions = (self.plan or {}).get("missions", [])
         # Ensure a workspace exists for this plan
         plan_app = (self.plan or {}).get("app_name")
         if plan_app:
+            await self._snapshot(plan_app, "before execution")
             await self._execute_workspace({
                 "app_name": plan_app,
                 "create_vscode": True,
@@ -193,39 +340,455 @@ class ExecutorAgent:
             })
         if not missions:
             print("[Executor] No missions found for this strategy.")
+            self._emit("execution_finished", status="completed", report=None)
             return
         # Show summary as the strategy name if available per request
         title = (self.plan or {}).get("summary") or (self.plan or {}).get("strategy_title") or self.strategy_id
         print(f"--- Executing Strategy: {title} ---")
-        for m in missions:
-            print(f"\n[Mission] {m.get('title','Untitled')} - owner: {m.get('owner')}")
-            mission_app = m.get("app_name") or (self.plan or {}).get("app_name")
-            for st in m.get("steps", []):
-                print(f"  - Step {st.get('step_id')}: {st.get('description')}")
-                # Propagate app_name down to params if provided at mission/plan level
-                if mission_app:
-                    st.setdefault("params", {})
-                    st["params"].setdefault("app_name", mission_app)
-                res = await self._execute_step(st)
-                if isinstance(res, dict):
-                    if st.get("tool") == "terminal":
-                        code = res.get("code")
-                        ok = res.get("ok")
-                        stdout = (res.get("stdout") or "").strip()
-                        stderr = (res.get("stderr") or "").strip()
-                        print(f"    [Terminal {'OK' if ok else 'FAIL'}] exit={code}")
-                        if stdout:
-                            lines = stdout.splitlines()
-                            head = "\n".join(lines[-10:]) if len(lines) > 10 else stdout
-                            print("    stdout:\n" + "\n".join(["      " + l for l in head.splitlines()]))
-                        if stderr:
-                            lines = stderr.splitlines()
-                            head = "\n".join(lines[-10:]) if len(lines) > 10 else stderr
-                            print("    stderr:\n" + "\n".join(["      " + l for l in head.splitlines()]))
-                    if not res.get("ok", True):
-                        print(f"    [ERROR] {res.get('error')}")
+        if not self.resume:
+            self._reset_step_states()
+        self._step_states = self._load_step_states()
+        if self.resume:
+            done = sum(1 for st in self._step_states.values() if st["status"] == "completed")
+            print(f"[Executor] Resuming: {done} of {len(self._step_states)} recorded steps completed earlier.")
+        try:
+            graph = MissionGraph(missions)
+        except MissionCycleError as e:
+            print(f"[Executor] {e}; nothing was executed.")
+            self.report = {"ok": False, "error": str(e), "cycle": e.cycle}
+            self._emit("execution_finished", status="failed", error=str(e), report=self.report)
+            return
+        for key, deps in graph.unknown.items():
+            print(f"[Executor] Mission {key} lists unknown dependencies {', '.join(deps)}; ignoring them.")
+        self._emit("execution_started", title=title, resume=self.resume,
+                   missions={key: graph.missions[key].get("title") for key in graph.order})
+
+        # Missions start as soon as their dependencies have completed, up to
+        # EXECUTOR_MAX_PARALLEL_MISSIONS at a time; dependents of a failed
+        # mission are skipped without running. Missions writing the same app
+        # directory never overlap: a ready mission waits while another holds
+        # one of its apps.
+        limit = max(1, EXECUTOR_MAX_PARALLEL_MISSIONS)
+        done: List[str] = []
+        failed: List[str] = []
+        skipped: Dict[str, str] = {}
+        durations: Dict[str, float] = {}
+        running: Dict[asyncio.Task, str] = {}
+        held: Dict[str, Set[str]] = {}
+        self._halted = False
+        started_at = time.monotonic()
+        try:
+            while True:
+                if not self._halted:
+                    for key in graph.ready(done, set(running.values()) | set(durations) | set(skipped)):
+                        if len(running) >= limit:
+                            break
+                        apps = self._mission_apps(graph.missions[key])
+                        if any(apps & other for other in held.values()):
+                            continue
+                        held[key] = apps
+                        running[asyncio.create_task(self._run_mission(key, graph.missions[key]))] = key
+                if not running:
+                    break
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    key = running.pop(task)
+                    held.pop(key, None)
+                    ok, durations[key] = task.result()
+                    self._emit("mission_finished", mission=key, mission_id=graph.missions[key].get("mission_id") or key,
+                               status="completed" if ok else "failed", duration_s=round(durations[key], 3))
+                    if ok:
+                        done.append(key)
+                        continue
+                    failed.append(key)
+                    for blocked in graph.blocked_by(key):
+                        if blocked not in skipped:
+                            skipped[blocked] = key
+                            print(f"[Mission] Skipping {blocked}: depends on failed mission {key}")
+                            self._emit("mission_skipped", mission=blocked, status="skipped", failed_dependency=key,
+                                       mission_id=graph.missions[blocked].get("mission_id") or blocked)
+                            self._record_activity(
+                                graph.missions[blocked].get("mission_id"),
+                                f"Skipped: dependency {key} failed", "blocked",
+                                {"failed_dependency": key},
+                            )
+        finally:
+            for task in running:
+                task.cancel()
+
+        wall = time.monotonic() - started_at
+        path, path_s = graph.critical_path(durations)
+        not_run = [k for k in graph.order if k not in durations and k not in skipped]
+        self.report = {
+            "ok": not failed and not skipped and not not_run,
+            "completed": done,
+            "failed": failed,
+            "skipped": skipped,
+            "not_run": not_run,
+            "durations_s": {k: round(v, 3) for k, v in durations.items()},
+            "critical_path": path,
+            "critical_path_s": round(path_s, 3),
+            "wall_s": round(wall, 3),
+            "serial_s": round(sum(durations.values()), 3),
+        }
+        print(
+            f"\n[Executor] Missions: {len(done)} completed, {len(failed)} failed, "
+            f"{len(skipped)} skipped" + (f", {len(not_run)} not run" if not_run else "")
+        )
+        if self.resume:
+            self.report["resumed_steps_skipped"] = self.resume_stats["skipped"]
+            print(f"[Executor] Resume: skipped {self.resume_stats['skipped']} steps completed earlier")
+        cache = self.codegen_stats
+        self.report["codegen_cache"] = {**cache, "skipped_llm_calls": cache["hits"],
+                                        "time_saved_s": round(cache["time_saved_s"], 3)}
+        if cache["hits"] or cache["generated"]:
+            print(
+                f"[Executor] Codegen cache: {cache['hits']} hits, {cache['generated']} generated; "
+                f"skipped {cache['hits']} LLM calls, saved ~{cache['time_saved_s']:.1f}s"
+            )
+        self.report["snapshots"] = self.snapshots
+        build = self.build_stats
+        self.report["build_cache"] = {**build, "time_saved_s": round(build["time_saved_s"], 3)}
+        if build["hits"] or build["misses"]:
+            print(
+                f"[Executor] Build cache: {build['hits']} hits, {build['misses']} misses, "
+                f"{build['restored_files']} outputs restored, saved ~{build['time_saved_s']:.1f}s"
+            )
+        deps = self._deps.stats
+        self.report["dependency_cache"] = dict(deps)
+        if any(deps.values()):
+            print(
+                f"[Executor] Dependency cache: {deps['templates']} scaffolds from templates, "
+                f"{deps['restored']} node_modules restored, {deps['skipped_installs']} installs skipped, "
+                f"{deps['rewritten']} install commands using the shared cache"
+            )
+        if path:
+            print(
+                f"[Executor] Critical path: {' -> '.join(path)} ({path_s:.1f}s); "
+                f"wall {wall:.1f}s, serial {self.report['serial_s']:.1f}s"
+            )
+        self._emit("execution_finished", status="completed" if self.report["ok"] else "failed", report=self.report)
         print("\n--- Execution Complete ---")
 
+    def _mission_apps(self, m: Dict[str, Any]) -> Set[str]:
+        """App directories a mission's steps write ("" for the default location)."""
+        mission_app = m.get("app_name") or (self.plan or {}).get("app_name") or ""
+        return {str((st.get("params") or {}).get("app_name") or mission_app) for st in m.get("steps") or []}
+
+    async def _run_mission(self, key: str, m: Dict[str, Any]) -> Tuple[bool, float]:
+        """Runs a mission's steps in plan order; stops at the first failed step. Returns (ok, seconds).
+
+        Consecutive code_generator/file_editor steps touching different files
+        run concurrently (see agents/step_batches.py); their output is printed
+        in step order once the batch is done.
+        """
+        started = time.monotonic()
+        print(f"\n[Mission] {key}: {m.get('title','Untitled')} - owner: {m.get('owner')}")
+        self._emit("mission_started", mission=key, mission_id=str(m.get("mission_id") or key), status="running",
+                   title=m.get("title"), steps=len(m.get("steps", [])))
+        mission_app = m.get("app_name") or (self.plan or {}).get("app_name")
+        # Propagate app_name down to params if provided at mission/plan level, on copies of
+        # the steps so self.plan stays exactly as compiled
+        steps = [
+            {**st, "params": {"app_name": mission_app, **(st.get("params") or {})}} if mission_app else st
+            for st in m.get("steps", [])
+        ]
+        # Only snapshot an app this mission writes: the scheduler then guarantees no other
+        # mission is writing it, so the snapshot is consistent
+        if mission_app and WORKSPACE_SNAPSHOT_MISSIONS and mission_app in self._mission_apps(m):
+            await self._snapshot(mission_app, f"before mission {key}", mission=key)
+        try:
+            for batch in plan_batches(steps, self._resolve_target_path, EXECUTOR_MAX_PARALLEL_STEPS):
+                if self._halted:
+                    return False, time.monotonic() - started
+                if len(batch) == 1:
+                    ok = await self._run_step(key, m, steps[batch[0]], batch[0])
+                else:
+                    async def buffered(idx):
+                        with buffered_output() as buf:
+                            return await self._run_step(key, m, steps[idx], idx), buf
+
+                    results = await asyncio.gather(*(buffered(i) for i in batch), return_exceptions=True)
+                    ok = True
+                    for res in results:
+                        if isinstance(res, BaseException):
+                            print(f"    [ERROR] [{key}] {res}")
+                            ok = False
+                            continue
+                        step_ok, buf = res
+                        print(buf.getvalue(), end="")
+                        ok = ok and step_ok
+                if not ok:
+                    return False, time.monotonic() - started
+        except Exception as e:
+            print(f"    [ERROR] [{key}] {e}")
+            return False, time.monotonic() - started
+        return True, time.monotonic() - started
+
+    async def _run_step(self, key: str, m: Dict[str, Any], st: Dict[str, Any], index: int) -> bool:
+        """Runs one step, records its state and prints its result.
+
+        Returns False if it failed or a budget stopped execution. In resume mode
+        a step already completed with the same tool and params is skipped.
+        """
+        mission_id = str(m.get("mission_id") or key)
+        step_hash = self._step_hash(st)
+        earlier = self._step_states.get((mission_id, index)) or {}
+        if self.resume and earlier.get("status") == "completed" and earlier.get("step_hash") == step_hash:
+            self.resume_stats["skipped"] += 1
+            self._emit("step_finished", mission_id=mission_id, step_index=index, step_id=st.get("step_id"),
+                       tool=st.get("tool"), status="completed", skipped=True)
+            _debug(f"  - [{key}] Step {st.get('step_id')}: {st.get('description')} (completed earlier, skipped)")
+            return True
+        _debug(f"  - [{key}] Step {st.get('step_id')}: {st.get('description')}")
+        try:
+            budget_tracker.check(self.strategy_id)
+        except BudgetExceeded as e:
+            self._halted = True
+            self._record_budget_stop(m, st, e.as_dict(), str(e))
+            self._record_step(mission_id, index, st, step_hash, "blocked", error=str(e))
+            return False
+        started = time.monotonic()
+        self._record_step(mission_id, index, st, step_hash, "running")
+        token = _current_step.set({"mission_id": mission_id, "step_id": st.get("step_id"), "index": index})
+        try:
+            res = await self._execute_step(st)
+        except BaseException as e:
+            self._record_step(mission_id, index, st, step_hash, "failed", started=started, error=str(e) or type(e).__name__)
+            raise
+        finally:
+            _current_step.reset(token)
+        if isinstance(res, dict) and res.get("budget_exceeded"):
+            self._halted = True
+            self._record_budget_stop(m, st, res["budget_exceeded"], res.get("error"))
+            self._record_step(mission_id, index, st, step_hash, "blocked", started=started, result=res, error=res.get("error"))
+            return False
+        ok = not (isinstance(res, dict) and not res.get("ok", True))
+        self._record_step(
+            mission_id, index, st, step_hash, "completed" if ok else "failed", started=started, result=res,
+            error=None if ok else (res.get("error") or f"exit code {res.get('code')}"),
+        )
+        if isinstance(res, dict):
+            if st.get("tool") == "terminal":
+                code = res.get("code")
+                ok = res.get("ok")
+                stdout = (res.get("stdout") or "").strip()
+                stderr = (res.get("stderr") or "").strip()
+                # Output of a successful command is detail; a failure shows it at the default level
+                show = print if not ok else _debug
+                show(f"    [Terminal {'OK' if ok else 'FAIL'}] exit={code}")
+                if stdout:
+                    lines = stdout.splitlines()
+                    head = "\n".join(lines[-10:]) if len(lines) > 10 else stdout
+                    show("    stdout:\n" + "\n".join(["      " + l for l in head.splitlines()]))
+                if stderr:
+                    lines = stderr.splitlines()
+                    head = "\n".join(lines[-10:]) if len(lines) > 10 else stderr
+                    show("    stderr:\n" + "\n".join(["      " + l for l in head.splitlines()]))
+            if not res.get("ok", True):
+                error = res.get("error") or f"exit code {res.get('code')}"
+                print(f"    [ERROR] [{key}] {error}")
+                return False
+        return True
+
+    def _record_budget_stop(self, mission: Dict[str, Any], step: Dict[str, Any], budget: Dict[str, Any], error: Optional[str]):
+        """Log a budget hard stop as a blocked activity on the mission being executed."""
+        print(f"[Budget] Hard stop for strategy {self.strategy_id}: {error}")
+        details = {"step_id": step.get("step_id"), "tool": step.get("tool"), "budget": budget,
+                   "usage": budget_tracker.usage(self.strategy_id)["budgets"]}
+        self._record_activity(mission.get("mission_id"), f"Budget hard stop: {error}", "blocked", details)
+
+    async def _snapshot(self, app_name: str, label: str, **info: Any) -> Optional[str]:
+        """Snapshot the app directory (if it exists) and apply retention; returns the snapshot id."""
+        app_root = Path(APPS_ROOT) / app_name
+        if not WORKSPACE_SNAPSHOTS or not app_root.is_dir():
+            return None
+        store = SnapshotStore(app_root, WORKSPACE_SNAPSHOT_MODE)
+        try:
+            meta = await asyncio.to_thread(store.create, label, strategy_id=self.strategy_id, **info)
+            await asyncio.to_thread(store.gc, WORKSPACE_SNAPSHOT_KEEP, WORKSPACE_SNAPSHOT_MAX_AGE_DAYS)
+        except Exception as e:
+            print(f"[Snapshot] Failed to snapshot {app_name}: {e}")
+            return None
+        modes = ", ".join(f"{n} {mode}" for mode, n in meta["modes"].items() if n)
+        print(f"[Snapshot] {app_name} {meta['id']} ({label}): {meta['files']} files in {meta['seconds']:.2f}s"
+              + (f" ({modes})" if modes else ""))
+        self.snapshots.append({"app_name": app_name, "id": meta["id"], "label": label})
+        self._emit("snapshot_created", app_name=app_name, snapshot_id=meta["id"], label=label, **info)
+        return meta["id"]
+
+    def _emit(self, event: str, **fields: Any):
+        """Publish a progress event on this strategy's executor channel (see services/executor_events.py)."""
+        try:
+            executor_events.emit(self.strategy_id, event, **fields)
+        except Exception as e:
+            print(f"[Executor] Failed to publish {event} event: {e}")
+
+    def _record_activity(self, mission_id: Optional[str], action: str, status: str, details: Dict[str, Any]):
+        if not mission_id:
+            return
+        conn = get_connection()
+        try:
+            conn.execute(
+                """
+                INSERT INTO mission_activities (activity_id, mission_id, action, status, details)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (str(uuid.uuid4()), mission_id, action, status, json.dumps(details)),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[Executor] Failed to record mission activity: {e}")
+        finally:
+            conn.close()
+
+    # ---------------- Step state (executor_steps) ----------------
+    @staticmethod
+    def _step_hash(step: Dict[str, Any]) -> str:
+        payload = json.dumps({"tool": step.get("tool"), "params": step.get("params") or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _reset_step_states(self):
+        """A fresh (non-resume) run starts every recorded step over; attempt counts are kept."""
+        conn = None
+        try:
+            ensure_migration(EXECUTOR_STEPS_MIGRATION)
+            conn = get_connection()
+            conn.execute(
+                "UPDATE executor_steps SET status = 'pending', updated_at = CURRENT_TIMESTAMP WHERE strategy_id = ?",
+                (self.strategy_id,),
+            )
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[Executor] Failed to reset step state: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def reset_steps_since(strategy_id: str, since_ts: float) -> int:
+        """Mark the strategy's steps started at or after since_ts as pending again (after a workspace rollback).
+
+        Returns the number of rows reset; a resumed run executes them again.
+        """
+        # started_at is CURRENT_TIMESTAMP (UTC, whole seconds); steps from the same second are reset too
+        since = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(since_ts))
+        conn = None
+        try:
+            ensure_migration(EXECUTOR_STEPS_MIGRATION)
+            conn = get_connection()
+            cur = conn.execute(
+                "UPDATE executor_steps SET status = 'pending', updated_at = CURRENT_TIMESTAMP "
+                "WHERE strategy_id = ? AND status != 'pending' AND started_at >= ?",
+                (strategy_id, since),
+            )
+            conn.commit()
+            return cur.rowcount
+        except (sqlite3.Error, OSError) as e:
+            print(f"[Executor] Failed to reset step state: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def _load_step_states(self) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        return {(row["mission_id"], row["step_index"]): row for row in self.step_states(self.strategy_id)}
+
+    @staticmethod
+    def step_states(strategy_id: str) -> List[Dict[str, Any]]:
+        """Recorded per-step state of a strategy's executions, in mission/step order."""
+        conn = None
+        try:
+            ensure_migration(EXECUTOR_STEPS_MIGRATION)
+            conn = get_connection()
+            rows = conn.execute(
+                "SELECT * FROM executor_steps WHERE strategy_id = ? ORDER BY rowid, step_index",
+                (strategy_id,),
+            ).fetchall()
+            out = []
+            for row in rows:
+                item = dict(row)
+                item["result"] = json.loads(item["result"]) if item.get("result") else None
+                out.append(item)
+            return out
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"[Executor] Failed to read step state: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _result_summary(res: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(res, dict):
+            return None
+        summary = {k: res[k] for k in ("ok", "code", "file_path", "bytes", "cached", "mode", "backend", "model", "created")
+                   if k in res}
+        for key in ("lines", "truncated", "log_path"):
+            if res.get(key):
+                summary[key] = res[key]
+        for stream in ("stdout", "stderr"):
+            if res.get(stream):
+                summary[stream] = res[stream][-500:]
+        return summary
+
+    def _record_step(self, mission_id: str, index: int, step: Dict[str, Any], step_hash: str, status: str,
+                     started: Optional[float] = None, result: Any = None, error: Optional[str] = None):
+        """Upserts the executor_steps row and publishes the step event; a 'running' transition counts one attempt."""
+        duration_ms = round((time.monotonic() - started) * 1000.0, 1) if started is not None else None
+        summary = self._result_summary(result)
+        event = {"mission_id": mission_id, "step_index": index, "step_id": step.get("step_id"), "tool": step.get("tool"),
+                 "status": status, "duration_ms": duration_ms, "error": error}
+        if status == "running":
+            event["description"] = step.get("description")
+        for key in ("code", "bytes", "file_path", "cached", "lines", "truncated"):
+            if summary and key in summary:
+                event[key] = summary[key]
+        self._emit("step_started" if status == "running" else "step_finished", **event)
+        if status != "running":
+            action_logger.log(step.get("tool") or "unknown", "step", step.get("params"), result, status == "completed",
+                              strategy_id=self.strategy_id, mission_id=mission_id,
+                              step_name=step.get("description") or str(step.get("step_id")),
+                              duration_ms=duration_ms, error=error)
+        conn = None
+        try:
+            ensure_migration(EXECUTOR_STEPS_MIGRATION)
+            conn = get_connection()
+            conn.execute(
+                """
+                INSERT INTO executor_steps (strategy_id, mission_id, step_index, step_id, tool, step_hash, status,
+                                            attempts, started_at, finished_at, duration_ms, result, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?,
+                        CASE WHEN ? = 'running' THEN CURRENT_TIMESTAMP END,
+                        CASE WHEN ? != 'running' THEN CURRENT_TIMESTAMP END,
+                        ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(strategy_id, mission_id, step_index) DO UPDATE SET
+                    step_id = excluded.step_id,
+                    tool = excluded.tool,
+                    step_hash = excluded.step_hash,
+                    status = excluded.status,
+                    attempts = executor_steps.attempts + (CASE WHEN excluded.status = 'running' THEN 1 ELSE 0 END),
+                    started_at = COALESCE(excluded.started_at, executor_steps.started_at),
+                    finished_at = excluded.finished_at,
+                    duration_ms = excluded.duration_ms,
+                    result = excluded.result,
+                    error = excluded.error,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (
+                    self.strategy_id, mission_id, index, str(step.get("step_id")), step.get("tool"), step_hash, status,
+                    1 if status == "running" else 0, status, status, duration_ms,
+                    json.dumps(summary, default=str) if result is not None else None,
+                    error,
+                ),
+            )
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[Executor] Failed to record step state: {e}")
+        finally:
+            if conn:
+                conn.close()
+
     # ---------------- Step router ----------------
     async def _execute_step(self, step: Dict[str, Any]):
         tool = step.get("tool")
@@ -236,6 +799,8 @@ class ExecutorAgent:
             return await self._execute_code_generator(params)
         if tool == "file_editor":
             return await self._execute_file_editor(params)
+        if tool == "workspace":
+            return await self._execute_workspace(params)
         return {"ok": False, "error": f"Unknown tool: {tool}"}
 
     # ---------------- Terminal tool ----------------
@@ -251,29 +816,187 @@ class ExecutorAgent:
         if not cmd:
             return {"ok": False, "error": "Missing 'command' in params"}
 
-        print(f"[Terminal] $ {cmd}")
+        _debug(f"[Terminal] $ {cmd}")
+        if cwd and os.path.isdir(cwd):
+            restored = await asyncio.to_thread(self._deps.restore_node_modules, Path(cwd))
+            if restored:
+                print(f"[Terminal] Restored node_modules from the dependency cache ({restored['hardlink']} files linked)")
+        rewrite = self._deps.rewrite_command(cmd, cwd)
+        if rewrite.action == "template":
+            target = Path(cwd or APPS_ROOT) / rewrite.target
+            name = params.get("app_name") if rewrite.target == "." and params.get("app_name") else target.name
+            try:
+                tpl = await asyncio.to_thread(materialize_template, rewrite.template, target, template_variables(name))
+                await asyncio.to_thread(self._deps.restore_node_modules, target)
+            except OSError as e:
+                return {"ok": False, "error": f"Template {rewrite.template} failed: {e}"}
+            note = f"{rewrite.note}: {len(tpl['files'])} files written, {tpl['kept']} kept"
+            print(f"[Terminal] {note}")
+            return {"ok": True, "code": 0, "stdout": note, "template": tpl}
+        if rewrite.action == "skip":
+            _debug(f"[Terminal] Skipped: {rewrite.note}")
+            return {"ok": True, "code": 0, "stdout": rewrite.note}
+        if rewrite.command != cmd:
+            _debug(f"[Terminal] Using the shared package cache: $ {rewrite.command}")
+
+        # Steps declaring their inputs are skipped when those inputs are unchanged since a successful run
+        try:
+            io_globs = declared_build_io(params)
+        except BuildCacheError as e:
+            return {"ok": False, "error": str(e)}
+        cache = key = None
+        input_files = 0
+        if io_globs and cwd and os.path.isdir(cwd):
+            cache = self._build_cache_for(params.get("app_name"), cwd)
+            key, input_files = await asyncio.to_thread(step_key, cmd, Path(cwd), *io_globs)
+            entry = None if (self.force_regenerate or params.get("force")) else cache.lookup(key)
+            if entry:
+                try:
+                    restored = await asyncio.to_thread(cache.restore, entry, Path(cwd))
+                except (OSError, KeyError, tarfile.TarError) as e:
+                    print(f"[Terminal] Build cache entry unusable ({e}); running the command")
+                else:
+                    cache.note_hit(entry, restored)
+                    self.build_stats["hits"] += 1
+                    self.build_stats["restored_files"] += restored
+                    self.build_stats["time_saved_s"] += float(entry.get("duration_s") or 0.0)
+                    print(f"[Terminal] Build cache hit: {input_files} inputs unchanged, {restored} outputs restored, "
+                          f"saved ~{float(entry.get('duration_s') or 0.0):.1f}s")
+                    return {"ok": True, "code": 0, "cached": True, "stdout": entry.get("stdout") or "",
+                            "stderr": entry.get("stderr") or "", "lines": entry.get("lines"),
+                            "log_path": cache.log_path(entry), "restored_files": restored}
+            cache.note_miss()
+            self.build_stats["misses"] += 1
+
+        started = time.monotonic()
+        res = await self._run_command(rewrite.command, cwd, params, rewrite, timeout)
+        if cache and res.get("ok"):
+            try:
+                await asyncio.to_thread(cache.record, key, cmd, Path(cwd), io_globs[1], res,
+                                        time.monotonic() - started, res.get("log_path"), input_files)
+                self.build_stats["stored"] += 1
+            except (OSError, tarfile.TarError) as e:
+                print(f"[Terminal] Could not store the build cache entry: {e}")
+        return res
+
+    async def _run_command(self, cmd: str, cwd: Optional[str], params: Dict[str, Any], rewrite: CommandRewrite,
+                           timeout: float) -> Dict[str, Any]:
+        """Run a shell command, streaming its output through OutputCapture."""
+        step = _current_step.get() or {}
+        capture = OutputCapture(
+            TERMINAL_RING_LINES,
+            spool_path=self._terminal_log_path(params.get("app_name"), step),
+            hub_key=self.strategy_id,
+            event_fields={"mission_id": step.get("mission_id"), "step_id": step.get("step_id")},
+            on_flush=self._terminal_flusher(step.get("mission_id"), step.get("step_id"), cmd),
+            flush_interval=TERMINAL_ACTIVITY_INTERVAL_SECONDS,
+        )
+        code = None
         try:
             proc = await asyncio.create_subprocess_shell(
                 cmd,
                 cwd=cwd,
+                env={**os.environ, **rewrite.env} if rewrite.env else None,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
+                # Own process group, so the processes the shell starts can be killed with it
+                start_new_session=os.name != "nt",
             )
+            # Stream both pipes line by line; only a bounded tail is kept in memory
+            pumps = asyncio.gather(capture.pump(proc.stdout, "stdout"), capture.pump(proc.stderr, "stderr"))
             try:
-                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+                await asyncio.wait_for(asyncio.shield(pumps), timeout=timeout)
+                code = await proc.wait()
             except asyncio.TimeoutError:
-                proc.kill()
-                return {"ok": False, "error": f"Command timed out after {timeout}s"}
+                self._kill_command(proc)
+                pumps.cancel()
+                await self._reap(proc, pumps)
+                return {"ok": False, "error": f"Command timed out after {timeout}s", **self._capture_result(capture)}
+            except asyncio.CancelledError:
+                # Don't leave the command running when the executor is cancelled
+                self._kill_command(proc)
+                pumps.cancel()
+                await self._reap(proc, pumps)
+                raise
 
-            code = proc.returncode
+            if code == 0 and rewrite.installs and cwd:
+                try:
+                    stored = await asyncio.to_thread(self._deps.store_node_modules, Path(cwd))
+                    if stored:
+                        print(f"[Terminal] Added node_modules to the dependency cache "
+                              f"({stored['reflink'] + stored['copy']} files copied, read-only)")
+                except OSError as e:
+                    print(f"[Terminal] Could not store node_modules in the dependency cache: {e}")
             return {
                 "ok": code == 0,
                 "code": code,
-                "stdout": stdout.decode(errors="replace"),
-                "stderr": stderr.decode(errors="replace"),
+                **self._capture_result(capture),
             }
         except Exception as e:
             return {"ok": False, "error": str(e)}
+        finally:
+            capture.close({"code": code})
+
+    @staticmethod
+    def _kill_command(proc: asyncio.subprocess.Process) -> None:
+        """Kill a shell command together with the processes it started (they hold its output pipes)."""
+        try:
+            if os.name == "nt":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True, timeout=10)
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (OSError, subprocess.SubprocessError):
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+
+    @staticmethod
+    async def _reap(proc: asyncio.subprocess.Process, pumps: asyncio.Future) -> None:
+        """Wait briefly for a killed command, so its pipes close while the event loop still runs."""
+        try:
+            await asyncio.wait_for(asyncio.gather(proc.wait(), pumps, return_exceptions=True), 5)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def _capture_result(capture: OutputCapture) -> Dict[str, Any]:
+        ring = capture.ring
+        return {
+            "stdout": ring.text("stdout"),
+            "stderr": ring.text("stderr"),
+            "lines": dict(ring.total_lines),
+            "output_bytes": ring.total_bytes,
+            "truncated": ring.truncated,
+            "log_path": str(capture.spool_path) if capture.spool_path else None,
+        }
+
+    def _terminal_log_path(self, app_name: Optional[str], step: Dict[str, Any]) -> Optional[Path]:
+        """Full-output spool under the app's .jarvis/logs (None when spooling is off)."""
+        if not TERMINAL_LOG_SPOOL:
+            return None
+        base = Path(APPS_ROOT) / app_name if app_name else Path(APPS_ROOT)
+        name = "-".join(
+            str(part) for part in (time.strftime("%Y%m%d-%H%M%S"), step.get("mission_id"), step.get("step_id"),
+                                   uuid.uuid4().hex[:6]) if part
+        )
+        return base / ".jarvis" / "logs" / f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.log.gz"
+
+    def _terminal_flusher(self, mission_id: Optional[str], step_id: Any, cmd: str):
+        """Persist new output lines as an in-progress mission activity (called at most once per interval)."""
+        if not mission_id:
+            return None
+
+        def flush(lines, capture: OutputCapture):
+            self._record_activity(
+                mission_id,
+                f"Terminal output: {cmd[:80]}",
+                "in-progress",
+                {"step_id": step_id, "lines": [f"{'E| ' if s == 'stderr' else ''}{l}" for s, l in lines[-50:]],
+                 "new_lines": len(lines), "total_lines": dict(capture.ring.total_lines)},
+            )
+
+        return flush
 
     # ---------------- Code generator (Groq/DeepSeek) ----------------
     async def _execute_code_generator(self, params: Dict[str, Any]):
@@ -288,6 +1011,18 @@ class ExecutorAgent:
             return {"ok": False, "error": "'prompt' and 'file_path' are required"}
 
         dest_path = self._resolve_target_path(file_path, app_name)
+        # Skip the LLM call when the same inputs produced this file and it is unmodified
+        manifest = self._manifest_for(app_name)
+        inputs = inputs_hash(prompt, model, language, manifest.relative(dest_path)) if manifest else None
+        if manifest and not (self.force_regenerate or params.get("force")):
+            entry = manifest.lookup(dest_path, inputs)
+            if entry:
+                saved = float(entry.get("generation_s") or 0.0)
+                self.codegen_stats["hits"] += 1
+                self.codegen_stats["time_saved_s"] += saved
+                _debug(f"[CodeGen cache] {dest_path} is up to date; skipped LLM call (saved ~{saved:.1f}s)")
+                return {"ok": True, "file_path": str(dest_path), "bytes": entry.get("bytes"), "cached": True,
+                        "backend": entry.get("backend"), "model": entry.get("model")}
         parent = dest_path.parent
         # If the parent exists but is a file, we cannot create into it
         if parent.exists() and parent.is_file():
@@ -302,32 +1037,11 @@ class ExecutorAgent:
         if dest_path.exists() and not overwrite:
             return {"ok": False, "error": f"File exists and overwrite=False: {file_path}"}
 
-        backend = "groq"
-        if isinstance(model, str) and model.lower().startswith("deepseek"):
-            backend = "deepseek"
-
-        if backend == "groq":
-            if not self._groq_client:
-                if not GROQ_API_KEY:
-                    return {"ok": False, "error": "GROQ_API_KEY is not set"}
-                try:
-                    http_client = httpx.Client(trust_env=False)
-                    self._groq_client = Groq(api_key=GROQ_API_KEY, http_client=http_client)
-                except TypeError:
-                    try:
-                        self._groq_client = Groq(api_key=GROQ_API_KEY)
-                    except Exception as e:
-                        return {"ok": False, "error": f"Failed to init Groq client: {e}"}
-                except Exception as e:
-                    return {"ok": False, "error": f"Failed to init Groq client: {e}"}
-        else:
-            if not self._deepseek_client:
-                if not DEEPSEEK_API_KEY:
-                    return {"ok": False, "error": "DEEPSEEK_API_KEY is not set"}
-                try:
-                    self._deepseek_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com/v1")
-                except Exception as e:
-                    return {"ok": False, "error": f"Failed to init DeepSeek client: {e}"}
+        started = time.perf_counter()
+        backend = self._backend_for(model)
+        init_error = self._ensure_client(backend)
+        if init_error:
+            return {"ok": False, "error": init_error}
 
         system_prompt = (
             "You are a senior code generator. Return ONLY raw code for the requested file. "
@@ -337,67 +1051,39 @@ class ExecutorAgent:
         if language:
             system_prompt += f" Language hint: {language}."
 
-        try:
-            if backend == "groq":
-                resp = self._groq_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=float(params.get("temperature", 0.2)),
-                    max_tokens=int(params.get("max_tokens", 4096)),
-                )
-                content = resp.choices[0].message.content or ""
-            else:
-                resp = self._deepseek_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=float(params.get("temperature", 0.2)),
-                    max_tokens=int(params.get("max_tokens", 4096)),
-                )
-                content = resp.choices[0].message.content or ""
-        except Exception as e:
-            msg = str(e)
-            if backend == "groq" and DEEPSEEK_API_KEY and ("invalid api key" in msg.lower() or "401" in msg):
-                # Fallback to DeepSeek automatically
-                if not self._deepseek_client:
-                    try:
-                        self._deepseek_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com/v1")
-                    except Exception as ie:
-                        return {"ok": False, "error": f"DeepSeek init failed during fallback: {ie}"}
-                ds_model = model if model.lower().startswith("deepseek") else "deepseek-coder"
-                try:
-                    resp = self._deepseek_client.chat.completions.create(
-                        model=ds_model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt},
-                        ],
-                        temperature=float(params.get("temperature", 0.2)),
-                        max_tokens=int(params.get("max_tokens", 4096)),
-                    )
-                    content = resp.choices[0].message.content or ""
-                except Exception as de:
-                    return {"ok": False, "error": f"DeepSeek API error after fallback: {de}"}
-            else:
-                return {"ok": False, "error": f"{backend.capitalize()} API error: {e}"}
+        llm = await self._llm_complete(
+            backend,
+            model,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=float(params.get("temperature", 0.2)),
+            max_tokens=int(params.get("max_tokens", 4096)),
+            tool="code_generator",
+        )
+        if not llm.get("ok"):
+            return llm
+        content = llm["content"]
+        backend, model = llm["backend"], llm["model"]
 
         if not content:
             return {"ok": False, "error": "Empty response from model"}
 
         code = self._strip_code_fences(content)
         try:
-            dest_path.write_text(code, encoding="utf-8", newline="\n")
+            # Replace rather than overwrite, so a hardlinked snapshot of the old file stays intact
+            write_atomic(dest_path, code.encode("utf-8"))
         except Exception as e:
             return {"ok": False, "error": f"Failed to write file: {e}"}
 
         size = dest_path.stat().st_size
+        self.codegen_stats["generated"] += 1
+        if manifest:
+            manifest.record(dest_path, inputs, code.encode("utf-8"), backend=backend, model=model,
+                            generation_s=round(time.perf_counter() - started, 3))
         label = "Groq" if backend == "groq" else "DeepSeek"
-        print(f"[{label} CodeGen:{model}] Wrote {size} bytes to {dest_path}")
+        _debug(f"[{label} CodeGen:{model}] Wrote {size} bytes to {dest_path}")
         return {"ok": True, "file_path": str(dest_path), "bytes": size, "backend": backend, "model": model}
 
     # ---------------- File editor (Groq/DeepSeek) ----------------
@@ -459,113 +1145,277 @@ class ExecutorAgent:
         except Exception as e:
             return {"ok": False, "error": f"Failed to read file: {e}"}
 
-        backend = "groq"
+        backend = self._backend_for(model)
+        init_error = self._ensure_client(backend)
+        if init_error:
+            return {"ok": False, "error": init_error}
+
+        temperature = float(params.get("temperature", 0.2))
+        mode = str(params.get("edit_mode") or FILE_EDITOR_MODE).lower()
+        new_code: Optional[str] = None
+        applied, blocks = "rewrite", 0
+        if mode == "patch":
+            patched = await self._edit_with_patches(backend, model, p, original, instruction, language, temperature,
+                                                    int(params.get("max_tokens", 4096)))
+            if patched.get("budget_exceeded"):
+                return patched
+            if patched["ok"]:
+                new_code, backend, model = patched["content"], patched["backend"], patched["model"]
+                applied, blocks = patched["mode"], patched["blocks"]
+                if new_code == original:
+                    _debug(f"[Edit] {p} needs no changes")
+                    return {"ok": True, "file_path": str(p), "bytes": len(original), "changed": False,
+                            "mode": applied, "backend": backend, "model": model}
+            elif len(original) > FILE_EDITOR_CONTEXT_CHARS:
+                return {"ok": False, "error": f"Patch edit failed and {p.name} is too large for a full rewrite: {patched['error']}"}
+            else:
+                print(f"[Edit] Patch for {p.name} failed ({patched['error']}); falling back to full rewrite")
+
+        if new_code is None:
+            system_prompt = (
+                "You are a senior code editor. You will be given an existing file and a requested change. "
+                "Return ONLY the full updated file contents. Do not include markdown, code fences, or explanations. "
+                "Preserve existing style and imports unless changes require otherwise."
+            )
+            if language:
+                system_prompt += f" Language hint: {language}."
+
+            user_content = (
+                "Apply the following change to the file.\n\n"
+                f"Change request:\n{instruction}\n\n"
+                "Current file contents:\n" + "```\n" + original + "\n```"
+            )
+
+            llm = await self._llm_complete(
+                backend,
+                model,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=temperature,
+                max_tokens=int(params.get("max_tokens", 8192)),
+                tool="file_editor",
+            )
+            if not llm.get("ok"):
+                return llm
+            content = llm["content"]
+            backend, model = llm["backend"], llm["model"]
+
+            if not content:
+                return {"ok": False, "error": "Empty response from model"}
+
+            new_code = self._strip_code_fences(content)
+            if not new_code.strip():
+                return {"ok": False, "error": "Model returned empty content after stripping fences"}
+            try:
+                check_python_syntax(p.name, original, new_code)
+            except PatchError as e:
+                return {"ok": False, "error": f"Rewrite rejected: {e}"}
+
+        tmp_path = p.with_suffix(p.suffix + ".tmp")
+        bak_path = p.with_suffix(p.suffix + ".bak")
+        try:
+            tmp_path.write_text(new_code, encoding="utf-8", newline="\n")
+            # Workspace snapshots supersede the single .bak undo file
+            if not WORKSPACE_SNAPSHOTS and not bak_path.exists():
+                bak_path.write_text(original, encoding="utf-8", newline="\n")
+            tmp_path.replace(p)
+        except Exception as e:
+            return {"ok": False, "error": f"Failed to write updated file: {e}"}
+        label = "Groq" if backend == "groq" else "DeepSeek"
+        detail = f" ({blocks} patch blocks, {applied})" if applied != "rewrite" else ""
+        _debug(f"[{label} Edit:{model}] Wrote {len(new_code)} bytes to {p}{detail}")
+        return {"ok": True, "file_path": str(p), "bytes": len(new_code), "changed": True, "mode": applied,
+                "blocks": blocks, "backend": backend, "model": model}
+
+    async def _edit_with_patches(
+        self,
+        backend: str,
+        model: str,
+        p: Path,
+        original: str,
+        instruction: str,
+        language: Optional[str],
+        temperature: float,
+        max_tokens: int,
+    ) -> Dict[str, Any]:
+        """Ask for SEARCH/REPLACE blocks and apply them locally.
+
+        Files longer than FILE_EDITOR_CONTEXT_CHARS are edited region by
+        region (concurrently). Returns {"ok": True, "content", "blocks", "mode",
+        "backend", "model"} or {"ok": False, "error"} when any patch does not apply.
+        """
+        system_prompt = PATCH_SYSTEM_PROMPT + (f" Language hint: {language}." if language else "")
+        regions = split_regions(original, FILE_EDITOR_CONTEXT_CHARS)
+
+        async def edit_region(idx: int, region: str) -> Dict[str, Any]:
+            if len(regions) == 1:
+                user_content = (
+                    "Apply the following change to the file.\n\n"
+                    f"Change request:\n{instruction}\n\n"
+                    "Current file contents:\n" + "```\n" + region + "\n```"
+                )
+            else:
+                user_content = region_prompt(instruction, region, idx + 1, len(regions), p.name)
+            llm = await self._llm_complete(
+                backend,
+                model,
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_content},
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                tool="file_editor",
+            )
+            if not llm.get("ok"):
+                return llm
+            try:
+                text, count = apply_patch_response(region, llm["content"])
+            except PatchError as e:
+                label = f"region {idx + 1}/{len(regions)}: " if len(regions) > 1 else ""
+                return {"ok": False, "error": f"{label}{e}"}
+            return {"ok": True, "content": text, "blocks": count, "backend": llm["backend"], "model": llm["model"]}
+
+        results = await asyncio.gather(*(edit_region(i, r) for i, r in enumerate(regions)))
+        for res in results:
+            if not res.get("ok"):
+                return res
+        content = "".join(r["content"] for r in results)
+        try:
+            check_python_syntax(p.name, original, content)
+        except PatchError as e:
+            return {"ok": False, "error": str(e)}
+        return {
+            "ok": True,
+            "content": content,
+            "blocks": sum(r["blocks"] for r in results),
+            "mode": "patch" if len(regions) == 1 else f"patch, {len(regions)} regions",
+            "backend": results[-1]["backend"],
+            "model": results[-1]["model"],
+        }
+
+    # ---------------- LLM backends ----------------
+    @staticmethod
+    def _backend_for(model: Any) -> str:
         if isinstance(model, str) and model.lower().startswith("deepseek"):
-            backend = "deepseek"
+            return "deepseek"
+        return "groq"
+
+    def _ensure_client(self, backend: str) -> Optional[str]:
+        """Lazily create the client for backend; returns an error message on failure."""
+        # max_retries=0: 429s are retried by call_with_rate_limit_async, which honors Retry-After
         if backend == "groq":
             if not self._groq_client:
                 if not GROQ_API_KEY:
-                    return {"ok": False, "error": "GROQ_API_KEY is not set"}
+                    return "GROQ_API_KEY is not set"
                 try:
-                    http_client = httpx.Client(trust_env=False)
-                    self._groq_client = Groq(api_key=GROQ_API_KEY, http_client=http_client)
+                    http_client = httpx.AsyncClient(trust_env=False, timeout=EXECUTOR_LLM_TIMEOUT_SECONDS)
+                    self._groq_client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, http_client=http_client,
+                                                  max_retries=0)
                 except TypeError:
                     try:
-                        self._groq_client = Groq(api_key=GROQ_API_KEY)
+                        self._groq_client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, max_retries=0)
                     except Exception as e:
-                        return {"ok": False, "error": f"Failed to init Groq client: {e}"}
+                        return f"Failed to init Groq client: {e}"
                 except Exception as e:
-                    return {"ok": False, "error": f"Failed to init Groq client: {e}"}
+                    return f"Failed to init Groq client: {e}"
         else:
             if not self._deepseek_client:
                 if not DEEPSEEK_API_KEY:
-                    return {"ok": False, "error": "DEEPSEEK_API_KEY is not set"}
+                    return "DEEPSEEK_API_KEY is not set"
                 try:
-                    self._deepseek_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com/v1")
+                    self._deepseek_client = AsyncOpenAI(
+                        api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, timeout=EXECUTOR_LLM_TIMEOUT_SECONDS,
+                        max_retries=0,
+                    )
                 except Exception as e:
-                    return {"ok": False, "error": f"Failed to init DeepSeek client: {e}"}
-
-        system_prompt = (
-            "You are a senior code editor. You will be given an existing file and a requested change. "
-            "Return ONLY the full updated file contents. Do not include markdown, code fences, or explanations. "
-            "Preserve existing style and imports unless changes require otherwise."
-        )
-        if language:
-            system_prompt += f" Language hint: {language}."
+                    return f"Failed to init DeepSeek client: {e}"
+        return None
 
-        user_content = (
-            "Apply the following change to the file.\n\n"
-            f"Change request:\n{instruction}\n\n"
-            "Current file contents:\n" + "```\n" + original + "\n```"
-        )
+    async def _llm_complete(
+        self,
+        backend: str,
+        model: str,
+        messages: list,
+        temperature: float,
+        max_tokens: int,
+        tool: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Run one chat completion under the shared rate limiter.
 
-        try:
-            if backend == "groq":
-                resp = self._groq_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_content},
-                    ],
-                    temperature=float(params.get("temperature", 0.2)),
-                    max_tokens=int(params.get("max_tokens", 8192)),
-                )
-                content = resp.choices[0].message.content or ""
-            else:
-                resp = self._deepseek_client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_content},
-                    ],
-                    temperature=float(params.get("temperature", 0.2)),
-                    max_tokens=int(params.get("max_tokens", 8192)),
+        Falls back from Groq to DeepSeek on an invalid Groq key. Every attempt
+        is recorded in llm_calls under the calling tool. Returns
+        {"ok": True, "content", "backend", "model"} or {"ok": False, "error"}.
+        """
+        async def _call(client, call_model):
+            # Cancelled (and the HTTP request aborted) once the per-call timeout passes
+            try:
+                raw = await asyncio.wait_for(
+                    client.chat.completions.with_raw_response.create(
+                        model=call_model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ),
+                    timeout=EXECUTOR_LLM_TIMEOUT_SECONDS,
                 )
-                content = resp.choices[0].message.content or ""
-        except Exception as e:
-            msg = str(e)
-            if backend == "groq" and DEEPSEEK_API_KEY and ("invalid api key" in msg.lower() or "401" in msg):
-                if not self._deepseek_client:
-                    try:
-                        self._deepseek_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com/v1")
-                    except Exception as ie:
-                        return {"ok": False, "error": f"DeepSeek init failed during fallback: {ie}"}
-                ds_model = model if model.lower().startswith("deepseek") else "deepseek-coder"
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{call_model} did not respond within {EXECUTOR_LLM_TIMEOUT_SECONDS:g}s") from None
+            resp = await raw.parse()
+            return resp.choices[0].message.content or "", getattr(resp, "usage", None), raw.headers
+
+        async def _attempt(call_backend, client, call_model, fallback):
+            started = time.perf_counter()
+            with llm_call_context(strategy_id=self.strategy_id, source="executor", agent=tool, fallback=fallback):
                 try:
-                    resp = self._deepseek_client.chat.completions.create(
-                        model=ds_model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_content},
-                        ],
-                        temperature=float(params.get("temperature", 0.2)),
-                        max_tokens=int(params.get("max_tokens", 8192)),
+                    content, usage, wait = await call_with_rate_limit_async(
+                        call_backend, call_model, messages, max_tokens, lambda: _call(client, call_model)
                     )
-                    content = resp.choices[0].message.content or ""
-                except Exception as de:
-                    return {"ok": False, "error": f"DeepSeek API error after fallback: {de}"}
-            else:
-                return {"ok": False, "error": f"{backend.capitalize()} API error: {e}"}
-
-        if not content:
-            return {"ok": False, "error": "Empty response from model"}
+                except Exception as e:
+                    record_llm_call(call_backend, call_model, latency_s=time.perf_counter() - started, error=e)
+                    raise
+                record_llm_call(
+                    call_backend,
+                    call_model,
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                    completion_tokens=getattr(usage, "completion_tokens", 0),
+                    queue_wait_s=wait,
+                    latency_s=time.perf_counter() - started - wait,
+                )
+            return content
 
-        new_code = self._strip_code_fences(content)
-        if not new_code.strip():
-            return {"ok": False, "error": "Model returned empty content after stripping fences"}
+        try:
+            admitted, max_tokens = budget_tracker.admit(self.strategy_id, model, max_tokens)
+        except BudgetExceeded as e:
+            return {"ok": False, "error": str(e), "budget_exceeded": e.as_dict()}
+        if admitted != model:
+            print(f"[Budget] {tool or 'llm'}: downgrading {model} -> {admitted}")
+            model, backend = admitted, self._backend_for(admitted)
+            init_error = self._ensure_client(backend)
+            if init_error:
+                return {"ok": False, "error": init_error}
 
-        tmp_path = p.with_suffix(p.suffix + ".tmp")
-        bak_path = p.with_suffix(p.suffix + ".bak")
+        client = self._groq_client if backend == "groq" else self._deepseek_client
         try:
-            tmp_path.write_text(new_code, encoding="utf-8", newline="\n")
-            if not bak_path.exists():
-                bak_path.write_text(original, encoding="utf-8", newline="\n")
-            tmp_path.replace(p)
+            content = await _attempt(backend, client, model, fallback=False)
+            return {"ok": True, "content": content, "backend": backend, "model": model}
         except Exception as e:
-            return {"ok": False, "error": f"Failed to write updated file: {e}"}
-        label = "Groq" if backend == "groq" else "DeepSeek"
-        print(f"[{label} Edit:{model}] Wrote {len(new_code)} bytes to {p}")
-        return {"ok": True, "file_path": str(p), "bytes": len(new_code), "backend": backend, "model": model}
+            msg = str(e)
+            if not (backend == "groq" and DEEPSEEK_API_KEY and ("invalid api key" in msg.lower() or "401" in msg)):
+                return {"ok": False, "error": f"{backend.capitalize()} API error: {e}"}
+
+        # Fallback to DeepSeek automatically
+        init_error = self._ensure_client("deepseek")
+        if init_error:
+            return {"ok": False, "error": f"DeepSeek init failed during fallback: {init_error}"}
+        ds_model = model if model.lower().startswith("deepseek") else "deepseek-coder"
+        try:
+            content = await _attempt("deepseek", self._deepseek_client, ds_model, fallback=True)
+        except Exception as de:
+            return {"ok": False, "error": f"DeepSeek API error after fallback: {de}"}
+        return {"ok": True, "content": content, "backend": "deepseek", "model": ds_model}
 
     # ---------------- Workspace management ----------------
     async def _execute_workspace(self, params: Dict[str, Any]):
@@ -575,29 +1425,60 @@ class ExecutorAgent:
         - app_name (str): Name of the app/workspace.
         - create_vscode (bool): If true, creates a .code-workspace file.
         - folders (list[str], optional): Subfolders to create under the app.
+        - template (str, optional): Local template to scaffold from (templates/, e.g. 'expo');
+          defaults to the plan's 'template' or WORKSPACE_DEFAULT_TEMPLATE.
+        - variables (dict, optional): Extra {{PLACEHOLDER}} values for the template.
         """
         app_name = params.get("app_name")
         if not app_name:
             return {"ok": False, "error": "'app_name' is required"}
         app_root = Path(APPS_ROOT) / app_name
         folders = params.get("folders") or ["src", "tests"]
+        template = params.get("template") or (self.plan or {}).get("template") or WORKSPACE_DEFAULT_TEMPLATE
         try:
             app_root.mkdir(parents=True, exist_ok=True)
             for folder in folders:
                 (app_root / folder).mkdir(parents=True, exist_ok=True)
             created = [str(app_root)] + [str(app_root / f) for f in folders]
+            result: Dict[str, Any] = {"ok": True, "created": created}
+            if template:
+                variables = template_variables(app_name, params.get("variables"))
+                tpl = await asyncio.to_thread(materialize_template, template, app_root, variables)
+                self._deps.stats["templates"] += 1
+                print(f"[Workspace] {app_name}: {len(tpl['files'])} files from template {tpl['template']}, {tpl['kept']} kept")
+                result["template"] = tpl
+            restored = await asyncio.to_thread(self._deps.restore_node_modules, app_root)
+            if restored:
+                print(f"[Workspace] {app_name}: node_modules restored from the dependency cache")
+                result["dependencies"] = restored
             if params.get("create_vscode"):
                 ws = {
                     "folders": [{"path": "."}],
                     "settings": {},
                 }
                 ws_path = app_root / f"{app_name}.code-workspace"
-                ws_path.write_text(json.dumps(ws, indent=2), encoding="utf-8")
+                write_atomic(ws_path, json.dumps(ws, indent=2).encode("utf-8"))
                 created.append(str(ws_path))
-            return {"ok": True, "created": created}
+            return result
         except Exception as e:
             return {"ok": False, "error": str(e)}
 
+    def _build_cache_for(self, app_name: Optional[str], cwd: str) -> BuildCache:
+        root = str(Path(APPS_ROOT) / app_name) if app_name else cwd
+        cache = self._build_caches.get(root)
+        if cache is None:
+            cache = self._build_caches[root] = BuildCache(Path(root), max_entries=BUILD_CACHE_MAX_ENTRIES)
+        return cache
+
+    def _manifest_for(self, app_name: Optional[str]) -> Optional[CodegenManifest]:
+        """Codegen manifest of the app (loaded once per executor); None without an app."""
+        if not app_name:
+            return None
+        manifest = self._manifests.get(app_name)
+        if manifest is None:
+            manifest = self._manifests[app_name] = CodegenManifest(Path(APPS_ROOT) / app_name)
+        return manifest
+
     # ---------------- Path resolution ----------------
     def _resolve_target_path(self, file_path: str, app_name: Optional[str]) -> Path:
         p = Path(file_path)
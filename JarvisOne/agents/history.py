@@ -0,0 +1,103 @@
+"""
+Board conversation history.
+
+Keeps each board message with its token count (computed once, when the message
+is added) and renders the prompt history for a turn within a token budget.
+When the selected messages do not fit, the oldest turns are swapped for short
+extractive summaries, which are cached per message so later turns reuse them.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional
+
+from ..services.tokens import estimate_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class HistoryEntry:
+    __slots__ = ("agent", "message", "text", "tokens", "summary", "summary_tokens")
+
+    def __init__(self, agent: str, message: str):
+        self.agent = agent
+        self.message = message
+        self.text = f"**{agent}**: {message}"
+        self.tokens = estimate_tokens(self.text)
+        self.summary: Optional[str] = None
+        self.summary_tokens = 0
+
+
+class ConversationHistory:
+    def __init__(self, summary_tokens: int = 80):
+        self.summary_tokens = summary_tokens
+        self._topic: Optional[HistoryEntry] = None
+        self._entries: Dict[str, HistoryEntry] = {}
+        self.full_tokens = 0
+        self.sent_tokens = 0
+
+    def set_topic(self, actor: str, topic: str) -> None:
+        self._topic = HistoryEntry(actor, topic)
+
+    def add(self, agent: str, message: str) -> None:
+        self._entries[agent] = HistoryEntry(agent, message)
+
+    def __contains__(self, agent: str) -> bool:
+        return agent in self._entries
+
+    def _summary(self, entry: HistoryEntry) -> str:
+        if entry.summary is None:
+            limit_chars = self.summary_tokens * 4
+            sentences = _SENTENCE_END.split(entry.message.strip())
+            picked = ""
+            for sentence in sentences:
+                candidate = f"{picked} {sentence}".strip()
+                if len(candidate) > limit_chars and picked:
+                    break
+                picked = candidate
+            if len(picked) > limit_chars:
+                picked = picked[:limit_chars].rstrip()
+            if picked != entry.message.strip():
+                picked += " …"
+            entry.summary = f"**{entry.agent}** (summary): {picked}"
+            entry.summary_tokens = estimate_tokens(entry.summary)
+        return entry.summary
+
+    def render(self, agents: List[str], budget: Optional[int] = None) -> str:
+        """Topic plus the given agents' messages (in order), fitted to budget tokens.
+
+        Older turns are compacted to summaries first; the newest turn is only
+        compacted, and the result hard-truncated, if nothing else fits.
+        """
+        entries = [self._entries[a] for a in agents if a in self._entries]
+        parts: List[HistoryEntry] = ([self._topic] if self._topic else []) + entries
+        if not parts:
+            return ""
+        texts = [p.text for p in parts]
+        sizes = [p.tokens for p in parts]
+        full = sum(sizes)
+
+        if budget and full > budget:
+            # Oldest turns first; the topic is kept verbatim
+            for idx in range(1 if self._topic else 0, len(parts)):
+                if sum(sizes) <= budget:
+                    break
+                texts[idx] = self._summary(parts[idx])
+                sizes[idx] = parts[idx].summary_tokens
+
+        text = "\n\n".join(texts)
+        sent = sum(sizes)
+        if budget and sent > budget:
+            # Still too large (e.g. a huge topic): keep the most recent text
+            text = "…" + text[-budget * 4:]
+            sent = estimate_tokens(text)
+        self.full_tokens += full
+        self.sent_tokens += sent
+        return text
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "full_prompt_tokens": self.full_tokens,
+            "sent_prompt_tokens": self.sent_tokens,
+            "saved_prompt_tokens": max(0, self.full_tokens - self.sent_tokens),
+        }
@@ -0,0 +1,112 @@
+"""
+Mission dependency graph
+
+Builds a DAG from the `dependencies` field of a plan's missions for the
+ExecutorAgent: topological order, cycle detection, which missions are ready
+to run, which are blocked by a failed dependency, and the critical path (the
+longest dependency chain by duration).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class MissionCycleError(ValueError):
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Mission dependency cycle: " + " -> ".join(cycle))
+
+
+class MissionGraph:
+    def __init__(self, missions: List[Dict[str, Any]]):
+        # Missions without an id (or with a repeated one) get a positional key
+        self.keys: List[str] = []
+        self.missions: Dict[str, Dict[str, Any]] = {}
+        for idx, mission in enumerate(missions):
+            key = str(mission.get("mission_id") or f"#{idx + 1}")
+            if key in self.missions:
+                key = f"{key}#{idx + 1}"
+            self.keys.append(key)
+            self.missions[key] = mission
+        self.unknown: Dict[str, List[str]] = {}
+        self.deps: Dict[str, List[str]] = {}
+        for key in self.keys:
+            deps = []
+            for dep in self.missions[key].get("dependencies") or []:
+                dep = str(dep)
+                if dep in self.missions and dep != key:
+                    if dep not in deps:
+                        deps.append(dep)
+                else:
+                    self.unknown.setdefault(key, []).append(dep)
+            self.deps[key] = deps
+        self.dependents: Dict[str, List[str]] = {key: [] for key in self.keys}
+        for key, deps in self.deps.items():
+            for dep in deps:
+                self.dependents[dep].append(key)
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Kahn's algorithm, keeping plan order among missions that are ready together."""
+        remaining = {key: len(deps) for key, deps in self.deps.items()}
+        position = {key: idx for idx, key in enumerate(self.keys)}
+        ready = [key for key in self.keys if remaining[key] == 0]
+        order: List[str] = []
+        while ready:
+            key = ready.pop(0)
+            order.append(key)
+            for child in self.dependents[key]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+                    ready.sort(key=position.__getitem__)
+        if len(order) < len(self.keys):
+            raise MissionCycleError(self._find_cycle({k for k, n in remaining.items() if n > 0}))
+        return order
+
+    def _find_cycle(self, candidates: Set[str]) -> List[str]:
+        # Walk dependencies inside the unresolved set until a mission repeats
+        start = next(key for key in self.keys if key in candidates)
+        path: List[str] = []
+        seen: Dict[str, int] = {}
+        node = start
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(dep for dep in self.deps[node] if dep in candidates)
+        return path[seen[node]:] + [node]
+
+    def ready(self, done: Iterable[str], started: Iterable[str]) -> List[str]:
+        """Missions (in topological order) whose dependencies are all done and that have not started."""
+        done, started = set(done), set(started)
+        return [key for key in self.order
+                if key not in started and all(dep in done for dep in self.deps[key])]
+
+    def blocked_by(self, failed: str) -> List[str]:
+        """Every mission that transitively depends on a failed one."""
+        out: List[str] = []
+        stack = list(self.dependents[failed])
+        while stack:
+            key = stack.pop()
+            if key not in out:
+                out.append(key)
+                stack.extend(self.dependents[key])
+        return [key for key in self.order if key in out]
+
+    def critical_path(self, durations: Dict[str, float]) -> Tuple[List[str], float]:
+        """Longest chain through the DAG by duration (missing durations count as 0)."""
+        finish: Dict[str, float] = {}
+        via: Dict[str, Optional[str]] = {}
+        for key in self.order:
+            best = max(self.deps[key], key=lambda d: finish[d], default=None)
+            finish[key] = (finish[best] if best else 0.0) + float(durations.get(key, 0.0))
+            via[key] = best
+        if not finish:
+            return [], 0.0
+        node: Optional[str] = max(self.order, key=lambda k: finish[k])
+        total = finish[node]
+        path: List[str] = []
+        while node:
+            path.append(node)
+            node = via[node]
+        return list(reversed(path)), total
@@ -0,0 +1,273 @@
+"""
+Patch-based file edits
+
+Lets the file_editor tool ask the model for only the changed parts of a file
+instead of the whole revised file. Two response formats are accepted:
+
+SEARCH/REPLACE blocks (preferred):
+
+    <<<<<<< SEARCH
+    exact lines from the current file
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+and unified diffs (`@@ -a,b +c,d @@` hunks). Patches are validated and applied
+locally; any block that does not match the file raises PatchError so the
+caller can fall back to a full rewrite. A block that only matches with
+different indentation has its replacement shifted by the same amount.
+Files too large for one prompt are split into line regions (split_regions)
+that are edited one at a time.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+NO_CHANGES = "NO_CHANGES"
+
+_BLOCK = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE,
+)
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+PATCH_SYSTEM_PROMPT = (
+    "You are a senior code editor. You will be given an existing file (or a region of it) and a requested change. "
+    "Return ONLY SEARCH/REPLACE blocks describing the edit, in this exact format:\n"
+    "<<<<<<< SEARCH\n<exact lines copied from the current file>\n=======\n<replacement lines>\n>>>>>>> REPLACE\n"
+    "Each SEARCH section must match the current text exactly (including indentation) and appear only once; "
+    "include a few unchanged lines for context when needed. Use an empty SEARCH section only to append to the end. "
+    "Use several small blocks rather than one large one. Preserve existing style and imports unless the change "
+    f"requires otherwise. If nothing needs to change, reply with {NO_CHANGES}. No explanations."
+)
+
+
+class PatchError(ValueError):
+    pass
+
+
+class EditBlock(NamedTuple):
+    search: str
+    replace: str
+
+
+def parse_edit_blocks(text: str) -> List[EditBlock]:
+    return [EditBlock(m.group(1), m.group(2)) for m in _BLOCK.finditer(text or "")]
+
+
+def _find_unique(haystack: str, needle: str) -> Optional[int]:
+    """Position of the only exact match of needle that starts at the beginning of a line."""
+    hits = []
+    pos = haystack.find(needle)
+    while pos != -1:
+        # SEARCH sections hold whole lines; a match in the middle of a line is a different place
+        if pos == 0 or haystack[pos - 1] == "\n" or needle.startswith("\n"):
+            hits.append(pos)
+            if len(hits) > 1:
+                raise PatchError(f"SEARCH text matches more than once: {needle.strip().splitlines()[0][:80]!r}")
+        pos = haystack.find(needle, pos + 1)
+    return hits[0] if hits else None
+
+
+def _loose_span(text: str, search: str) -> Optional[Tuple[int, int]]:
+    """Character span of search in text comparing lines with surrounding whitespace stripped."""
+    want = [line.strip() for line in search.strip("\n").splitlines()]
+    if not want:
+        return None
+    lines = text.splitlines(keepends=True)
+    have = [line.strip() for line in lines]
+    hits = [i for i in range(len(have) - len(want) + 1) if have[i:i + len(want)] == want]
+    if not hits:
+        return None
+    if len(hits) > 1:
+        raise PatchError(f"SEARCH text matches more than once: {want[0][:80]!r}")
+    start = sum(len(line) for line in lines[:hits[0]])
+    end = start + sum(len(line) for line in lines[hits[0]:hits[0] + len(want)])
+    return start, end
+
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip(" \t"))]
+
+
+def _reindent(found: List[str], search: List[str], replace: List[str]) -> List[str]:
+    """Shift replace lines by the indentation the file's matched lines have over the search lines."""
+    deltas = set()
+    for have, want in zip(found, search):
+        if not have.strip():
+            continue
+        have_indent, want_indent = _indent(have), _indent(want)
+        if have_indent.startswith(want_indent):
+            deltas.add(("+", have_indent[len(want_indent):]))
+        elif want_indent.startswith(have_indent):
+            deltas.add(("-", want_indent[len(have_indent):]))
+        else:
+            raise PatchError(f"SEARCH indentation does not match the file: {want.strip()[:80]!r}")
+    deltas.discard(("-", ""))
+    if len(deltas) > 1:
+        raise PatchError("SEARCH indentation differs from the file by varying amounts")
+    if not deltas or deltas == {("+", "")}:
+        return list(replace)
+    sign, pad = deltas.pop()
+    out = []
+    for line in replace:
+        if not line.strip():
+            out.append(line)
+        elif sign == "+":
+            out.append(pad + line)
+        elif line.startswith(pad):
+            out.append(line[len(pad):])
+        else:
+            raise PatchError(f"replacement is indented less than its SEARCH text: {line.strip()[:80]!r}")
+    return out
+
+
+def apply_edit_blocks(original: str, blocks: List[EditBlock]) -> str:
+    """Apply SEARCH/REPLACE blocks in order; raises PatchError when a block does not match."""
+    text = original
+    for block in blocks:
+        if not block.search.strip():
+            sep = "" if not text or text.endswith("\n") else "\n"
+            text = text + sep + block.replace
+            continue
+        pos = _find_unique(text, block.search)
+        if pos is not None:
+            text = text[:pos] + block.replace + text[pos + len(block.search):]
+            continue
+        span = _loose_span(text, block.search)
+        if span is None:
+            raise PatchError(f"SEARCH text not found: {block.search.strip().splitlines()[0][:80]!r}")
+        start, end = span
+        replacement = "".join(_reindent(
+            text[start:end].splitlines(),
+            block.search.strip("\n").splitlines(),
+            block.replace.splitlines(keepends=True),
+        ))
+        if text[start:end].endswith("\n") and replacement and not replacement.endswith("\n"):
+            replacement += "\n"
+        text = text[:start] + replacement + text[end:]
+    return text
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """Apply the hunks of a unified diff, locating each by its context (line numbers are only a hint)."""
+    lines = original.splitlines(keepends=True)
+    diff_lines = diff.splitlines()
+    hunks: List[Tuple[int, List[str], List[str]]] = []
+    idx = 0
+    while idx < len(diff_lines):
+        m = _HUNK.match(diff_lines[idx])
+        idx += 1
+        if not m:
+            continue
+        old, new = [], []
+        while idx < len(diff_lines) and not diff_lines[idx].startswith("@@"):
+            line = diff_lines[idx]
+            idx += 1
+            if line.startswith(("---", "+++")) and not old and not new:
+                continue
+            if line.startswith("\\"):
+                continue
+            tag, body = (line[:1], line[1:]) if line else (" ", "")
+            if tag == " ":
+                old.append(body)
+                new.append(body)
+            elif tag == "-":
+                old.append(body)
+            elif tag == "+":
+                new.append(body)
+            else:
+                break
+        hunks.append((int(m.group(1)) - 1, old, new))
+    if not hunks:
+        raise PatchError("no hunks found in diff")
+
+    offset = 0
+    for hint, old, new in hunks:
+        stripped = [line.rstrip("\r\n") for line in lines]
+        candidates = [i for i in range(len(stripped) - len(old) + 1) if stripped[i:i + len(old)] == old]
+        if not candidates:
+            loose = [o.strip() for o in old]
+            candidates = [i for i in range(len(stripped) - len(old) + 1)
+                          if [s.strip() for s in stripped[i:i + len(old)]] == loose]
+        if not candidates:
+            raise PatchError(f"hunk at line {hint + 1} does not match the file")
+        at = min(candidates, key=lambda i: abs(i - (hint + offset)))
+        new = _reindent(stripped[at:at + len(old)], old, new)
+        lines[at:at + len(old)] = [line + "\n" for line in new]
+        offset += len(new) - len(old)
+    text = "".join(lines)
+    if not original.endswith("\n") and text.endswith("\n"):
+        text = text[:-1]
+    return text
+
+
+def apply_patch_response(original: str, response: str) -> Tuple[str, int]:
+    """New file text from a model's patch reply, and the number of blocks/hunks applied."""
+    body = (response or "").strip()
+    if not body:
+        raise PatchError("empty patch response")
+    if body.strip("` \n") == NO_CHANGES:
+        return original, 0
+    blocks = parse_edit_blocks(body)
+    if blocks:
+        return apply_edit_blocks(original, blocks), len(blocks)
+    if re.search(r"^@@ -\d+", body, re.MULTILINE):
+        return apply_unified_diff(original, body), len(re.findall(r"^@@ -\d+", body, re.MULTILINE))
+    raise PatchError("response contains no SEARCH/REPLACE blocks or diff hunks")
+
+
+def check_python_syntax(path_name: str, original: str, text: str) -> None:
+    """Raise PatchError if an edit leaves a .py file that compiled before unable to compile."""
+    if not path_name.endswith(".py"):
+        return
+    try:
+        compile(original, path_name, "exec")
+    except (SyntaxError, ValueError):
+        return  # already broken; nothing to protect
+    try:
+        compile(text, path_name, "exec")
+    except SyntaxError as e:
+        raise PatchError(f"{path_name} would no longer compile: line {e.lineno}: {e.msg}")
+    except ValueError as e:
+        raise PatchError(f"{path_name} would no longer compile: {e}")
+
+
+def split_regions(text: str, max_chars: int) -> List[str]:
+    """Split text into consecutive line regions of at most max_chars, preferring blank-line boundaries.
+
+    Joining the regions gives back the original text.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    lines = text.splitlines(keepends=True)
+    regions: List[str] = []
+    current: List[str] = []
+    size = 0
+    last_break = -1
+    for line in lines:
+        if current and size + len(line) > max_chars:
+            # Cut at the last blank line in the second half of the region, else right here
+            cut = last_break + 1 if last_break >= len(current) // 2 else len(current)
+            regions.append("".join(current[:cut]))
+            current = current[cut:]
+            size = sum(len(x) for x in current)
+            last_break = max((i for i, x in enumerate(current) if not x.strip()), default=-1)
+        current.append(line)
+        size += len(line)
+        if not line.strip():
+            last_break = len(current) - 1
+    if current:
+        regions.append("".join(current))
+    return regions
+
+
+def region_prompt(instruction: str, region: str, index: int, total: int, path_name: str) -> str:
+    return (
+        f"The file {path_name} is too large to show at once; this is region {index} of {total}. "
+        "Apply the change request to this region only, and only where it applies here. "
+        "SEARCH sections must match text inside this region.\n\n"
+        f"Change request:\n{instruction}\n\n"
+        f"Region {index}/{total}:\n```\n{region}\n```"
+    )
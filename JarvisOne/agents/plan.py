@@ -0,0 +1,500 @@
+"""
+Final plan parsing and validation.
+
+Shared by the Board (when the LeadAgent finishes) and the ExecutorAgent (when
+it reloads the plan). The LeadAgent's output is extracted tolerantly
+(sentinels, code fences or the first balanced JSON object), common LLM JSON
+mistakes are repaired, and the result is checked against the plan schema from
+agents/prompts.py with a validator compiled once at import. Validation issues
+are grouped into fragments (the top-level fields, or one mission) so only the
+broken parts need to be re-prompted.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .mission_graph import MissionGraph, MissionCycleError
+
+PLAN_START = "<<JSON_START>>"
+PLAN_END = "<<JSON_END>>"
+PLAN_TOOLS = ("terminal", "code_generator", "file_editor", "workspace")
+ROOT_FRAGMENT = "root"
+
+_TOOL_ALIASES = {
+    "codegen": "code_generator",
+    "code-generator": "code_generator",
+    "code_gen": "code_generator",
+    "generator": "code_generator",
+    "file-editor": "file_editor",
+    "editor": "file_editor",
+    "edit": "file_editor",
+    "shell": "terminal",
+    "command": "terminal",
+    "cmd": "terminal",
+}
+
+# Params each tool cannot run without (a tuple means "any of")
+_REQUIRED_PARAMS = {
+    "code_generator": ("prompt", "file_path"),
+    "file_editor": ("file_path", ("instruction", "prompt")),
+    "terminal": ("command",),
+    "workspace": (),
+}
+
+
+class PlanIssue(NamedTuple):
+    path: Tuple[Any, ...]
+    message: str
+
+    def __str__(self) -> str:
+        return f"{format_path(self.path) or '<plan>'}: {self.message}"
+
+
+class PlanResult(NamedTuple):
+    plan: Optional[Dict[str, Any]]
+    issues: List[PlanIssue]
+    repaired: bool  # JSON needed repair before it parsed
+
+    @property
+    def ok(self) -> bool:
+        return self.plan is not None and not self.issues
+
+
+def format_path(path: Tuple[Any, ...]) -> str:
+    out = ""
+    for part in path:
+        out += f"[{part}]" if isinstance(part, int) else (f".{part}" if out else str(part))
+    return out
+
+
+# ---------------- Schema ----------------
+_STEP_SCHEMA = {
+    "type": "object",
+    "required": ["description", "tool", "params"],
+    "properties": {
+        "step_id": {"type": ("string", "integer")},
+        "description": {"type": "string", "min_length": 1},
+        "tool": {"type": "string", "enum": PLAN_TOOLS},
+        "params": {"type": "object"},
+    },
+}
+
+_MISSION_SCHEMA = {
+    "type": "object",
+    "required": ["mission_id", "title", "steps"],
+    "properties": {
+        "mission_id": {"type": "string", "min_length": 1},
+        "title": {"type": "string", "min_length": 1},
+        "description": {"type": "string"},
+        "owner": {"type": "string"},
+        "app_name": {"type": "string"},
+        "dependencies": {"type": "array", "items": {"type": "string"}},
+        "steps": {"type": "array", "min_items": 1, "items": _STEP_SCHEMA},
+        "acceptance_criteria": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "required": ["strategy_title", "tldr", "summary", "missions"],
+    "properties": {
+        "strategy_title": {"type": "string", "min_length": 1},
+        "app_name": {"type": "string"},
+        "tldr": {"type": "string", "min_length": 1},
+        "summary": {"type": "string", "min_length": 1},
+        "missions": {"type": "array", "min_items": 1, "items": _MISSION_SCHEMA},
+    },
+}
+
+_PY_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+Validator = Callable[[Any, Tuple[Any, ...], List[PlanIssue]], None]
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Turn a schema dict into a validator closure, resolving types and nested schemas up front."""
+    names = schema["type"] if isinstance(schema["type"], tuple) else (schema["type"],)
+    py_types = tuple(t for name in names for t in (_PY_TYPES[name] if isinstance(_PY_TYPES[name], tuple) else (_PY_TYPES[name],)))
+    type_label = " or ".join(names)
+    enum = frozenset(schema["enum"]) if "enum" in schema else None
+    min_length = schema.get("min_length")
+    min_items = schema.get("min_items")
+    required = tuple(schema.get("required", ()))
+    props = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    items = compile_schema(schema["items"]) if "items" in schema else None
+    rejects_bool = bool not in py_types
+
+    def validate(value: Any, path: Tuple[Any, ...], issues: List[PlanIssue]) -> None:
+        if not isinstance(value, py_types) or (rejects_bool and isinstance(value, bool)):
+            issues.append(PlanIssue(path, f"expected {type_label}, got {type(value).__name__}"))
+            return
+        if enum is not None and value not in enum:
+            issues.append(PlanIssue(path, f"must be one of {', '.join(sorted(enum))}"))
+        if min_length is not None and isinstance(value, str) and len(value.strip()) < min_length:
+            issues.append(PlanIssue(path, "must not be empty"))
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value or value[key] is None:
+                    issues.append(PlanIssue(path + (key,), "is required"))
+            for key, check in props.items():
+                if key in value and value[key] is not None:
+                    check(value[key], path + (key,), issues)
+        elif isinstance(value, list):
+            if min_items is not None and len(value) < min_items:
+                issues.append(PlanIssue(path, f"needs at least {min_items} item(s)"))
+            if items is not None:
+                for idx, item in enumerate(value):
+                    items(item, path + (idx,), issues)
+
+    return validate
+
+
+_validate_schema = compile_schema(PLAN_SCHEMA)
+
+
+# ---------------- Extraction and repair ----------------
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def _balanced_object(text: str) -> Optional[str]:
+    """The first {...} in text with balanced braces (string-aware), or its unterminated tail."""
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth, in_str, escaped = 0, False, False
+    for idx in range(start, len(text)):
+        ch = text[idx]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:idx + 1]
+    return text[start:]
+
+
+def extract_json_text(text: str) -> Optional[str]:
+    """Best-effort JSON object text from LLM output."""
+    if not isinstance(text, str):
+        return None
+    start = text.find(PLAN_START)
+    if start != -1:
+        text = text[start + len(PLAN_START):]
+    end = text.find(PLAN_END)
+    if end != -1:
+        text = text[:end]
+    fence = _FENCE.search(text)
+    if fence and "{" in fence.group(1):
+        text = fence.group(1)
+    return _balanced_object(text)
+
+
+def repair_json(text: str) -> str:
+    """Fix common LLM JSON mistakes outside string literals.
+
+    Handles smart quotes, // and /* */ comments, Python literals
+    (True/False/None), trailing commas and output cut off before the closing
+    brackets.
+    """
+    text = text.translate(_SMART_QUOTES)
+    out: List[str] = []
+    stack: List[str] = []
+    in_str = escaped = False
+    idx, n = 0, len(text)
+    while idx < n:
+        ch = text[idx]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+            idx += 1
+            continue
+        if ch == '"':
+            in_str = True
+        elif text.startswith("//", idx):
+            nl = text.find("\n", idx)
+            idx = n if nl == -1 else nl
+            continue
+        elif text.startswith("/*", idx):
+            close = text.find("*/", idx + 2)
+            idx = n if close == -1 else close + 2
+            continue
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            # Drop a trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+        else:
+            for word, repl in (("True", "true"), ("False", "false"), ("None", "null")):
+                if text.startswith(word, idx) and not (idx and (text[idx - 1].isalnum() or text[idx - 1] == "_")):
+                    end = idx + len(word)
+                    if end >= n or not (text[end].isalnum() or text[end] == "_"):
+                        out.append(repl)
+                        idx = end
+                        break
+            else:
+                out.append(ch)
+                idx += 1
+            continue
+        out.append(ch)
+        idx += 1
+
+    if in_str:
+        out.append('"')
+    # Truncated output: drop a dangling comma/colon/key and close what is open
+    repaired = "".join(out).rstrip()
+    if stack:
+        repaired = re.sub(r',\s*"[^"]*"\s*:?\s*$', "", repaired)
+        repaired = re.sub(r"[,:]\s*$", "", repaired)
+        repaired += "".join(reversed(stack))
+    return repaired
+
+
+def load_plan_json(text: str) -> Tuple[Optional[Dict[str, Any]], bool, Optional[str]]:
+    """Parse the plan object from LLM output: (plan, repaired, error)."""
+    raw = extract_json_text(text)
+    if raw is None:
+        return None, False, "no JSON object found"
+    try:
+        value = json.loads(raw)
+        repaired = False
+    except ValueError:
+        try:
+            value = json.loads(repair_json(raw))
+            repaired = True
+        except ValueError as e:
+            return None, True, f"invalid JSON: {e}"
+    if not isinstance(value, dict):
+        return None, repaired, "top-level JSON value is not an object"
+    return value, repaired, None
+
+
+# ---------------- Normalization and validation ----------------
+def _as_list(value: Any) -> Any:
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return value
+
+
+def normalize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce harmless shape differences in place (aliases, scalars for lists)."""
+    if "strategy_title" not in plan and isinstance(plan.get("title"), str):
+        plan["strategy_title"] = plan["title"]
+    missions = plan.get("missions")
+    if isinstance(missions, dict):
+        plan["missions"] = missions = list(missions.values())
+    for mission in missions if isinstance(missions, list) else []:
+        if not isinstance(mission, dict):
+            continue
+        if isinstance(mission.get("mission_id"), int):
+            mission["mission_id"] = str(mission["mission_id"])
+        for key in ("dependencies", "acceptance_criteria"):
+            if key in mission:
+                mission[key] = _as_list(mission[key]) if mission[key] is not None else []
+        if isinstance(mission.get("dependencies"), list):
+            mission["dependencies"] = [str(d) for d in mission["dependencies"] if d is not None]
+        for step in mission.get("steps") or [] if isinstance(mission.get("steps"), list) else []:
+            if not isinstance(step, dict):
+                continue
+            tool = step.get("tool") or step.get("type")
+            if isinstance(tool, str):
+                tool = tool.strip().lower()
+                step["tool"] = _TOOL_ALIASES.get(tool, tool)
+            if step.get("params") is None:
+                step["params"] = {}
+    return plan
+
+
+def validate_plan(plan: Dict[str, Any]) -> List[PlanIssue]:
+    """Schema issues plus cross-field checks (unique ids, known and acyclic dependencies, tool params)."""
+    issues: List[PlanIssue] = []
+    _validate_schema(plan, (), issues)
+    missions = plan.get("missions") if isinstance(plan.get("missions"), list) else []
+    ids = [m.get("mission_id") for m in missions if isinstance(m, dict)]
+    seen = set()
+    for idx, mission in enumerate(missions):
+        if not isinstance(mission, dict):
+            continue
+        mid = mission.get("mission_id")
+        if mid in seen:
+            issues.append(PlanIssue(("missions", idx, "mission_id"), f"duplicate mission_id {mid!r}"))
+        seen.add(mid)
+        deps = mission.get("dependencies")
+        for dep in deps if isinstance(deps, list) else []:
+            if dep not in ids:
+                issues.append(PlanIssue(("missions", idx, "dependencies"), f"unknown mission_id {dep!r}"))
+            elif dep == mid:
+                issues.append(PlanIssue(("missions", idx, "dependencies"), "mission depends on itself"))
+        steps = mission.get("steps")
+        for sidx, step in enumerate(steps if isinstance(steps, list) else []):
+            if not isinstance(step, dict) or not isinstance(step.get("params"), dict):
+                continue
+            for need in _REQUIRED_PARAMS.get(step.get("tool"), ()):
+                options = need if isinstance(need, tuple) else (need,)
+                if not any(step["params"].get(opt) for opt in options):
+                    issues.append(PlanIssue(("missions", idx, "steps", sidx, "params", options[0]),
+                                            f"is required for {step.get('tool')} steps"))
+    if not any(i.path[2:3] == ("dependencies",) for i in issues):
+        try:
+            MissionGraph([m for m in missions if isinstance(m, dict)])
+        except MissionCycleError as e:
+            idx = ids.index(e.cycle[0]) if e.cycle[0] in ids else 0
+            issues.append(PlanIssue(("missions", idx, "dependencies"), str(e)))
+    return issues
+
+
+def parse_plan(text: str) -> PlanResult:
+    plan, repaired, error = load_plan_json(text)
+    if plan is None:
+        return PlanResult(None, [PlanIssue((), error or "unparseable plan")], repaired)
+    normalize_plan(plan)
+    return PlanResult(plan, validate_plan(plan), repaired)
+
+
+def extract_plan_object(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in LLM output (after repair), as-is, or None."""
+    value, _repaired, _error = load_plan_json(text)
+    return value
+
+
+def extract_plan(text: str) -> Optional[Dict[str, Any]]:
+    """Parsed (and repaired) plan object without schema validation, or None."""
+    plan, _repaired, _error = load_plan_json(text)
+    return normalize_plan(plan) if plan is not None else None
+
+
+def render_plan(plan: Dict[str, Any]) -> str:
+    return f"{PLAN_START}{json.dumps(plan, indent=2, ensure_ascii=False)}{PLAN_END}"
+
+
+# ---------------- Fragments ----------------
+def fragment_key(issue: PlanIssue) -> str:
+    """'missions[i]' for issues inside one mission, otherwise the top-level 'root' fragment."""
+    path = issue.path
+    if len(path) >= 2 and path[0] == "missions" and isinstance(path[1], int):
+        return f"missions[{path[1]}]"
+    return ROOT_FRAGMENT
+
+
+def invalid_fragments(plan: Dict[str, Any], issues: List[PlanIssue]) -> Dict[str, Dict[str, Any]]:
+    """Fragments that need fixing: key -> {"value": current JSON, "issues": [messages]}."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for issue in issues:
+        key = fragment_key(issue)
+        if key not in out:
+            if key == ROOT_FRAGMENT:
+                value = {k: v for k, v in plan.items() if k != "missions"}
+                value["mission_ids"] = [m.get("mission_id") for m in plan.get("missions") or [] if isinstance(m, dict)]
+            else:
+                value = plan["missions"][int(key[len("missions["):-1])]
+            out[key] = {"value": value, "issues": []}
+        out[key]["issues"].append(str(issue))
+    return out
+
+
+def apply_fragments(plan: Dict[str, Any], fixes: Dict[str, Any]) -> Dict[str, Any]:
+    """Splice corrected fragments back into the plan (unknown keys are ignored)."""
+    missions = plan.get("missions") if isinstance(plan.get("missions"), list) else []
+    for key, value in (fixes or {}).items():
+        if isinstance(value, dict) and set(value) <= {"value", "issues"} and isinstance(value.get("value"), dict):
+            # The model echoed the request envelope back
+            value = value["value"]
+        if not isinstance(value, dict):
+            continue
+        if key == ROOT_FRAGMENT:
+            value.pop("mission_ids", None)
+            new_missions = value.pop("missions", None)
+            plan.update(value)
+            if isinstance(new_missions, list) and not missions:
+                plan["missions"] = missions = new_missions
+        elif key.startswith("missions[") and key.endswith("]"):
+            try:
+                idx = int(key[len("missions["):-1])
+            except ValueError:
+                continue
+            if 0 <= idx < len(missions):
+                missions[idx] = value
+    return normalize_plan(plan)
+
+
+def drop_invalid_missions(plan: Dict[str, Any], issues: List[PlanIssue]) -> List[str]:
+    """Remove missions that still fail validation, and missions depending on them.
+
+    Returns the removed mission ids.
+    """
+    missions = plan.get("missions") if isinstance(plan.get("missions"), list) else []
+    bad = {int(fragment_key(i)[len("missions["):-1]) for i in issues if fragment_key(i) != ROOT_FRAGMENT}
+    removed = {str(missions[i].get("mission_id")) if isinstance(missions[i], dict) else f"#{i}" for i in bad}
+    changed = True
+    while changed:
+        changed = False
+        for idx, mission in enumerate(missions):
+            if idx in bad or not isinstance(mission, dict):
+                continue
+            if removed.intersection(mission.get("dependencies") or []):
+                bad.add(idx)
+                removed.add(str(mission.get("mission_id")))
+                changed = True
+    plan["missions"] = [m for idx, m in enumerate(missions) if idx not in bad]
+    return sorted(removed)
+
+
+def fragment_repair_messages(topic: str, plan: Dict[str, Any], fragments: Dict[str, Dict[str, Any]]) -> List[dict]:
+    """Chat messages asking the LeadAgent to fix only the listed plan fragments."""
+    system = (
+        "You are the LeadAgent. Parts of your final project plan failed validation. "
+        "Fix ONLY the fragments given, keeping everything that is valid unchanged. "
+        "Each step needs step_id, description, tool (one of " + ", ".join(PLAN_TOOLS) + ") and params; "
+        "code_generator params need prompt and file_path, file_editor params need file_path and instruction, "
+        "terminal params need command. Mission dependencies may only name existing mission_ids. "
+        f"Return a single JSON object wrapped in {PLAN_START} and {PLAN_END}, mapping each fragment key "
+        "to its corrected JSON value. No other text."
+    )
+    user = (
+        f"Topic: {topic}\n"
+        f"Plan title: {plan.get('strategy_title', '')}\n"
+        f"Plan summary: {plan.get('summary', '')}\n\n"
+        "Fragments to fix:\n"
+        + json.dumps(fragments, indent=2, ensure_ascii=False)
+    )
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+
+def reformat_messages(raw_output: str, error: str, limit_chars: int = 16000) -> List[dict]:
+    """Chat messages asking the LeadAgent to re-emit unparseable output as valid JSON."""
+    system = (
+        "You are the LeadAgent. Your final plan could not be parsed as JSON. Re-emit the SAME plan "
+        f"as one valid JSON object wrapped in {PLAN_START} and {PLAN_END}. Do not change its content. No other text."
+    )
+    user = f"Parser error: {error}\n\nYour previous output:\n{raw_output[:limit_chars]}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
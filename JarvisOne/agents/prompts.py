@@ -14,7 +14,7 @@ FINAL_PLAN_JSON_REQUIREMENTS = (
   "missions (array). Each mission must include: mission_id (uuid), title, description, owner, app_name, "
   "dependencies (array of mission_id), steps (array), acceptance_criteria (array), status. Steps must be atomic and each step includes: "
   "step_id (int), description, tool (one of 'terminal','code_generator','file_editor','workspace'), params (object). "
-  "In params, include app_name consistently and file_path relative to the app root when writing files. Optional: model to select backend, e.g., 'llama-3.1-8b-instant' (Groq) or 'deepseek-coder'/'deepseek-coder-v2' (DeepSeek)."
+  "In params, include app_name consistently and file_path relative to the app root when writing files. Terminal steps that build, lint or test may list params.inputs (globs of the files they read) and params.outputs (globs of what they produce) so unchanged builds are skipped. Optional: model to select backend, e.g., 'llama-3.1-8b-instant' (Groq) or 'deepseek-coder'/'deepseek-coder-v2' (DeepSeek)."
 )
 
 # Minimal agent prompts dict so imports do not fail; you can expand these as needed
@@ -27,13 +27,29 @@ AGENT_PROMPTS = {
   "Hephaestus": (
     "You propose technical blueprint and concrete steps. "
     "Ensure steps include params.app_name and file_path relative to the app root. "
-    "Use 'workspace' tool first to create the app scaffolding when needed."
+    "Use 'workspace' tool first to create the app scaffolding when needed; for Expo/React Native apps "
+    "set params.template to 'expo' instead of running npx create-expo-app."
   ),
 }
 
+# Per-agent settings. Besides model/system_prompt, optional keys:
+# - cache (bool, default True): set False to bypass the planner completion cache
+# - latency_critical (bool, default False): hedge the turn to the fallback provider
+#   when the primary runs past its p95 latency
+# - depends_on (list[str]): earlier agents whose output this turn reads. Turns whose
+#   dependencies are done run concurrently; omitted means every earlier agent in TURN_ORDER.
+#   The lists mirror each prompt's "Review" line: SalesOptimizer and Designer work from
+#   MarketScout's pain point and solution, Hephaestus from that plus Designer's user flow.
+#   Pricing reaches the plan through CPO and LeadAgent, which still see every turn. An
+#   agent cannot read a turn that may still be running, so widening a list serializes turns;
+#   BOARD_PARALLEL_TURNS=0 gives every agent the full history again.
+# - history_budget (int): prompt-history token budget for this agent; older turns are
+#   compacted to summaries beyond it (default BOARD_HISTORY_TOKEN_BUDGET)
 AGENT_PROMPTS = {
     "MarketScout": {
         "model": "llama-3.1-8b-instant",
+        "depends_on": [],
+        "latency_critical": True,
         "system_prompt": """You are MarketScout, a market psychologist. Your goal is to identify a single, acute pain point for a specific user persona using the 'Jobs to be Done' framework.
         - **Problem:** Don't just find a topic, find a deep, frustrating pain point. What is the user's real struggle?
         - **Solution:** Propose a single-feature app that solves ONLY this one pain point. No extra features.
@@ -42,6 +58,7 @@ AGENT_PROMPTS = {
     },
     "SalesOptimizer": {
         "model": "llama-3.1-8b-instant",
+        "depends_on": ["MarketScout"],
         "system_prompt": """You are SalesOptimizer, a specialist in psychological pricing. Your goal is to make the single-feature solution irresistible.
         - **Review:** Analyze the pain point and the proposed single-feature solution.
         - **Tactic:** Propose a pricing model using a specific psychological tactic (e.g., charm pricing like $4.99, decoy pricing, creating perceived value). Frame it around an emotional benefit.
@@ -50,6 +67,7 @@ AGENT_PROMPTS = {
     },
     "Designer": {
         "model": "llama-3.1-8b-instant",
+        "depends_on": ["MarketScout"],
         "system_prompt": """You are Designer, a behavioral design expert. Your goal is to make the single-feature app feel effortless and satisfying.
         - **Review:** Understand the single pain point and the single-feature solution.
         - **Design:** Describe the user flow for ONLY that one feature. Use a principle like the Fogg Behavior Model (Motivation, Ability, Prompt) to explain why the design works.
@@ -58,6 +76,7 @@ AGENT_PROMPTS = {
     },
     "Hephaestus": {
         "model": "llama-3.1-8b-instant",
+        "depends_on": ["MarketScout", "Designer"],
         "system_prompt": """You are Hephaestus, a minimalist programmer. Your goal is to define the technical blueprint for the single-feature solution.
         - **Review:** Analyze the proposed feature and user flow.
         - **Blueprint:**
@@ -70,6 +89,7 @@ AGENT_PROMPTS = {
     },
     "CPO": {
         "model": "llama-3.1-8b-instant",
+        "depends_on": ["MarketScout", "SalesOptimizer", "Designer", "Hephaestus"],
         "system_prompt": """You are the CPO (Chief Product Officer), the voice of reason. Your job is to critique the plan developed by the previous agents to make it more focused and viable.
         - **Review:** Analyze the ideas from MarketScout, SalesOptimizer, Designer, and Hephaestus.
         - **Critique:** Identify the weakest part of the plan. Is the monetization strategy too complex for an MVP? Is the feature still too broad? Is the technical plan over-engineered? Be specific and ruthless in your feedback.
@@ -79,6 +99,8 @@ AGENT_PROMPTS = {
     },
     "LeadAgent": {
         "model": "llama-3.3-70b-versatile",
+        "history_budget": 6000,
+        "depends_on": ["MarketScout", "SalesOptimizer", "Designer", "Hephaestus", "CPO"],
         "system_prompt": """You are the LeadAgent, a senior project manager. Your task is to synthesize the discussion and the CPO's final critique into a complete, highly granular, and actionable project plan.
 
 **Your Task:**
@@ -126,3 +148,23 @@ AGENT_PROMPTS = {
 ```"""
     }
 }
+
+
+def turn_dependencies() -> dict:
+    """Map each agent in TURN_ORDER to the earlier agents it depends on.
+
+    Dependencies must name agents that come earlier in TURN_ORDER, which keeps
+    the graph acyclic and the logged order deterministic.
+    """
+    graph = {}
+    for idx, name in enumerate(TURN_ORDER):
+        earlier = TURN_ORDER[:idx]
+        declared = AGENT_PROMPTS.get(name, {}).get("depends_on")
+        if declared is None:
+            graph[name] = list(earlier)
+            continue
+        unknown = [d for d in declared if d not in earlier]
+        if unknown:
+            raise ValueError(f"{name} depends on {unknown}, which do not precede it in TURN_ORDER")
+        graph[name] = [d for d in earlier if d in declared]
+    return graph
@@ -0,0 +1,151 @@
+"""
+Step batching
+
+Groups a mission's steps into batches that can run concurrently. Each step
+has a file-level read/write set, declared in params (`reads` / `writes`) or
+inferred from its tool: code_generator writes `file_path`, file_editor reads
+and writes it. Consecutive steps join a batch while they do not touch
+overlapping paths (the same file, or a file inside a directory another step
+writes). Terminal, workspace and unknown steps are barriers and always run
+alone.
+
+Steps in a batch print into their own buffer (see buffered_output), which the
+ExecutorAgent writes out in step order, so output reads as if the steps ran
+one after another. sys.stdout is only redirected while some batch is running.
+"""
+from __future__ import annotations
+
+import contextvars
+import io
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import PurePath
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+PARALLEL_TOOLS = ("code_generator", "file_editor")
+
+
+class StepAccess(NamedTuple):
+    reads: Set[str]
+    writes: Set[str]
+    barrier: bool
+
+
+def _as_paths(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value if v]
+
+
+def step_access(step: Dict[str, Any], resolve: Callable[[str, Optional[str]], Any]) -> StepAccess:
+    """Read/write set of a step; resolve(file_path, app_name) maps plan paths to disk paths."""
+    tool = step.get("tool")
+    params = step.get("params") or {}
+    if tool not in PARALLEL_TOOLS or params.get("barrier"):
+        return StepAccess(set(), set(), True)
+    app_name = params.get("app_name")
+
+    def norm(paths: List[str]) -> Set[str]:
+        return {str(PurePath(str(resolve(p, app_name)))).replace("\\", "/").rstrip("/").lower() for p in paths}
+
+    reads = norm(_as_paths(params.get("reads")))
+    writes = norm(_as_paths(params.get("writes")))
+    target = params.get("file_path")
+    if not target:
+        # Let the tool report the missing param, without racing anything else
+        return StepAccess(reads, writes, True)
+    writes |= norm([target])
+    if tool == "file_editor":
+        reads |= norm([target])
+    return StepAccess(reads, writes, False)
+
+
+def _overlaps(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def conflicts(a: StepAccess, b: StepAccess) -> bool:
+    """Write/write or read/write overlap between two steps (barriers conflict with everything)."""
+    if a.barrier or b.barrier:
+        return True
+    for w in a.writes:
+        if any(_overlaps(w, p) for p in b.writes | b.reads):
+            return True
+    for w in b.writes:
+        if any(_overlaps(w, p) for p in a.reads):
+            return True
+    return False
+
+
+def plan_batches(steps: List[Dict[str, Any]], resolve: Callable[[str, Optional[str]], Any],
+                 max_batch: int = 0) -> List[List[int]]:
+    """Indexes of steps grouped into consecutive, conflict-free batches (plan order is kept)."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    accesses: List[StepAccess] = []
+    for idx, step in enumerate(steps):
+        access = step_access(step, resolve)
+        full = max_batch and len(current) >= max_batch
+        if current and (full or any(conflicts(access, other) for other in accesses)):
+            batches.append(current)
+            current, accesses = [], []
+        current.append(idx)
+        accesses.append(access)
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ---------------- Per-task output buffering ----------------
+_output_buffer: contextvars.ContextVar[Optional[io.StringIO]] = contextvars.ContextVar("step_output", default=None)
+# Blocks currently inside buffered_output(); the proxy is installed by the first and removed by the last
+_active_buffers = 0
+_stdout_lock = threading.Lock()
+
+
+class _ContextStdout:
+    """sys.stdout proxy that writes into the current context's buffer when one is set."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def write(self, text: str) -> int:
+        buf = _output_buffer.get()
+        if buf is not None:
+            return buf.write(text)
+        return self._target.write(text)
+
+    def flush(self) -> None:
+        if _output_buffer.get() is None:
+            self._target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+@contextmanager
+def buffered_output():
+    """Collect everything printed inside the block (and tasks it starts) into a StringIO.
+
+    sys.stdout is wrapped while at least one block is active (concurrent
+    batches share the wrapper) and restored when the last one exits.
+    """
+    global _active_buffers
+    with _stdout_lock:
+        if _active_buffers == 0 and not isinstance(sys.stdout, _ContextStdout):
+            sys.stdout = _ContextStdout(sys.stdout)
+        _active_buffers += 1
+    buf = io.StringIO()
+    token = _output_buffer.set(buf)
+    try:
+        yield buf
+    finally:
+        _output_buffer.reset(token)
+        with _stdout_lock:
+            _active_buffers -= 1
+            # Leave stdout alone if someone replaced it in the meantime
+            if _active_buffers == 0 and isinstance(sys.stdout, _ContextStdout):
+                sys.stdout = sys.stdout._target
@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -19,6 +20,10 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "")
 # Optional OpenAI key (used only if explicitly selected or as last-resort)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+# Provider endpoints; point both at scripts/fake_llm_server.py for offline load tests, e.g.
+# GROQ_BASE_URL=http://127.0.0.1:8900  DEEPSEEK_BASE_URL=http://127.0.0.1:8900/v1
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "").strip() or None
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "").strip() or "https://api.deepseek.com/v1"
 
 # Board planning provider/model (for Market/CPO/Lead planning)
 # PLANNER_PROVIDER: 'auto' | 'groq' | 'deepseek' | 'openai' | 'mock'
@@ -43,3 +48,167 @@ def _compute_default_apps_root():
 # Root folder where generated apps/workspaces will live
 APPS_ROOT = _compute_default_apps_root()
 
+
+
+def _env_flag(name: str, default: bool) -> bool:
+	val = os.environ.get(name)
+	if val is None or not val.strip():
+		return default
+	return val.strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _env_list(name: str) -> set:
+	return {item.strip() for item in os.environ.get(name, "").split(",") if item.strip()}
+
+
+# Planner completion cache (see services/llm_cache.py)
+LLM_CACHE_ENABLED = _env_flag("LLM_CACHE_ENABLED", True)
+# LLM_CACHE_MODE: 'deterministic' (default) only caches temperature == 0 calls; 'all' also caches
+# sampled calls, so repeated board turns at temperature > 0 return the same answer
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "deterministic").lower().strip()
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH") or str(PKG_DIR / ".cache" / "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Comma-separated agent names that never read from or write to the cache
+LLM_CACHE_DISABLED_AGENTS = _env_list("LLM_CACHE_DISABLED_AGENTS")
+
+# Action log (see services/action_log.py): tool calls and executor steps are written to actions_log
+# by a background writer; payloads longer than ACTION_LOG_PAYLOAD_CHARS are truncated there and
+# spilled in full (gzip) to ACTION_LOG_SPILL_DIR, kept for ACTION_LOG_SPILL_MAX_AGE_DAYS (0 = forever)
+ACTION_LOG_PAYLOAD_CHARS = int(os.environ.get("ACTION_LOG_PAYLOAD_CHARS", "4000"))
+ACTION_LOG_SPILL_DIR = os.environ.get("ACTION_LOG_SPILL_DIR") or str(PKG_DIR / ".cache" / "action_payloads")
+ACTION_LOG_SPILL_MAX_AGE_DAYS = float(os.environ.get("ACTION_LOG_SPILL_MAX_AGE_DAYS", "14"))
+# Actions waiting for the writer; beyond this, new actions are dropped and counted
+ACTION_LOG_QUEUE_SIZE = int(os.environ.get("ACTION_LOG_QUEUE_SIZE", "10000"))
+
+# GET /public/llm/usage without since or strategy_id only covers this many recent hours (0 = all calls)
+LLM_USAGE_DEFAULT_WINDOW_HOURS = float(os.environ.get("LLM_USAGE_DEFAULT_WINDOW_HOURS", "24"))
+
+# Provider router (see services/provider_router.py)
+ROUTER_EWMA_ALPHA = float(os.environ.get("ROUTER_EWMA_ALPHA", "0.3"))
+# Consecutive failures before a provider/model circuit opens, and how long it stays open
+ROUTER_FAILURE_THRESHOLD = int(os.environ.get("ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN_SECONDS = float(os.environ.get("ROUTER_COOLDOWN_SECONDS", "30"))
+# Hedged requests fire once the primary exceeds this latency quantile
+ROUTER_HEDGE_QUANTILE = float(os.environ.get("ROUTER_HEDGE_QUANTILE", "0.95"))
+ROUTER_HEDGE_MIN_SAMPLES = int(os.environ.get("ROUTER_HEDGE_MIN_SAMPLES", "5"))
+# Hedge delay (seconds) used until enough latency samples exist
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.environ.get("ROUTER_HEDGE_DEFAULT_DELAY", "8"))
+
+# Provider rate limiting (see services/rate_limiter.py)
+RATE_LIMIT_ENABLED = _env_flag("RATE_LIMIT_ENABLED", True)
+# JSON overrides merged over the free-tier defaults, e.g.
+# {"groq": {"*": {"rpm": 30, "tpm": 6000}, "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000}}}
+try:
+	LLM_RATE_LIMITS = json.loads(os.environ.get("LLM_RATE_LIMITS") or "{}")
+except ValueError:
+	LLM_RATE_LIMITS = {}
+# How many times a 429 is retried (after honoring Retry-After) before failing the call
+RATE_LIMIT_MAX_RETRIES = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", "4"))
+# Completion tokens reserved pre-flight (capped by max_tokens); settled to actual usage afterwards
+RATE_LIMIT_COMPLETION_ESTIMATE = int(os.environ.get("RATE_LIMIT_COMPLETION_ESTIMATE", "512"))
+# Callers queued longer than this fail instead of waiting indefinitely
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", "300"))
+# Keep bucket levels in SQLite so the API process and executor workers share one budget;
+# 0 keeps them in memory, limiting each process separately
+RATE_LIMIT_SHARED = _env_flag("RATE_LIMIT_SHARED", True)
+
+# Board turn scheduling: run turns concurrently once their declared dependencies
+# (AGENT_PROMPTS[...]["depends_on"]) are done; off = strictly sequential TURN_ORDER
+BOARD_PARALLEL_TURNS = _env_flag("BOARD_PARALLEL_TURNS", True)
+# Default prompt-history token budget per board turn (AGENT_PROMPTS "history_budget" overrides)
+BOARD_HISTORY_TOKEN_BUDGET = int(os.environ.get("BOARD_HISTORY_TOKEN_BUDGET", "3000"))
+# Resume board discussions left unfinished by a previous process in the background at startup
+BOARD_AUTO_RESUME = _env_flag("BOARD_AUTO_RESUME", False)
+
+# Topics at least this similar (cosine of hashed topic embeddings, 0..1) to an existing
+# strategy are offered for reuse/fork on /board/generate instead of a new discussion
+TOPIC_SIMILARITY_THRESHOLD = float(os.environ.get("TOPIC_SIMILARITY_THRESHOLD", "0.8"))
+
+# Spending budgets (see services/budgets.py); 0 disables a limit
+# Tokens (prompt + completion) and active wall-clock seconds per strategy, board + execution
+STRATEGY_TOKEN_BUDGET = int(os.environ.get("STRATEGY_TOKEN_BUDGET", "300000"))
+STRATEGY_TIME_BUDGET_SECONDS = float(os.environ.get("STRATEGY_TIME_BUDGET_SECONDS", "3600"))
+# Tokens per user over a rolling 24 hours, across all of their strategies
+USER_DAILY_TOKEN_BUDGET = int(os.environ.get("USER_DAILY_TOKEN_BUDGET", "2000000"))
+# Fraction of any budget after which calls switch to the cheaper model in MODEL_DOWNGRADES
+BUDGET_DOWNGRADE_AT = float(os.environ.get("BUDGET_DOWNGRADE_AT", "0.8"))
+# Token usage is re-read from llm_calls when older than this, so spend by other processes counts
+BUDGET_REFRESH_SECONDS = float(os.environ.get("BUDGET_REFRESH_SECONDS", "2"))
+_DEFAULT_MODEL_DOWNGRADES = {
+	"llama-3.3-70b-versatile": "llama-3.1-8b-instant",
+	"deepseek-reasoner": "deepseek-chat",
+}
+# Unset uses the defaults above; MODEL_DOWNGRADES={} disables downgrades
+try:
+	MODEL_DOWNGRADES = json.loads(os.environ["MODEL_DOWNGRADES"]) if "MODEL_DOWNGRADES" in os.environ else _DEFAULT_MODEL_DOWNGRADES
+except ValueError:
+	MODEL_DOWNGRADES = _DEFAULT_MODEL_DOWNGRADES
+
+# Re-prompt rounds for fixing invalid fragments of the LeadAgent's final plan (agents/plan.py);
+# missions still invalid afterwards are dropped before the strategy is saved
+PLAN_REPAIR_MAX_ROUNDS = int(os.environ.get("PLAN_REPAIR_MAX_ROUNDS", "2"))
+
+# Missions the ExecutorAgent runs at once; a mission starts when all of its `dependencies` completed
+# and no running mission writes the same app directory
+EXECUTOR_MAX_PARALLEL_MISSIONS = int(os.environ.get("EXECUTOR_MAX_PARALLEL_MISSIONS", "3"))
+# code_generator/file_editor steps of one mission run at once when they touch different files (1 = in order)
+EXECUTOR_MAX_PARALLEL_STEPS = int(os.environ.get("EXECUTOR_MAX_PARALLEL_STEPS", "4"))
+# Per-call timeout for the ExecutorAgent's code_generator/file_editor LLM requests
+EXECUTOR_LLM_TIMEOUT_SECONDS = float(os.environ.get("EXECUTOR_LLM_TIMEOUT_SECONDS", "120"))
+
+# Executor console output: "debug" also prints every step, each terminal command with its
+# stdout/stderr tail, and every file written or edited; "info" prints missions, failures and
+# the summary (per-step records are in actions_log either way)
+EXECUTOR_LOG_LEVEL = os.environ.get("EXECUTOR_LOG_LEVEL", "info").lower().strip()
+
+# Executor service (workers/executor_service.py): executions and quick edits run in up to
+# EXECUTOR_WORKERS worker processes fed by the executor_jobs queue, one job per app directory at a time
+EXECUTOR_WORKERS = int(os.environ.get("EXECUTOR_WORKERS", "2"))
+# Run the service inside the API server; set to 0 when it runs on its own
+# (python -m JarvisOne.workers.executor_service) and the API only queues jobs
+EXECUTOR_SERVICE_EMBEDDED = _env_flag("EXECUTOR_SERVICE_EMBEDDED", True)
+# On shutdown, running jobs get this long to finish before they are interrupted and queued again
+EXECUTOR_DRAIN_SECONDS = float(os.environ.get("EXECUTOR_DRAIN_SECONDS", "30"))
+# A cancelled job's worker process is terminated if the job has not stopped after this long
+EXECUTOR_CANCEL_GRACE_SECONDS = float(os.environ.get("EXECUTOR_CANCEL_GRACE_SECONDS", "10"))
+# Jobs orphaned by a crashed service are queued again until they have had this many attempts
+EXECUTOR_JOB_MAX_ATTEMPTS = int(os.environ.get("EXECUTOR_JOB_MAX_ATTEMPTS", "3"))
+# POST /public/quick_edit and the snapshot endpoints wait this long for their job, then return the job id instead
+EXECUTOR_QUICK_EDIT_TIMEOUT_SECONDS = float(os.environ.get("EXECUTOR_QUICK_EDIT_TIMEOUT_SECONDS", "300"))
+
+# file_editor: "patch" asks the model for SEARCH/REPLACE blocks applied locally (full rewrite
+# only when a patch does not apply), "rewrite" always returns the whole file (agents/patching.py)
+FILE_EDITOR_MODE = os.environ.get("FILE_EDITOR_MODE", "patch").strip().lower()
+# Files longer than this many characters are patched region by region
+FILE_EDITOR_CONTEXT_CHARS = int(os.environ.get("FILE_EDITOR_CONTEXT_CHARS", "24000"))
+
+# Terminal steps: lines of stdout/stderr kept in memory per stream (the full output is spooled
+# gzip-compressed to APPS_ROOT/<app>/.jarvis/logs unless TERMINAL_LOG_SPOOL=0)
+TERMINAL_RING_LINES = int(os.environ.get("TERMINAL_RING_LINES", "500"))
+TERMINAL_LOG_SPOOL = _env_flag("TERMINAL_LOG_SPOOL", True)
+# New output lines are saved as an in-progress mission activity at most this often
+TERMINAL_ACTIVITY_INTERVAL_SECONDS = float(os.environ.get("TERMINAL_ACTIVITY_INTERVAL_SECONDS", "5"))
+
+# Workspace bootstrapping (services/workspace_bootstrap.py): local app templates, and the shared
+# store for node_modules trees and npm/pip package caches used by install commands
+WORKSPACE_TEMPLATES_DIR = os.environ.get("WORKSPACE_TEMPLATES_DIR") or os.path.join(PROJECT_ROOT, "templates")
+# Template applied by the workspace tool when neither the step nor the plan names one ("" = none)
+WORKSPACE_DEFAULT_TEMPLATE = os.environ.get("WORKSPACE_DEFAULT_TEMPLATE", "").strip()
+DEPENDENCY_CACHE_ROOT = os.environ.get("DEPENDENCY_CACHE_ROOT") or os.path.join(APPS_ROOT, ".jarvis-cache")
+# Rewrite install commands to prefer the shared cache over the network
+DEPENDENCY_CACHE_OFFLINE = _env_flag("DEPENDENCY_CACHE_OFFLINE", True)
+
+# Terminal steps declaring "inputs" globs are skipped when the inputs match a previous successful
+# run (services/build_cache.py); entries kept per app before the least recently used are evicted
+BUILD_CACHE_MAX_ENTRIES = int(os.environ.get("BUILD_CACHE_MAX_ENTRIES", "200"))
+
+# Snapshots of APPS_ROOT/<app> before each execution (and each mission unless
+# WORKSPACE_SNAPSHOT_MISSIONS=0), for rollback/diff (services/snapshots.py).
+# Mode: auto (reflink where supported, else copy), reflink, hardlink or copy
+WORKSPACE_SNAPSHOTS = _env_flag("WORKSPACE_SNAPSHOTS", True)
+WORKSPACE_SNAPSHOT_MISSIONS = _env_flag("WORKSPACE_SNAPSHOT_MISSIONS", True)
+WORKSPACE_SNAPSHOT_MODE = os.environ.get("WORKSPACE_SNAPSHOT_MODE", "auto").strip().lower()
+# Retention per app: newest N snapshots, and none older than the age limit (0 = no limit)
+WORKSPACE_SNAPSHOT_KEEP = int(os.environ.get("WORKSPACE_SNAPSHOT_KEEP", "20"))
+WORKSPACE_SNAPSHOT_MAX_AGE_DAYS = float(os.environ.get("WORKSPACE_SNAPSHOT_MAX_AGE_DAYS", "7"))
@@ -2,10 +2,15 @@ import sqlite3
 import os
 from passlib.context import CryptContext
 
+try:
+    from .database import apply_migration
+except ImportError:  # run as a script: python JarvisOne/database/create_tables.py
+    from database import apply_migration
+
 # Get the absolute path to the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
-# Construct the absolute path to the SQL file
-SQL_FILE = os.path.join(script_dir, 'migrations/001_init.sql')
+# Migrations are applied in filename order (001_init.sql first), each once per database
+MIGRATIONS_DIR = os.path.join(script_dir, 'migrations')
 DB_NAME = os.path.join(script_dir, '../jarvisone.db')
 
 def get_connection():
@@ -19,8 +24,8 @@ def get_connection():
 
 def create_tables():
     """
-    Reads the SQL DDL from models_sql.sql and executes it to create
-    the database schema in the SQLite database file.
+    Reads the SQL DDL from each file in migrations/ (in order) and executes it
+    to create the database schema in the SQLite database file.
     Also, ensures a default user 'ceo' exists.
     """
     db_exists = os.path.exists(DB_NAME)
@@ -28,12 +33,11 @@ def create_tables():
     conn = sqlite3.connect(DB_NAME)
     cursor = conn.cursor()
 
-    with open(SQL_FILE, 'r') as f:
-        sql_script = f.read()
-    
     try:
-        cursor.executescript(sql_script)
-        conn.commit()
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not name.endswith('.sql'):
+                continue
+            apply_migration(conn, name)
         print("Database and tables created successfully.")
         
         # --- Add default user ---
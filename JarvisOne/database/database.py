@@ -1,11 +1,16 @@
 import sqlite3
 import os
+import threading
 
 DATABASE_FILE = "jarvisone.db"
 
 # Determine the absolute path to the database file within the JarvisOne package
 # This ensures that no matter where the script is run from, it finds the correct DB.
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', DATABASE_FILE))
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_applied_migrations = set()
+_migration_lock = threading.Lock()
 
 
 def get_connection():
@@ -17,3 +22,65 @@ def get_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
+
+
+def _statements(script: str):
+    """Split a migration script into complete statements (trigger bodies stay whole)."""
+    current = ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            yield current
+            current = ""
+
+
+def apply_migration(conn: sqlite3.Connection, filename: str) -> bool:
+    """
+    Runs one migration file on conn unless schema_migrations says it was applied.
+    The check, the statements and the record share one IMMEDIATE transaction, so
+    concurrent processes apply a migration exactly once and migrations that are
+    not idempotent (ALTER TABLE ... ADD COLUMN) are safe. Returns True if it ran.
+    """
+    with open(os.path.join(MIGRATIONS_DIR, filename), 'r') as f:
+        script = f.read()
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "filename TEXT PRIMARY KEY, applied_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+        )
+        if conn.execute("SELECT 1 FROM schema_migrations WHERE filename = ?", (filename,)).fetchone():
+            conn.execute("COMMIT")
+            return False
+        for statement in _statements(script):
+            conn.execute(statement)
+        conn.execute("INSERT INTO schema_migrations (filename) VALUES (?)", (filename,))
+        conn.execute("COMMIT")
+        return True
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.isolation_level = isolation_level
+
+
+def ensure_migration(filename: str) -> None:
+    """
+    Applies a migration (see apply_migration) once per process, so components
+    that own a table work even when create_tables was not run.
+    """
+    key = (DB_PATH, filename)
+    if key in _applied_migrations:
+        return
+    with _migration_lock:
+        if key in _applied_migrations:
+            return
+        conn = get_connection()
+        try:
+            apply_migration(conn, filename)
+        finally:
+            conn.close()
+        _applied_migrations.add(key)
@@ -0,0 +1,16 @@
+-- Board run checkpoints (one row per discussion, updated after every completed turn)
+CREATE TABLE IF NOT EXISTS board_runs (
+  strategy_id TEXT PRIMARY KEY,
+  user_id INTEGER,
+  topic TEXT,
+  status TEXT NOT NULL DEFAULT 'running', -- running | completed | failed
+  turn_index INTEGER NOT NULL DEFAULT 0, -- number of agent turns logged so far
+  completed_agents TEXT, -- JSON array of agent names whose turn is logged
+  providers TEXT, -- JSON object: agent -> {"provider": ..., "model": ...}
+  full_prompt_tokens INTEGER NOT NULL DEFAULT 0, -- prompt tokens the full history would have cost
+  sent_prompt_tokens INTEGER NOT NULL DEFAULT 0, -- prompt tokens actually sent (budgeted history)
+  saved_prompt_tokens INTEGER NOT NULL DEFAULT 0, -- full_prompt_tokens - sent_prompt_tokens
+  started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(strategy_id) REFERENCES strategies(strategy_id)
+);
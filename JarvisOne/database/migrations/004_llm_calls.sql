@@ -0,0 +1,19 @@
+-- Per-call LLM telemetry (one row per provider attempt, written in batches by services/telemetry.py)
+CREATE TABLE IF NOT EXISTS llm_calls (
+  call_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  strategy_id TEXT,
+  source TEXT, -- board | executor
+  agent TEXT, -- board agent name or executor tool
+  provider TEXT,
+  model TEXT,
+  prompt_tokens INTEGER DEFAULT 0,
+  completion_tokens INTEGER DEFAULT 0,
+  queue_wait_ms REAL DEFAULT 0, -- time spent waiting on the rate limiter
+  latency_ms REAL DEFAULT 0, -- provider time, excluding queue wait
+  cached INTEGER DEFAULT 0, -- served from the completion cache
+  fallback INTEGER DEFAULT 0, -- served by a candidate other than the first one tried
+  error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_strategy ON llm_calls(strategy_id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_created ON llm_calls(created_at);
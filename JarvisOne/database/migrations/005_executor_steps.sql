@@ -0,0 +1,21 @@
+-- Executor step state (one row per plan step, updated as the step runs) for resumable executions
+CREATE TABLE IF NOT EXISTS executor_steps (
+  strategy_id TEXT NOT NULL,
+  mission_id TEXT NOT NULL,
+  step_index INTEGER NOT NULL, -- 0-based position of the step in its mission
+  step_id TEXT,
+  tool TEXT,
+  step_hash TEXT, -- hash of tool + params; a changed step is not treated as completed
+  status TEXT NOT NULL DEFAULT 'pending', -- pending | running | completed | failed | blocked
+  attempts INTEGER NOT NULL DEFAULT 0,
+  started_at TEXT,
+  finished_at TEXT,
+  duration_ms REAL,
+  result TEXT, -- JSON summary of the tool result
+  error TEXT,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (strategy_id, mission_id, step_index),
+  FOREIGN KEY(strategy_id) REFERENCES strategies(strategy_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_executor_steps_status ON executor_steps(strategy_id, status);
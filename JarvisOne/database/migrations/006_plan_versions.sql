@@ -0,0 +1,47 @@
+-- Per-strategy plan version, bumped by triggers on every write that changes what ExecutorAgent
+-- compiles (strategies, missions, the LeadAgent's final plan); services/plan_cache.py compares it
+-- to decide whether a cached compiled plan is still current
+CREATE TABLE IF NOT EXISTS plan_versions (
+  strategy_id TEXT PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_strategy_insert AFTER INSERT ON strategies BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (NEW.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_strategy_update AFTER UPDATE ON strategies BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (NEW.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_strategy_delete AFTER DELETE ON strategies BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (OLD.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_mission_insert AFTER INSERT ON missions BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (NEW.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_mission_update AFTER UPDATE ON missions BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (NEW.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+  -- A mission moved to another strategy changes both plans
+  INSERT INTO plan_versions (strategy_id, version) SELECT OLD.strategy_id, 1 WHERE OLD.strategy_id IS NOT NEW.strategy_id
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_mission_delete AFTER DELETE ON missions BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (OLD.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_plan_version_lead_message AFTER INSERT ON board_messages
+WHEN NEW.actor = 'LeadAgent' BEGIN
+  INSERT INTO plan_versions (strategy_id, version) VALUES (NEW.strategy_id, 1)
+  ON CONFLICT(strategy_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP;
+END;
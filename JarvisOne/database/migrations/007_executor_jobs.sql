@@ -0,0 +1,24 @@
+-- Persisted queue of the executor service (workers/executor_service.py): executions and quick edits
+CREATE TABLE IF NOT EXISTS executor_jobs (
+  job_id TEXT PRIMARY KEY,
+  kind TEXT NOT NULL, -- execute | quick_edit
+  strategy_id TEXT NOT NULL,
+  app_name TEXT,
+  lock_key TEXT NOT NULL, -- jobs with the same key (app directory) never run at the same time
+  params TEXT, -- JSON
+  status TEXT NOT NULL DEFAULT 'queued', -- queued | running | completed | failed | cancelled
+  attempts INTEGER NOT NULL DEFAULT 0,
+  cancel_requested INTEGER NOT NULL DEFAULT 0,
+  owner TEXT, -- service instance running the job
+  worker_pid INTEGER,
+  heartbeat_at REAL, -- unix time, refreshed by the owner while the job runs
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  started_at TEXT,
+  finished_at TEXT,
+  result TEXT, -- JSON
+  error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_executor_jobs_status ON executor_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_executor_jobs_lock ON executor_jobs(lock_key, status);
+CREATE INDEX IF NOT EXISTS idx_executor_jobs_strategy ON executor_jobs(strategy_id);
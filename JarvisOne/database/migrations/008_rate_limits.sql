@@ -0,0 +1,10 @@
+-- Provider rate-limit buckets (services/rate_limiter.py), shared by the API process and executor workers
+CREATE TABLE IF NOT EXISTS rate_limit_lanes (
+  provider TEXT NOT NULL,
+  model TEXT NOT NULL,
+  requests REAL NOT NULL, -- requests left in the RPM bucket at updated_at
+  tokens REAL NOT NULL, -- tokens left in the TPM bucket at updated_at
+  updated_at REAL NOT NULL, -- unix time the levels were last refilled
+  blocked_until REAL NOT NULL DEFAULT 0, -- unix time a 429's Retry-After pause ends
+  PRIMARY KEY (provider, model)
+);
@@ -0,0 +1,12 @@
+-- Structured tool-call records (services/action_log.py) on the actions_log table from 001_init.sql.
+-- Not idempotent: apply_migration() records it in schema_migrations and runs it once per database.
+ALTER TABLE actions_log ADD COLUMN strategy_id TEXT;
+ALTER TABLE actions_log ADD COLUMN action TEXT;
+ALTER TABLE actions_log ADD COLUMN duration_ms REAL;
+ALTER TABLE actions_log ADD COLUMN request_bytes INTEGER; -- full size, before truncation
+ALTER TABLE actions_log ADD COLUMN response_bytes INTEGER;
+ALTER TABLE actions_log ADD COLUMN payload_path TEXT; -- gzip JSON of the full payloads when truncated
+ALTER TABLE actions_log ADD COLUMN error TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_actions_log_created ON actions_log(created_at);
+CREATE INDEX IF NOT EXISTS idx_actions_log_strategy ON actions_log(strategy_id, created_at);
@@ -1,8 +1,10 @@
 from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.websockets import WebSocketState
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import sqlite3
+import json
 import uuid
 import asyncio
 import os
@@ -13,9 +15,23 @@ load_dotenv()
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from JarvisOne.database.database import get_connection
+from JarvisOne.database.database import get_connection, ensure_migration
 from .agents.executor_agent import ExecutorAgent
-from .config import APPS_ROOT
+from .config import APPS_ROOT, BOARD_AUTO_RESUME, WORKSPACE_SNAPSHOT_KEEP, WORKSPACE_SNAPSHOT_MAX_AGE_DAYS
+from .config import EXECUTOR_SERVICE_EMBEDDED, EXECUTOR_QUICK_EDIT_TIMEOUT_SECONDS
+from .services.llm_cache import llm_cache
+from .services.provider_router import provider_router
+from .services.rate_limiter import rate_limiter
+from .services.telemetry import llm_usage, GROUP_COLUMNS
+from .services.budgets import budget_tracker
+from .services.topic_index import topic_index
+from .services.output_stream import terminal_output_hub
+from .services.executor_events import executor_events, strategy_from_channel
+from .services.build_cache import BuildCache
+from .services.snapshots import SnapshotError, SnapshotStore
+from .services.action_log import action_logger, ACTIONS_LOG_MIGRATION
+from .workers.executor_service import executor_service, get_job, list_jobs
+from .agents.prompts import TURN_ORDER
 from .auth import router as auth_router, User, get_current_user, get_current_user_ws
 try:
     from .agents import board_agent, start_background_board_loop, stop_background_board_loop
@@ -58,9 +74,10 @@ except Exception:
     except Exception:
         file_search_router = None
 try:
-    from .agents.board import Board
+    from .agents.board import Board, BoardRunActive
 except Exception:
     Board = None  # type: ignore
+    BoardRunActive = ValueError  # type: ignore
 
 app = FastAPI(
     title="JarvisOne Backend",
@@ -100,6 +117,51 @@ def on_startup():
     start_background_board_loop()
     print("Startup complete.")
 
+@app.on_event("startup")
+async def detect_incomplete_board_runs():
+    """Report board discussions a previous process left unfinished; optionally resume them."""
+    if not Board:
+        return
+    try:
+        runs = await asyncio.to_thread(Board.incomplete_runs)
+    except Exception as e:
+        print(f"Could not check for incomplete board runs: {e}")
+        return
+    if not runs:
+        return
+    print(f"Found {len(runs)} incomplete board discussion(s): " + ", ".join(r["strategy_id"] for r in runs))
+    if not BOARD_AUTO_RESUME:
+        print("Set BOARD_AUTO_RESUME=1 or POST /api/public/board/resume/{strategy_id} to continue them.")
+        return
+    for run in runs:
+        if Board.is_running(run["strategy_id"]):
+            continue
+        try:
+            asyncio.create_task(_run_resumed_board(Board.resume(run["strategy_id"])))
+        except Exception as e:
+            print(f"Board resume error for {run['strategy_id']}: {e}")
+
+
+@app.on_event("startup")
+async def start_executor_service():
+    """Run queued executions and quick edits in worker processes (workers/executor_service.py)."""
+    if EXECUTOR_SERVICE_EMBEDDED:
+        await executor_service.start()
+
+
+@app.on_event("shutdown")
+async def drain_executor_service():
+    """Let running jobs finish (up to EXECUTOR_DRAIN_SECONDS); unfinished ones are queued again."""
+    await executor_service.stop()
+
+
+async def _run_resumed_board(board):
+    try:
+        await board.run_discussion()
+    except Exception as e:
+        print(f"Board resume error for {board.strategy_id}: {e}")
+
+
 @app.on_event("shutdown")
 def on_shutdown():
     """
@@ -118,16 +180,35 @@ class CEO_Message(BaseModel):
     type: str
 
 @api_router.websocket("/ws/board")
-async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = Query(None)):
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = Query(None), strategy_id: Optional[str] = Query(None)):
+    """Board updates for connected UIs.
+
+    Clients can also follow an execution: pass ?strategy_id=... or send
+    {"type": "subscribe", "channel": "executor:<strategy_id>"} (and "unsubscribe")
+    to receive an executor_snapshot followed by live executor_event messages.
+    """
     # Dev-friendly: accept all WS connections; token is optional and not enforced here
     await websocket.accept()
     uname = 'guest'
     print(f"WebSocket connection established for user: {uname}")
     board_agent.user_joined(websocket) # Pass websocket to agent
+    if strategy_id:
+        board_agent.subscribe_executor(websocket, strategy_id)
     try:
         while True:
-            # Keep the connection alive. The agent will push messages.
-            await asyncio.sleep(3600) # Sleep for a long time
+            # The agent pushes messages; the client only sends channel (un)subscriptions.
+            text = await websocket.receive_text()
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            sid = strategy_from_channel(str(msg.get("channel") or ""))
+            if msg.get("type") == "subscribe" and sid:
+                board_agent.subscribe_executor(websocket, sid)
+            elif msg.get("type") == "unsubscribe" and sid:
+                board_agent.unsubscribe_executor(websocket, sid)
             
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for user {uname}")
@@ -142,14 +223,14 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = Query(
 
 # Compatibility WebSocket route without the /api prefix
 @app.websocket("/ws/board")
-async def websocket_endpoint_direct(websocket: WebSocket, token: Optional[str] = Query(None)):
+async def websocket_endpoint_direct(websocket: WebSocket, token: Optional[str] = Query(None), strategy_id: Optional[str] = Query(None)):
     # Forward to the main handler
-    await websocket_endpoint(websocket, token)
+    await websocket_endpoint(websocket, token, strategy_id)
 
 # Additional alias to ensure /api/ws/board works even if router order changes
 @app.websocket("/api/ws/board")
-async def websocket_endpoint_api_alias(websocket: WebSocket, token: Optional[str] = Query(None)):
-    await websocket_endpoint(websocket, token)
+async def websocket_endpoint_api_alias(websocket: WebSocket, token: Optional[str] = Query(None), strategy_id: Optional[str] = Query(None)):
+    await websocket_endpoint(websocket, token, strategy_id)
 
 
 # --- Board Endpoints ---
@@ -781,8 +862,25 @@ def public_board_feed(limit: int = 100):
 
 
 @public_router.post("/board/generate")
-async def public_board_generate(n: int = 5):
-    """Generate N board discussions in background without interactive input."""
+async def public_board_generate(
+    n: int = 5,
+    topic: Optional[str] = None,
+    on_duplicate: Optional[str] = Query(None, description="offer | reuse | fork | new (default: offer with a topic, else new)"),
+):
+    """Generate N board discussions in background without interactive input.
+
+    If the caller's topic is a near-duplicate of an existing strategy's,
+    nothing is started by default and the matches are returned
+    (on_duplicate=offer). Pass on_duplicate=reuse to return the best match
+    instead, fork to start from its discussion and only re-run the
+    LeadAgent, or new to run anyway. Without a topic the generic default
+    topic is used and discussions always start (on_duplicate=new) unless
+    on_duplicate is given explicitly.
+    """
+    caller_topic = (topic or "").strip()
+    on_duplicate = on_duplicate or ("offer" if caller_topic else "new")
+    if on_duplicate not in {"offer", "reuse", "fork", "new"}:
+        raise HTTPException(status_code=400, detail="on_duplicate must be one of: offer, reuse, fork, new")
 
     # Helper to get CEO user_id from DB
     def _get_ceo_id() -> Optional[str]:
@@ -795,12 +893,8 @@ async def public_board_generate(n: int = 5):
             print(f"Failed to fetch CEO user id: {e}")
             return None
 
-    async def run_once(topic: str):
+    async def run_once(board):
         try:
-            ceo_id = _get_ceo_id()
-            if not ceo_id or not Board:
-                return
-            board = Board(topic=topic, user_id=ceo_id)
             await board.run_discussion()
             # board.run_discussion persists messages and strategy internally
         except Exception as e:
@@ -808,14 +902,106 @@ async def public_board_generate(n: int = 5):
 
     count = max(1, int(n or 1))
     default_topic = "Find a common market pain point and propose a single-feature app to solve it."
+    topic = caller_topic or default_topic
+    matches = await asyncio.to_thread(topic_index.similar, topic)
+
+    if matches and on_duplicate == "offer":
+        topic_index.record("offer", count)
+        return {
+            "started": 0,
+            "topic": topic,
+            "duplicates": matches,
+            "options": ["reuse", "fork", "new"],
+            "detail": "Similar strategies exist; re-submit with on_duplicate=reuse, fork or new.",
+        }
+    if matches and on_duplicate == "reuse":
+        topic_index.record("reused", count, turns_avoided=count * len(TURN_ORDER))
+        return {"started": 0, "topic": topic, "reused": matches[0]["strategy_id"], "duplicates": matches,
+                "discussions_avoided": count}
+
+    ceo_id = _get_ceo_id()
+    if not ceo_id or not Board:
+        return {"started": 0, "error": "Board unavailable or 'ceo' user missing"}
+    boards = []
     for _ in range(count):
-        asyncio.create_task(run_once(default_topic))
+        if matches and on_duplicate == "fork":
+            try:
+                board = Board.fork(matches[0]["strategy_id"], topic, ceo_id)
+            except ValueError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            topic_index.record("forked", 1, turns_avoided=len(board._completed_agents))
+        else:
+            board = Board(topic=topic, user_id=ceo_id)
+            if matches:
+                topic_index.record("regenerated", 1)
+        # Visible to the next similarity lookup before its first checkpoint
+        topic_index.add(board.strategy_id, topic, user_id=ceo_id)
+        boards.append(board)
+        asyncio.create_task(run_once(board))
     # Best-effort immediate ping so UIs update quickly
     try:
         await board_agent.notify_clients()
     except Exception:
         pass
-    return {"started": count}
+    result = {"started": count, "topic": topic, "strategy_ids": [b.strategy_id for b in boards]}
+    if matches:
+        result["duplicates"] = matches
+    if matches and on_duplicate == "fork":
+        result["forked_from"] = matches[0]["strategy_id"]
+    return result
+
+
+@public_router.get("/board/topics/similar")
+async def public_board_similar_topics(topic: str, threshold: Optional[float] = None, limit: int = 5):
+    """Existing strategies whose topic is a near-duplicate, plus reuse statistics."""
+    matches = await asyncio.to_thread(topic_index.similar, topic, threshold, limit)
+    return {"topic": topic, "matches": matches, "stats": topic_index.stats()}
+
+
+@public_router.get("/board/runs")
+def public_board_runs(incomplete: bool = True):
+    """Board run checkpoints; by default only discussions that never completed."""
+    if not Board:
+        return []
+    if incomplete:
+        return Board.incomplete_runs()
+    conn = get_connection()
+    try:
+        rows = conn.execute("SELECT * FROM board_runs ORDER BY updated_at DESC LIMIT 100").fetchall()
+        return [dict(r) for r in rows]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    finally:
+        conn.close()
+
+
+@public_router.get("/board/runs/{strategy_id}")
+def public_board_run(strategy_id: str):
+    """One board run checkpoint, with the prompt tokens its history compaction sent and saved."""
+    if not Board:
+        raise HTTPException(status_code=503, detail="Board is unavailable")
+    try:
+        run = Board.run_state(strategy_id)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    if not run:
+        raise HTTPException(status_code=404, detail="Board run not found")
+    return run
+
+
+@public_router.post("/board/resume/{strategy_id}", status_code=202)
+async def public_board_resume(strategy_id: str):
+    """Continue an unfinished board discussion from its last completed turn."""
+    if not Board:
+        raise HTTPException(status_code=503, detail="Board is unavailable")
+    try:
+        board = Board.resume(strategy_id)
+    except BoardRunActive as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    asyncio.create_task(_run_resumed_board(board))
+    return {"status": "resuming", "strategy_id": strategy_id}
 
 
 class QuickEditRequest(BaseModel):
@@ -837,28 +1023,165 @@ class MissionActivityIn(BaseModel):
 
 
 @public_router.post("/execute/{strategy_id}", status_code=202)
-async def public_execute(strategy_id: str):
-    """Kick off the executor for a strategy in background."""
-    async def runner():
-        agent = ExecutorAgent(strategy_id=strategy_id)
-        await agent.execute()
+async def public_execute(strategy_id: str, force: bool = False, resume: bool = False):
+    """Queue an execution of a strategy for the executor service.
+
+    force=true regenerates unchanged files; resume=true skips steps completed by an earlier run.
+    """
+    job = await executor_service.submit("execute", strategy_id, {"force": force, "resume": resume})
+    return {"status": job["status"], "job_id": job["job_id"], "position": job.get("position"),
+            "strategy_id": strategy_id, "app_name": job["app_name"], "resume": resume}
+
+
+@public_router.get("/executor/jobs")
+def public_executor_jobs(status: Optional[str] = None, strategy_id: Optional[str] = None, limit: int = 50):
+    """Executor jobs, most recent first."""
+    return {"jobs": list_jobs(status=status, strategy_id=strategy_id, limit=limit)}
+
+
+@public_router.get("/executor/jobs/{job_id}")
+def public_executor_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-    asyncio.create_task(runner())
-    return {"status": "started", "strategy_id": strategy_id}
+
+@public_router.post("/executor/jobs/{job_id}/cancel")
+async def public_cancel_executor_job(job_id: str):
+    """Cancel a queued job, or stop a running one (its terminal command is killed)."""
+    job = await executor_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@public_router.get("/executor/status")
+def public_executor_status():
+    """Worker processes of the embedded executor service and the queue length."""
+    return {**executor_service.status(), "embedded": EXECUTOR_SERVICE_EMBEDDED,
+            "queued": len(list_jobs(status="queued", limit=500))}
+
+
+@public_router.websocket("/ws/terminal/{strategy_id}")
+async def public_terminal_stream(websocket: WebSocket, strategy_id: str):
+    """Live terminal output of a strategy's executor steps (terminal_line / terminal_exit events)."""
+    await websocket.accept()
+    queue = terminal_output_hub.subscribe(strategy_id)
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Terminal stream error for {strategy_id}: {e}")
+    finally:
+        terminal_output_hub.unsubscribe(strategy_id, queue)
+        if not websocket.client_state == WebSocketState.DISCONNECTED:
+            await websocket.close()
+
+
+@public_router.get("/execute/{strategy_id}/progress")
+def public_execute_progress(strategy_id: str):
+    """In-memory progress of the strategy's latest execution in this server (same state the board WS snapshot sends)."""
+    return executor_events.snapshot(strategy_id)
+
+
+@public_router.get("/execute/{strategy_id}/steps")
+def public_execute_steps(strategy_id: str):
+    """Per-step status, attempts, timings and result summaries recorded by the executor."""
+    steps = ExecutorAgent.step_states(strategy_id)
+    counts: dict = {}
+    for step in steps:
+        counts[step["status"]] = counts.get(step["status"], 0) + 1
+    return {"strategy_id": strategy_id, "counts": counts, "steps": steps}
+
+
+def _app_root_or_404(app_name: str) -> str:
+    app_root = os.path.join(APPS_ROOT, app_name)
+    if os.path.basename(app_name) != app_name or app_name.startswith(".") or not os.path.isdir(app_root):
+        raise HTTPException(status_code=404, detail="App not found")
+    return app_root
+
+
+@public_router.get("/apps/{app_name}/build_cache")
+def public_build_cache(app_name: str):
+    """Build cache statistics of a generated app: entries, disk use, hits/misses and time saved."""
+    return {"app_name": app_name, **BuildCache(_app_root_or_404(app_name)).summary()}
+
+
+@public_router.get("/apps/{app_name}/snapshots")
+def public_list_snapshots(app_name: str):
+    """Workspace snapshots of an app, newest first."""
+    return {"app_name": app_name, "snapshots": SnapshotStore(_app_root_or_404(app_name)).list()}
+
+
+async def _snapshot_job(app_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a snapshot operation through the executor service, after any job writing the app."""
+    _app_root_or_404(app_name)
+    job = await executor_service.submit("snapshot", "", params, app_name=app_name)
+    job = await executor_service.wait(job["job_id"], EXECUTOR_QUICK_EDIT_TIMEOUT_SECONDS)
+    if job["status"] == "completed":
+        return job["result"]
+    result = job.get("result") if isinstance(job.get("result"), dict) else {}
+    if result.get("not_found"):
+        raise HTTPException(status_code=404, detail=result.get("error"))
+    if job["status"] in ("failed", "cancelled"):
+        raise HTTPException(status_code=500, detail=job.get("error") or job["status"])
+    # Still waiting behind a job for the app; it runs later, poll /executor/jobs/{job_id}
+    return JSONResponse(status_code=202, content={"status": job["status"], "job_id": job["job_id"],
+                                                  "app_name": app_name, "action": params["action"]})
+
+
+@public_router.post("/apps/{app_name}/snapshots", status_code=201)
+async def public_create_snapshot(app_name: str, label: str = "manual"):
+    return await _snapshot_job(app_name, {"action": "create", "label": label})
+
+
+@public_router.get("/apps/{app_name}/snapshots/{snapshot_id}/diff")
+async def public_snapshot_diff(app_name: str, snapshot_id: str):
+    """Files added, removed and modified in the app since the snapshot."""
+    store = SnapshotStore(_app_root_or_404(app_name))
+    try:
+        return await asyncio.to_thread(store.diff, snapshot_id)
+    except SnapshotError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@public_router.post("/apps/{app_name}/snapshots/{snapshot_id}/rollback")
+async def public_snapshot_rollback(app_name: str, snapshot_id: str):
+    """Restore the app directory to the snapshot (node_modules, .git and .jarvis are left alone).
+
+    Runs once no job is writing the app. Executor steps of the snapshot's
+    strategy that started after it are reset to pending, so a resumed
+    execution runs them again.
+    """
+    return await _snapshot_job(app_name, {"action": "rollback", "snapshot_id": snapshot_id})
+
+
+@public_router.delete("/apps/{app_name}/snapshots/{snapshot_id}")
+async def public_delete_snapshot(app_name: str, snapshot_id: str):
+    return await _snapshot_job(app_name, {"action": "delete", "snapshot_id": snapshot_id})
+
+
+@public_router.post("/apps/{app_name}/snapshots/gc")
+async def public_snapshot_gc(app_name: str, keep: int = WORKSPACE_SNAPSHOT_KEEP,
+                             max_age_days: float = WORKSPACE_SNAPSHOT_MAX_AGE_DAYS):
+    """Delete snapshots beyond the newest `keep` and older than max_age_days (0 = no age limit)."""
+    return await _snapshot_job(app_name, {"action": "gc", "keep": keep, "max_age_days": max_age_days})
 
 
 @public_router.post("/quick_edit")
 async def public_quick_edit(req: QuickEditRequest):
-    agent = ExecutorAgent(strategy_id=req.strategy_id)
-    agent._load_plan()
-    app_name = (agent.plan or {}).get("app_name")
-    res = await agent._execute_file_editor({
-        "file_path": req.file_path,
-        "instruction": req.instruction,
-        "app_name": app_name,
-        "model": "llama-3.1-8b-instant",
-    })
-    return res
+    """Edit one file of the strategy's app through the executor service (waits behind jobs for the same app)."""
+    job = await executor_service.submit("quick_edit", req.strategy_id,
+                                        {"file_path": req.file_path, "instruction": req.instruction})
+    job = await executor_service.wait(job["job_id"], EXECUTOR_QUICK_EDIT_TIMEOUT_SECONDS)
+    if job["status"] == "completed" or (job["status"] == "failed" and isinstance(job.get("result"), dict)):
+        return job["result"]
+    if job["status"] in ("failed", "cancelled"):
+        return {"ok": False, "error": job.get("error") or job["status"], "job_id": job["job_id"]}
+    return {"ok": False, "error": f"Edit is still {job['status']}", "job_id": job["job_id"], "status": job["status"]}
 
 
 @public_router.post("/open_app/{strategy_id}")
@@ -866,9 +1189,7 @@ def public_open_app(strategy_id: str):
     """Open the generated app folder in Explorer on the server host (local)."""
     try:
         # Derive app folder by reusing executor logic
-        agent = ExecutorAgent(strategy_id=strategy_id)
-        agent._load_plan()
-        app_name = (agent.plan or {}).get("app_name")
+        app_name = ExecutorAgent.app_name_for(strategy_id)
         if not app_name:
             return {"ok": False, "error": "No app_name found for strategy"}
         path = os.path.join(APPS_ROOT, app_name)
@@ -1111,13 +1432,25 @@ def public_missions(limit: int = 50):
 
 
 @public_router.get("/actions")
-def public_actions(limit: int = 200):
+def public_actions(limit: int = 200, strategy_id: Optional[str] = None, tool: Optional[str] = None,
+                   success: Optional[bool] = None):
+    """Logged tool calls and executor steps, newest first (payloads may be truncated; see payload_path)."""
+    ensure_migration(ACTIONS_LOG_MIGRATION)
+    clauses, args = [], []
+    for column, value in (("strategy_id", strategy_id), ("tool_used", tool)):
+        if value:
+            clauses.append(f"{column} = ?")
+            args.append(value)
+    if success is not None:
+        clauses.append("success = ?")
+        args.append(int(success))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            "SELECT * FROM actions_log ORDER BY timestamp DESC LIMIT ?",
-            (limit,),
+            f"SELECT * FROM actions_log {where} ORDER BY created_at DESC, action_id DESC LIMIT ?",
+            (*args, max(1, min(limit, 1000))),
         )
         rows = cur.fetchall() or []
         return [dict(r) for r in rows]
@@ -1125,6 +1458,78 @@ def public_actions(limit: int = 200):
         conn.close()
 
 
+@public_router.get("/actions/stats")
+def public_action_log_stats():
+    """Action logger queue: queued, written, dropped and failed rows, truncated and spilled payloads."""
+    return action_logger.stats()
+
+
+@public_router.get("/actions/{action_id}/payload")
+def public_action_payload(action_id: int):
+    """Full request and response of an action whose payload was truncated in actions_log."""
+    ensure_migration(ACTIONS_LOG_MIGRATION)
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT payload_path FROM actions_log WHERE action_id = ?", (action_id,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="Action not found")
+    payload = action_logger.load_payload(row["payload_path"])
+    if payload is None:
+        raise HTTPException(status_code=404, detail="No spilled payload for this action")
+    return payload
+
+
+@public_router.get("/llm/cache")
+def public_llm_cache_stats():
+    """Planner completion cache stats: hit ratio, saved tokens and latency."""
+    return llm_cache.stats()
+
+
+@public_router.delete("/llm/cache")
+def public_llm_cache_clear():
+    llm_cache.clear()
+    return {"ok": True}
+
+
+@public_router.get("/llm/providers")
+def public_llm_providers():
+    """Router view of provider health: EWMA latency/error, p95 and circuit state."""
+    return provider_router.snapshot()
+
+
+@public_router.get("/llm/ratelimits")
+def public_llm_ratelimits():
+    """Per provider/model RPM/TPM bucket levels, queue depth and 429 counts."""
+    return rate_limiter.stats()
+
+
+@public_router.get("/llm/usage")
+def public_llm_usage(
+    strategy_id: Optional[str] = None,
+    group_by: str = Query("strategy_id,agent,model", description="Comma-separated: " + ",".join(GROUP_COLUMNS)),
+    since: Optional[str] = Query(None, description="Only calls at/after this UTC timestamp, e.g. 2025-01-31 12:00:00 "
+                                                   "(default: the last LLM_USAGE_DEFAULT_WINDOW_HOURS unless strategy_id is set)"),
+):
+    """Per-call LLM telemetry: token totals and latency/queue-wait percentiles per group."""
+    keys = [k.strip() for k in group_by.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in GROUP_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by field(s): {', '.join(unknown)}")
+    try:
+        return llm_usage(group_by=keys, strategy_id=strategy_id, since=since)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+
+@public_router.get("/llm/budget/{strategy_id}")
+def public_llm_budget(strategy_id: str):
+    """Token/time budget usage for a strategy and its user (fraction >= 1 means stopped)."""
+    return budget_tracker.usage(strategy_id)
+
+
 app.include_router(public_router)
 
 # ----------------- App-level aliases for robustness -----------------
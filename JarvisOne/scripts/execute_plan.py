@@ -1,4 +1,8 @@
-"""Run the Executor Agent on a chosen strategy, with quick-modify support."""
+"""Run the Executor Agent on a chosen strategy, with quick-modify support.
+
+Pass --force to regenerate files the codegen manifest reports as up to date, and
+--resume to skip steps an earlier run of the strategy completed.
+"""
 import asyncio
 import sys
 import os
@@ -54,8 +58,7 @@ async def quick_modify(strategy_id: str):
         print("Missing file or instruction.")
         return
     agent = ExecutorAgent(strategy_id=strategy_id)
-    agent._load_plan()
-    app_name = (agent.plan or {}).get("app_name")
+    app_name = ExecutorAgent.app_name_for(strategy_id)
     res = await agent._execute_file_editor({
         "file_path": file_path,
         "instruction": instruction,
@@ -82,16 +85,19 @@ async def main():
     strategy_id = row["strategy_id"]
     print(f"Executing strategy: {strategy_id}")
 
-    executor = ExecutorAgent(strategy_id=strategy_id)
+    executor = ExecutorAgent(
+        strategy_id=strategy_id,
+        force_regenerate="--force" in sys.argv[1:],
+        resume="--resume" in sys.argv[1:],
+    )
     await executor.execute()
 
     # Offer to open the generated app folder and quick-modify
     open_app = input("Open the app folder in Explorer? (y/N): ").strip().lower() == 'y'
     if open_app:
         try:
-            executor._load_plan()
             from JarvisOne.config import APPS_ROOT
-            app = (executor.plan or {}).get("app_name")
+            app = ExecutorAgent.app_name_for(strategy_id)
             if app:
                 path = os.path.join(APPS_ROOT, app)
                 os.startfile(path)
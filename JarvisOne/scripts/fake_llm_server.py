@@ -0,0 +1,254 @@
+"""
+Fake OpenAI/Groq-compatible chat completions server for offline load and latency tests.
+
+Serves POST /v1/chat/completions (OpenAI/DeepSeek clients) and
+POST /openai/v1/chat/completions (Groq client), streaming and non-streaming,
+with simulated time-to-first-token, token throughput, rate-limit headers and
+injected 429/500 errors. Point the backend at it with:
+
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8900
+    DEEPSEEK_API_KEY=fake DEEPSEEK_BASE_URL=http://127.0.0.1:8900/v1
+
+Usage:
+    python JarvisOne/scripts/fake_llm_server.py --ttft lognormal:0.4,0.5 --tps 80 --p429 0.05
+
+Latency specs: fixed:S | uniform:A,B | normal:MEAN,SD | lognormal:MEDIAN,SIGMA (seconds).
+
+A --script JSON file scripts responses. Board agents are recognised by their
+system prompt ("You are MarketScout, ..."); other calls match "rules" by substring:
+
+    {
+      "agents": {"MarketScout": "...", "CPO": ["first reply", "second reply"]},
+      "rules": [{"contains": "React component", "content": "```jsx\\n...\\n```"}],
+      "default": "..."
+    }
+
+Lists are served round-robin. Without a script the board's built-in mock replies are used.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from JarvisOne.services.tokens import estimate_messages_tokens
+
+_AGENT_NAME = re.compile(r"You are (?:the )?([A-Za-z][A-Za-z0-9_]*)")
+
+
+def parse_latency(spec: str):
+    """Returns a sampler for a latency spec such as 'lognormal:0.4,0.5'."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        low, high = values[0], values[1] if len(values) > 1 else values[0]
+        return lambda: random.uniform(low, high)
+    if kind == "normal":
+        mean, sd = values[0], values[1] if len(values) > 1 else 0.0
+        return lambda: max(0.0, random.gauss(mean, sd))
+    if kind == "lognormal":
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        mu = math.log(max(median, 1e-6))
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class ScriptedResponses:
+    """Picks the reply for a request from a script, per agent or by substring rule."""
+
+    def __init__(self, script: Optional[Dict[str, Any]] = None):
+        script = script or {}
+        agents = script.get("agents")
+        if agents is None:
+            from JarvisOne.agents.board import planner_llm
+            agents = dict(planner_llm._mock_responses)
+        self._agents = {name: self._cycle(reply) for name, reply in agents.items()}
+        self._rules = [(r["contains"], self._cycle(r["content"])) for r in script.get("rules", [])]
+        self._default = self._cycle(script.get("default", "This is a fake completion from {model}."))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cycle(reply):
+        return itertools.cycle(reply if isinstance(reply, list) and reply else [reply])
+
+    def pick(self, messages: List[dict], model: str) -> str:
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        with self._lock:
+            match = _AGENT_NAME.search(system)
+            if match and match.group(1) in self._agents:
+                return str(next(self._agents[match.group(1)]))
+            for needle, replies in self._rules:
+                if needle in prompt:
+                    return str(next(replies))
+            return str(next(self._default)).replace("{model}", model)
+
+
+class FakeLimits:
+    """Per-model request/token windows used to report x-ratelimit-* headers."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._windows: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, tokens: int) -> Dict[str, str]:
+        now = time.monotonic()
+        with self._lock:
+            window = [(t, n) for t, n in self._windows.get(model, []) if now - t < 60.0]
+            window.append((now, tokens))
+            self._windows[model] = window
+            used_requests = len(window)
+            used_tokens = sum(n for _, n in window)
+            reset = max(0.0, 60.0 - (now - window[0][0]))
+        return {
+            "x-ratelimit-limit-requests": str(self.rpm),
+            "x-ratelimit-limit-tokens": str(self.tpm),
+            "x-ratelimit-remaining-requests": str(max(0, self.rpm - used_requests)),
+            "x-ratelimit-remaining-tokens": str(max(0, self.tpm - used_tokens)),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+            "x-ratelimit-reset-tokens": f"{reset:.2f}s",
+        }
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Fake LLM server")
+    ttft = parse_latency(args.ttft)
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    responses = ScriptedResponses(script)
+    limits = FakeLimits(args.rpm, args.tpm)
+    stats = {"requests": 0, "streamed": 0, "injected_429": 0, "injected_500": 0}
+
+    def _chunks(text: str) -> List[str]:
+        # Roughly one chunk per token (~4 characters), keeping whitespace attached
+        return re.findall(r"\s*\S{1,4}|\s+", text) or [""]
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model") or "fake-model"
+        messages = body.get("messages") or []
+        stream = bool(body.get("stream"))
+        max_tokens = int(body.get("max_tokens") or 4096)
+        stats["requests"] += 1
+
+        roll = random.random()
+        if roll < args.p429:
+            stats["injected_429"] += 1
+            retry_after = max(0.0, args.retry_after)
+            return JSONResponse(
+                {"error": {"message": f"Rate limit reached for model `{model}` (fake). Please try again in {retry_after:.2f}s.",
+                           "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": f"{retry_after:g}"},
+            )
+        if roll < args.p429 + args.p500:
+            stats["injected_500"] += 1
+            return JSONResponse({"error": {"message": "Injected server error (fake)", "type": "server_error"}}, status_code=500)
+
+        content = responses.pick(messages, model)
+        pieces = _chunks(content)[:max_tokens]
+        content = "".join(pieces)
+        prompt_tokens = estimate_messages_tokens(messages)
+        completion_tokens = len(pieces)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        headers = limits.record(model, prompt_tokens + completion_tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        per_token = 1.0 / args.tps if args.tps > 0 else 0.0
+
+        if not stream:
+            await asyncio.sleep(ttft() + per_token * completion_tokens)
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                },
+                headers=headers,
+            )
+
+        stats["streamed"] += 1
+
+        def _event(delta: Dict[str, Any], finish: Optional[str] = None, with_usage: bool = False) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if with_usage:
+                chunk["usage"] = usage
+                # Groq reports usage on the final chunk under x_groq
+                chunk["x_groq"] = {"usage": usage}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        async def _stream():
+            await asyncio.sleep(ttft())
+            yield _event({"role": "assistant", "content": ""})
+            for piece in pieces:
+                if per_token:
+                    await asyncio.sleep(per_token)
+                yield _event({"content": piece})
+            yield _event({}, finish="stop", with_usage=True)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(_stream(), media_type="text/event-stream", headers=headers)
+
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Groq-compatible LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--ttft", default="lognormal:0.3,0.4", help="Time-to-first-token distribution (seconds)")
+    parser.add_argument("--tps", type=float, default=150.0, help="Generated tokens per second (0 = instant)")
+    parser.add_argument("--p429", type=float, default=0.0, help="Probability of an injected 429")
+    parser.add_argument("--p500", type=float, default=0.0, help="Probability of an injected 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--rpm", type=int, default=30, help="Requests/minute reported in rate-limit headers")
+    parser.add_argument("--tpm", type=int, default=6000, help="Tokens/minute reported in rate-limit headers")
+    parser.add_argument("--script", help="JSON file with scripted responses")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible latency/error sequences")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
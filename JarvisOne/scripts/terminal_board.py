@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import sqlite3
 import os
@@ -28,19 +29,52 @@ def get_ceo_id():
         if 'conn' in locals() and conn:
             conn.close()
 
-async def run_terminal_board():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a JarvisOne board discussion in the terminal.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="STRATEGY_ID",
+        help="Continue an unfinished discussion from its last completed turn (default: most recent).",
+    )
+    return parser.parse_args()
+
+
+def load_resumable_board(strategy_id: str):
+    """Returns a Board rehydrated from its checkpoint, or None."""
+    if strategy_id == "latest":
+        runs = Board.incomplete_runs()
+        if not runs:
+            print("No incomplete board discussions found.")
+            return None
+        strategy_id = runs[0]["strategy_id"]
+    try:
+        return Board.resume(strategy_id)
+    except ValueError as e:
+        print(e)
+        return None
+
+
+async def run_terminal_board(resume=None):
     print("--- JarvisOne Board Room ---")
 
-    ceo_id = get_ceo_id()
-    if not ceo_id:
-        print("Critical: 'ceo' user not found in the database. Please run `database/create_tables.py` first.")
-        return
+    if resume:
+        board = load_resumable_board(resume)
+        if not board:
+            return
+        print(f"Topic: {board.topic}")
+    else:
+        ceo_id = get_ceo_id()
+        if not ceo_id:
+            print("Critical: 'ceo' user not found in the database. Please run `database/create_tables.py` first.")
+            return
 
-    custom = input("Enter a topic for a new strategy, or press Enter to use default: ").strip()
-    topic = custom or "Find a common pain point in a consumer market and propose a single-feature mobile app to solve it."
-    print(f"Topic: {topic}")
-    print("Initializing board and agents...")
-    board = Board(topic=topic, user_id=ceo_id)
+        custom = input("Enter a topic for a new strategy, or press Enter to use default: ").strip()
+        topic = custom or "Find a common pain point in a consumer market and propose a single-feature mobile app to solve it."
+        print(f"Topic: {topic}")
+        print("Initializing board and agents...")
+        board = Board(topic=topic, user_id=ceo_id)
 
     # Run the discussion and get the final plan
     plan = await board.run_discussion()
@@ -81,4 +115,5 @@ async def run_terminal_board():
         print(f"Solution: {solution}")
 
 if __name__ == "__main__":
-    asyncio.run(run_terminal_board())
\ No newline at end of file
+    args = parse_args()
+    asyncio.run(run_terminal_board(resume=args.resume))
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Kill a board discussion mid-way and check that it resumes to exactly one completion.
+
+A child process runs a discussion with the offline mock provider and hangs
+in the Hephaestus turn; once board_runs shows the earlier turns checkpointed,
+the child is killed. The parent then resumes the run from that partial
+board_runs row and checks that:
+- a second resumer is refused while the first one holds the strategy
+  (Board._claim) and may resume again once it is released,
+- only the turns missing from the checkpoint are sent to a provider,
+- every agent has exactly one logged turn and the strategy is saved once,
+- a completed run can no longer be resumed.
+"""
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import JarvisOne.database.database as database
+from JarvisOne.database.create_tables import MIGRATIONS_DIR
+import JarvisOne.agents.board as board_module
+from JarvisOne.agents.board import Board, BoardRunActive
+from JarvisOne.agents.prompts import TURN_ORDER
+
+HANG_AT = "Hephaestus"
+TOPIC = "A water reminder for remote workers"
+
+
+def use_database(path: str) -> None:
+    """Point the board at a scratch database and the offline mock provider."""
+    database.DB_PATH = path
+    board_module.GROQ_API_KEY = ""
+    board_module.DEEPSEEK_API_KEY = ""
+    board_module.PLANNER_PROVIDER = "auto"
+    board_module.PLANNER_MODEL = ""
+
+
+def child(db_path: str) -> None:
+    use_database(db_path)
+    call_agent = Board._call_agent
+
+    async def hanging_call(self, agent_name):
+        if agent_name == HANG_AT:
+            await asyncio.sleep(3600)
+        return await call_agent(self, agent_name)
+
+    Board._call_agent = hanging_call
+    asyncio.run(Board(topic=TOPIC, user_id=1).run_discussion())
+
+
+def wait_for_checkpoint(db_path: str, proc: subprocess.Popen, turns: int, timeout: float = 60.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, "child exited before reaching the hanging turn"
+        with sqlite3.connect(db_path) as conn:
+            row = conn.execute("SELECT strategy_id FROM board_runs WHERE turn_index >= ?", (turns,)).fetchone()
+        if row:
+            return row[0]
+        time.sleep(0.1)
+    raise AssertionError(f"no checkpoint with {turns} turns after {timeout}s")
+
+
+async def resume_and_finish(strategy_id: str, before: list) -> None:
+    sent = []
+    call_agent = Board._call_agent
+
+    async def counting_call(self, agent_name):
+        sent.append(agent_name)
+        return await call_agent(self, agent_name)
+
+    Board._call_agent = counting_call
+    try:
+        first = Board.resume(strategy_id)
+        try:
+            Board.resume(strategy_id)
+        except BoardRunActive:
+            pass
+        else:
+            raise AssertionError("a second resumer claimed a running strategy")
+        assert Board.is_running(strategy_id)
+        print("second resumer is refused while the first holds the strategy: ok")
+
+        # Releasing without running (e.g. the caller gave up) frees the claim
+        Board._release(strategy_id)
+        first = Board.resume(strategy_id)
+        await first.run_discussion()
+        assert not Board.is_running(strategy_id), "claim not released after the run"
+    finally:
+        Board._call_agent = call_agent
+
+    assert sent == [a for a in TURN_ORDER if a not in before], (sent, before)
+    print(f"resume sent only the missing turns ({', '.join(sent)}): ok")
+
+
+def main():
+    db_path = os.path.join(tempfile.mkdtemp(), "board_resume.db")
+    with sqlite3.connect(db_path) as conn:
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name.endswith(".sql"):
+                database.apply_migration(conn, name)
+    use_database(db_path)
+
+    hang_index = TURN_ORDER.index(HANG_AT)
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", db_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        strategy_id = wait_for_checkpoint(db_path, proc, hang_index)
+    finally:
+        proc.kill()
+        proc.wait()
+
+    run = Board.run_state(strategy_id)
+    assert run["status"] == "running", run
+    before = [a for a in TURN_ORDER if a in run["completed_agents"]]
+    assert before == TURN_ORDER[:hang_index], before
+    print(f"killed after {run['turn_index']} checkpointed turns: ok")
+
+    asyncio.run(resume_and_finish(strategy_id, before))
+
+    with sqlite3.connect(db_path) as conn:
+        turns = dict(conn.execute(
+            "SELECT actor, COUNT(*) FROM board_messages WHERE strategy_id = ? GROUP BY actor", (strategy_id,)
+        ).fetchall())
+        strategies = conn.execute("SELECT COUNT(*) FROM strategies WHERE strategy_id = ?", (strategy_id,)).fetchone()[0]
+    assert all(turns.get(a) == 1 for a in TURN_ORDER), turns
+    assert turns.get("CEO") == 1, turns
+    assert strategies == 1, strategies
+    run = Board.run_state(strategy_id)
+    assert run["status"] == "completed" and run["turn_index"] == len(TURN_ORDER), run
+    print("one completion: every turn logged once, strategy saved once: ok")
+
+    try:
+        Board.resume(strategy_id)
+    except BoardRunActive:
+        raise AssertionError("completed run should not be claimed")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a completed run was resumed")
+    print("completed run cannot be resumed: ok")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+    else:
+        main()
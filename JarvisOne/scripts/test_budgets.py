@@ -0,0 +1,106 @@
+"""
+Check that spent token budgets stop board discussions and are charged to the right user.
+
+- A discussion whose strategy budget runs out after its first turn stops
+  before the next provider call: the System message says why, no strategy
+  is saved and the board run is marked failed.
+- Executor runs are charged to the strategy's owner, also when the job does
+  not name one.
+
+Uses the offline mock provider and a scratch database.
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import JarvisOne.database.database as database
+from JarvisOne.database.create_tables import MIGRATIONS_DIR
+import JarvisOne.agents.board as board_module
+from JarvisOne.agents.board import Board
+from JarvisOne.agents.executor_agent import ExecutorAgent
+from JarvisOne.services.budgets import BudgetTracker
+
+STRATEGY_TOKENS = 1000
+
+
+def use_scratch_database() -> str:
+    db_path = os.path.join(tempfile.mkdtemp(), "budgets.db")
+    with sqlite3.connect(db_path) as conn:
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name.endswith(".sql"):
+                database.apply_migration(conn, name)
+    database.DB_PATH = db_path
+    board_module.GROQ_API_KEY = ""
+    board_module.DEEPSEEK_API_KEY = ""
+    board_module.PLANNER_PROVIDER = "auto"
+    board_module.PLANNER_MODEL = ""
+    return db_path
+
+
+def check_board_stops_when_budget_is_spent(db_path: str):
+    tracker = BudgetTracker(strategy_tokens=STRATEGY_TOKENS, strategy_seconds=0, user_daily_tokens=0)
+    sent = []
+    call_agent = Board._call_agent
+
+    async def spending_call(self, agent_name):
+        response = await call_agent(self, agent_name)
+        sent.append(agent_name)
+        # The first turn spends the whole strategy budget
+        tracker.charge(self.strategy_id, STRATEGY_TOKENS)
+        return response
+
+    board_module.budget_tracker, global_tracker = tracker, board_module.budget_tracker
+    Board._call_agent = spending_call
+    try:
+        board = Board(topic="A budget planner for students", user_id=1)
+        result = asyncio.run(board.run_discussion())
+    finally:
+        Board._call_agent = call_agent
+        board_module.budget_tracker = global_tracker
+
+    assert result is None, result
+    assert sent == ["MarketScout"], sent
+    with sqlite3.connect(db_path) as conn:
+        messages = conn.execute(
+            "SELECT actor, message FROM board_messages WHERE strategy_id = ? ORDER BY msg_id", (board.strategy_id,)
+        ).fetchall()
+        saved = conn.execute("SELECT COUNT(*) FROM strategies WHERE strategy_id = ?", (board.strategy_id,)).fetchone()[0]
+    assert [actor for actor, _ in messages] == ["CEO", "MarketScout", "System"], messages
+    assert messages[-1][1].startswith("Discussion stopped: ") and "tokens budget" in messages[-1][1], messages[-1]
+    assert saved == 0, saved
+    assert Board.run_state(board.strategy_id)["status"] == "failed"
+    assert not Board.is_running(board.strategy_id)
+    print(f"board stops after the turn that spent the budget ({messages[-1][1]}): ok")
+
+
+def check_executor_charges_the_owner():
+    strategy_id = str(uuid.uuid4())
+    with database.get_connection() as conn:
+        conn.execute("INSERT INTO strategies (strategy_id, user_id, topic, status) VALUES (?, ?, ?, 'approved')",
+                     (strategy_id, 7, "owned"))
+        conn.commit()
+    assert ExecutorAgent.user_id_for(strategy_id) == 7
+    assert ExecutorAgent.user_id_for("") is None
+    agent = ExecutorAgent(strategy_id)
+    assert agent.user_id == 7, agent.user_id
+    agent.db_conn.close()
+    agent = ExecutorAgent(strategy_id, user_id=3)
+    assert agent.user_id == 3, agent.user_id
+    agent.db_conn.close()
+    print("executor runs are charged to the strategy's owner: ok")
+
+
+def main():
+    db_path = use_scratch_database()
+    check_board_stops_when_budget_is_spent(db_path)
+    check_executor_charges_the_owner()
+
+
+if __name__ == "__main__":
+    main()
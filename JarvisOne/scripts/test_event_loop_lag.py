@@ -0,0 +1,137 @@
+"""
+Check that ExecutorAgent code generation does not block the event loop.
+
+Starts scripts/fake_llm_server.py with a slow time-to-first-token, runs a few
+code_generator calls against it and, on the same event loop, measures
+scheduling lag (how late a 10ms sleep wakes up) and the latency of requests to
+the FastAPI app. With async provider clients the lag stays in the
+milliseconds while each generation takes seconds; a blocking client would
+stall both for the whole generation.
+
+Usage:
+    python JarvisOne/scripts/test_event_loop_lag.py [--ttft 2] [--files 4] [--max-lag 0.25]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import httpx
+
+import JarvisOne.database.database as database
+from JarvisOne.database.create_tables import MIGRATIONS_DIR
+
+# Keep telemetry/budget rows out of the real database
+database.DB_PATH = os.path.join(tempfile.mkdtemp(), "event_loop_lag.db")
+with sqlite3.connect(database.DB_PATH) as _conn:
+    for _name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if _name.endswith(".sql"):
+            database.apply_migration(_conn, _name)
+
+import JarvisOne.agents.executor_agent as executor_agent
+from JarvisOne.main import app
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_server(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(trust_env=False) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/stats")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"fake LLM server did not start at {url}")
+
+
+async def probe_loop(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def probe_api(stop: asyncio.Event, latencies: list):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await client.get("/")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+
+async def main(args):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "fake_llm_server.py"),
+         "--port", str(port), "--ttft", f"fixed:{args.ttft}", "--tps", "200"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_server(url)
+        executor_agent.GROQ_API_KEY = "fake"
+        executor_agent.GROQ_BASE_URL = url
+        agent = executor_agent.ExecutorAgent("event-loop-lag-test")
+        out_dir = tempfile.mkdtemp()
+
+        stop = asyncio.Event()
+        lags, api_latencies = [], []
+        probes = [asyncio.create_task(probe_loop(stop, lags)), asyncio.create_task(probe_api(stop, api_latencies))]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            agent._execute_code_generator({
+                "prompt": f"Write module number {i}.",
+                "file_path": os.path.join(out_dir, f"module_{i}.py"),
+                "language": "python",
+            })
+            for i in range(args.files)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*probes)
+        await agent.aclose()
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    failed = [r for r in results if not r.get("ok")]
+    print(f"generations: {len(results) - len(failed)}/{len(results)} ok in {elapsed:.2f}s (ttft {args.ttft}s each)")
+    print(f"loop lag:    p50={pct(lags, 0.5) * 1000:6.1f}ms  p99={pct(lags, 0.99) * 1000:6.1f}ms  max={max(lags) * 1000:6.1f}ms")
+    print(f"api latency: p50={pct(api_latencies, 0.5) * 1000:6.1f}ms  max={max(api_latencies) * 1000:6.1f}ms  ({len(api_latencies)} requests)")
+    for r in failed:
+        print(f"  error: {r.get('error')}")
+    if failed or max(lags) > args.max_lag or max(api_latencies) > args.max_lag:
+        print(f"FAIL: event loop blocked for more than {args.max_lag}s or a generation failed")
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ttft", type=float, default=2.0, help="fake server time to first token (s)")
+    parser.add_argument("--files", type=int, default=4, help="concurrent code_generator calls")
+    parser.add_argument("--max-lag", type=float, default=0.25, help="largest acceptable stall (s)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,161 @@
+"""
+Restart an execution mid-step and check what a resumed run executes again.
+
+A child process executes a two-mission strategy of terminal steps and is
+killed while the first step of the second mission has applied its changes
+but not been recorded as completed (executor_steps still says 'running').
+A resumed run must then:
+- skip the steps recorded as completed,
+- re-run the half-applied step (its command is idempotent) and finish the plan,
+- on a later resume, run again only a step whose params changed since.
+
+Every step appends its name to ran.log, so the log shows what ran when.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import JarvisOne.database.database as database
+from JarvisOne.database.create_tables import MIGRATIONS_DIR
+import JarvisOne.agents.executor_agent as executor_module
+from JarvisOne.agents.executor_agent import ExecutorAgent
+
+HALF_APPLIED = "half"
+
+
+def use_scratch(db_path: str) -> None:
+    """Point the executor at the scratch database, with the plan's workspace next to it."""
+    database.DB_PATH = db_path
+    executor_module.APPS_ROOT = os.path.join(os.path.dirname(db_path), "Apps")
+    executor_module.DEPENDENCY_CACHE_ROOT = os.path.join(executor_module.APPS_ROOT, ".jarvis-cache")
+
+
+def step(name: str, workdir: str, command: str = "") -> dict:
+    return {"tool": "terminal", "description": name,
+            "params": {"command": f"{command}echo {name} >> ran.log", "cwd": workdir}}
+
+
+def setup(db_path: str, workdir: str) -> str:
+    strategy_id = str(uuid.uuid4())
+    missions = [
+        ("first", [], [step("a", workdir), step("b", workdir)]),
+        # Writes state.txt, then (in the killed run) never reports back
+        ("second", ["first"], [step(HALF_APPLIED, workdir, "mkdir -p out && printf applied > out/state.txt && "),
+                               step("c", workdir)]),
+    ]
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO strategies (strategy_id, user_id, topic, status) VALUES (?, 1, 'resume', 'approved')",
+                     (strategy_id,))
+        for name, deps, steps in missions:
+            conn.execute(
+                "INSERT INTO missions (mission_id, strategy_id, title, owner, dependencies, steps, status) "
+                "VALUES (?, ?, ?, 'Hephaestus', ?, ?, 'pending')",
+                (f"{strategy_id}:{name}", strategy_id, name,
+                 json.dumps([f"{strategy_id}:{d}" for d in deps]), json.dumps(steps)),
+            )
+        conn.commit()
+    return strategy_id
+
+
+def child(db_path: str, strategy_id: str) -> None:
+    use_scratch(db_path)
+    execute_step = ExecutorAgent._execute_step
+
+    async def hanging_step(self, st):
+        res = await execute_step(self, st)
+        if st.get("description") == HALF_APPLIED:
+            await asyncio.sleep(3600)  # killed here: applied on disk, never recorded as completed
+        return res
+
+    ExecutorAgent._execute_step = hanging_step
+    asyncio.run(ExecutorAgent(strategy_id).execute())
+
+
+def ran(workdir: str) -> list:
+    path = os.path.join(workdir, "ran.log")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().split()
+
+
+def states(strategy_id: str) -> dict:
+    return {(s["mission_id"].rsplit(":", 1)[1], s["step_index"]): (s["status"], s["attempts"])
+            for s in ExecutorAgent.step_states(strategy_id)}
+
+
+def kill_mid_step(db_path: str, strategy_id: str, workdir: str, timeout: float = 60.0) -> None:
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", db_path, strategy_id],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    try:
+        while HALF_APPLIED not in ran(workdir):
+            assert proc.poll() is None, "child exited before the half-applied step"
+            assert time.monotonic() < deadline, f"half-applied step did not run within {timeout}s"
+            time.sleep(0.1)
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def resume(strategy_id: str) -> ExecutorAgent:
+    agent = ExecutorAgent(strategy_id, resume=True)
+    asyncio.run(agent.execute())
+    assert agent.report and agent.report.get("ok"), agent.report
+    return agent
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "executor_resume.db")
+    with sqlite3.connect(db_path) as conn:
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name.endswith(".sql"):
+                database.apply_migration(conn, name)
+    use_scratch(db_path)
+    workdir = os.path.join(tmp, "work")
+    os.makedirs(workdir)
+    strategy_id = setup(db_path, workdir)
+
+    kill_mid_step(db_path, strategy_id, workdir)
+    assert ran(workdir) == ["a", "b", HALF_APPLIED], ran(workdir)
+    assert states(strategy_id) == {("first", 0): ("completed", 1), ("first", 1): ("completed", 1),
+                                   ("second", 0): ("running", 1)}, states(strategy_id)
+    print("killed with the first mission completed and a step half-applied: ok")
+
+    agent = resume(strategy_id)
+    assert agent.resume_stats["skipped"] == 2, agent.resume_stats
+    assert ran(workdir) == ["a", "b", HALF_APPLIED, HALF_APPLIED, "c"], ran(workdir)
+    with open(os.path.join(workdir, "out", "state.txt")) as f:
+        assert f.read() == "applied"
+    assert states(strategy_id) == {("first", 0): ("completed", 1), ("first", 1): ("completed", 1),
+                                   ("second", 0): ("completed", 2), ("second", 1): ("completed", 1)}, states(strategy_id)
+    print("resume skipped the completed steps and re-ran the half-applied one: ok")
+
+    # Changing a completed step's params makes it pending work again
+    with sqlite3.connect(db_path) as conn:
+        mission_id = f"{strategy_id}:first"
+        steps = json.loads(conn.execute("SELECT steps FROM missions WHERE mission_id = ?", (mission_id,)).fetchone()[0])
+        steps[1] = step("b2", workdir)
+        conn.execute("UPDATE missions SET steps = ? WHERE mission_id = ?", (json.dumps(steps), mission_id))
+        conn.commit()
+    agent = resume(strategy_id)
+    assert agent.resume_stats["skipped"] == 3, agent.resume_stats
+    assert ran(workdir)[5:] == ["b2"], ran(workdir)
+    print("a later resume re-ran only the step whose params changed: ok")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,95 @@
+"""
+Check how SEARCH/REPLACE blocks and unified diffs are applied locally.
+
+Covers exact matches, whitespace-tolerant matches (whose replacement must be
+re-indented to the matched lines), ambiguous or missing SEARCH text, and the
+compile check that keeps a patch from breaking a Python file.
+"""
+import os
+import sys
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from JarvisOne.agents.patching import (
+    EditBlock,
+    PatchError,
+    apply_edit_blocks,
+    apply_patch_response,
+    apply_unified_diff,
+    check_python_syntax,
+)
+
+SOURCE = "def a():\n    return 1\n\n\ndef b():\n    x = 2\n    return x\n"
+
+
+def expect_error(fn, *args):
+    try:
+        fn(*args)
+    except PatchError as e:
+        return str(e)
+    raise AssertionError(f"{fn.__name__} should have raised PatchError")
+
+
+def check_exact_block():
+    out = apply_edit_blocks(SOURCE, [EditBlock("    x = 2\n", "    x = 3\n")])
+    assert out == SOURCE.replace("x = 2", "x = 3"), out
+    print("exact SEARCH/REPLACE block: ok")
+
+
+def check_loose_block_is_reindented():
+    out = apply_edit_blocks("def a():\n    return 1\n", [EditBlock("return 1\n", "return 9\n")])
+    assert out == "def a():\n    return 9\n", repr(out)
+    # Over-indented SEARCH: replacement lines lose the extra indentation, nested lines keep theirs
+    out = apply_edit_blocks(SOURCE, [EditBlock(
+        "        x = 2\n        return x\n",
+        "        if True:\n            x = 3\n        return x\n",
+    )])
+    assert "    if True:\n        x = 3\n    return x\n" in out, repr(out)
+    compile(out, "source.py", "exec")
+    print("whitespace-tolerant block is re-indented: ok")
+
+
+def check_loose_block_errors():
+    mixed = "def a():\n\treturn 1\n"
+    expect_error(apply_edit_blocks, mixed, [EditBlock("    return 1\n", "    return 9\n")])
+    expect_error(apply_edit_blocks, SOURCE, [EditBlock("        x = 2\n", "x = 3\n")])
+    expect_error(apply_edit_blocks, SOURCE, [EditBlock("x = 2\n        return x\n", "x = 3\n")])
+    expect_error(apply_edit_blocks, SOURCE, [EditBlock("return y\n", "return z\n")])
+    expect_error(apply_edit_blocks, "x = 1\nx = 1\n", [EditBlock("x = 1\n", "x = 2\n")])
+    print("mismatched, missing and ambiguous blocks raise PatchError: ok")
+
+
+def check_unified_diff():
+    diff = "@@ -5,3 +5,3 @@\n def b():\n-    x = 2\n+    x = 5\n     return x\n"
+    assert apply_unified_diff(SOURCE, diff) == SOURCE.replace("x = 2", "x = 5")
+    loose = "@@ -6,2 +6,2 @@\n-x = 2\n+x = 5\n return x\n"
+    out = apply_unified_diff(SOURCE, loose)
+    assert out == SOURCE.replace("x = 2", "x = 5"), repr(out)
+    print("unified diff, exact and re-indented: ok")
+
+
+def check_syntax_guard():
+    check_python_syntax("a.py", SOURCE, SOURCE.replace("x = 2", "x = 3"))
+    check_python_syntax("a.txt", SOURCE, "def (")
+    check_python_syntax("a.py", "def (", "def ((")
+    expect_error(check_python_syntax, "a.py", SOURCE, SOURCE.replace("    x = 2", "x = 2"))
+    print("edits that break a .py file are rejected: ok")
+
+
+def check_no_changes():
+    assert apply_patch_response(SOURCE, "NO_CHANGES") == (SOURCE, 0)
+    print("NO_CHANGES reply: ok")
+
+
+def main():
+    check_exact_block()
+    check_loose_block_is_reindented()
+    check_loose_block_errors()
+    check_unified_diff()
+    check_syntax_guard()
+    check_no_changes()
+
+
+if __name__ == "__main__":
+    main()
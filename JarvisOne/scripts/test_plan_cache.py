@@ -0,0 +1,133 @@
+"""
+Check the compiled-plan cache (services/plan_cache.py) against a scratch database.
+
+- Executing a strategy leaves its plan unchanged: a second execution gets the
+  cached plan exactly as compiled (no app_name pushed into step params).
+- The plan_versions triggers (migration 006_plan_versions.sql) invalidate a
+  cached plan on every write to the strategy, its missions or the LeadAgent's
+  plan message, from any connection; writes to other strategies do not.
+"""
+import asyncio
+import copy
+import functools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import JarvisOne.database.database as database
+from JarvisOne.database.create_tables import MIGRATIONS_DIR
+import JarvisOne.agents.executor_agent as executor_module
+from JarvisOne.agents.executor_agent import ExecutorAgent
+from JarvisOne.services.plan_cache import plan_cache
+
+
+def use_scratch_database() -> str:
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "plan_cache.db")
+    with sqlite3.connect(db_path) as conn:
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name.endswith(".sql"):
+                database.apply_migration(conn, name)
+    database.DB_PATH = db_path
+    executor_module.APPS_ROOT = os.path.join(tmp, "Apps")
+    executor_module.DEPENDENCY_CACHE_ROOT = os.path.join(executor_module.APPS_ROOT, ".jarvis-cache")
+    return db_path
+
+
+def add_strategy(db_path: str, topic: str) -> str:
+    strategy_id = str(uuid.uuid4())
+    steps = [{"tool": "terminal", "description": "check", "params": {"command": "true"}}]
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO strategies (strategy_id, user_id, topic, status) VALUES (?, 1, ?, 'approved')",
+                     (strategy_id, topic))
+        conn.execute(
+            "INSERT INTO missions (mission_id, strategy_id, title, owner, dependencies, steps, status) "
+            "VALUES (?, ?, 'Build', 'Hephaestus', '[]', ?, 'pending')",
+            (str(uuid.uuid4()), strategy_id, json.dumps(steps)),
+        )
+        conn.commit()
+    return strategy_id
+
+
+def lookup(strategy_id: str):
+    return plan_cache.get(strategy_id, functools.partial(ExecutorAgent._compile_plan, strategy_id))
+
+
+def check_execution_leaves_plan_unchanged(db_path: str):
+    strategy_id = add_strategy(db_path, "Plan cache app")
+    compiled, cached = lookup(strategy_id)
+    assert not cached and compiled.get("app_name"), compiled
+    for run in (1, 2):
+        agent = ExecutorAgent(strategy_id)
+        asyncio.run(agent.execute())
+        assert agent.report and agent.report.get("ok"), agent.report
+        assert agent.plan == compiled, (run, agent.plan)
+    plan, cached = lookup(strategy_id)
+    assert cached and plan == compiled, plan
+    assert "app_name" not in plan["missions"][0]["steps"][0]["params"], plan
+    print("executions leave the compiled plan unchanged: ok")
+
+
+def check_trigger_invalidation(db_path: str):
+    strategy_id = add_strategy(db_path, "Trigger app")
+    other_id = add_strategy(db_path, "Other app")
+    lookup(strategy_id)
+    plan, cached = lookup(strategy_id)
+    assert cached, "second lookup should hit"
+
+    # A caller modifying its copy does not touch the cached plan
+    plan["missions"].clear()
+    assert lookup(strategy_id)[0]["missions"], "cached plan was modified through a returned copy"
+
+    writes = [
+        ("mission title", "UPDATE missions SET title = 'Ship' WHERE strategy_id = ?",
+         lambda p: p["missions"][0]["title"] == "Ship"),
+        ("strategy summary", "UPDATE strategies SET summary = 'new summary' WHERE strategy_id = ?",
+         lambda p: p.get("summary") == "new summary"),
+        ("new mission", "INSERT INTO missions (mission_id, strategy_id, title, owner, dependencies, steps, status) "
+                        "SELECT lower(hex(randomblob(8))), ?, 'Test', 'CPO', '[]', '[]', 'pending'",
+         lambda p: len(p["missions"]) == 2),
+        ("LeadAgent plan", "INSERT INTO board_messages (strategy_id, actor, message) "
+                           "VALUES (?, 'LeadAgent', '{\"app_name\": \"Renamed App\"}')",
+         lambda p: p.get("app_name") == "renamed-app"),
+        ("mission delete", "DELETE FROM missions WHERE strategy_id = ? AND title = 'Test'",
+         lambda p: len(p["missions"]) == 1),
+    ]
+    for label, sql, expect in writes:
+        before = copy.deepcopy(lookup(strategy_id)[0])
+        # Another connection, as another process would write
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(sql, (strategy_id,))
+            conn.execute("UPDATE missions SET title = title || '!' WHERE strategy_id = ?", (other_id,))
+            conn.commit()
+        plan, cached = lookup(strategy_id)
+        assert not cached, f"{label}: cached plan survived the write"
+        assert expect(plan) and plan != before, (label, plan)
+        assert lookup(strategy_id)[1], f"{label}: recompiled plan was not cached"
+        print(f"{label} write invalidates the cached plan: ok")
+
+    hits = plan_cache.stats["hits"]
+    lookup(other_id)
+    lookup(other_id)
+    assert plan_cache.stats["hits"] == hits + 1, plan_cache.stats
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE missions SET title = 'Unrelated' WHERE strategy_id = ?", (strategy_id,))
+        conn.commit()
+    assert lookup(other_id)[1], "a write to another strategy invalidated this plan"
+    print("writes to other strategies keep the cached plan: ok")
+
+
+def main():
+    db_path = use_scratch_database()
+    check_execution_leaves_plan_unchanged(db_path)
+    check_trigger_invalidation(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare tail latency with and without hedged requests using fake providers.
+
+The fake primary answers in ~20ms but stalls for 500ms on 4% of calls; the
+fake secondary is slightly slower but steady. Hedging should cut p99/max
+latency close to the secondary's latency while p50 stays on the primary.
+
+It also checks that a half-open provider whose trial call loses a hedge
+releases its trial (and records the trial's latency) instead of staying
+claimed forever.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Ensure project root is on path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from JarvisOne.services.provider_router import ProviderRouter
+
+CALLS = 200
+
+
+def fake_provider(provider: str, model: str) -> str:
+    if provider == "primary":
+        delay = 0.5 if random.random() < 0.04 else random.uniform(0.015, 0.025)
+    else:
+        delay = random.uniform(0.03, 0.04)
+    time.sleep(delay)
+    return f"{provider}:{model}"
+
+
+def pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run(hedge: bool):
+    random.seed(7)
+    router = ProviderRouter(hedge_min_samples=10, hedge_default_delay=0.1)
+    candidates = [("primary", "fast-model"), ("secondary", "steady-model")]
+    latencies = []
+    for _ in range(CALLS):
+        started = time.perf_counter()
+        await router.call(candidates, fake_provider, hedge=hedge)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, router
+
+
+async def check_hedge_loser_releases_trial():
+    router = ProviderRouter(failure_threshold=1, cooldown_seconds=0.05, hedge_min_samples=10, hedge_default_delay=0.02)
+    router.record_failure("a", "m")
+    assert not router.is_available("a", "m"), "circuit should be open"
+    await asyncio.sleep(0.06)
+
+    def provider(p: str, m: str) -> str:
+        time.sleep(0.2 if p == "a" else 0.01)
+        return p
+
+    result, cand, info = await router.call([("a", "m"), ("b", "m")], provider, hedge=True)
+    assert cand == ("b", "m") and info["hedged"], (cand, info)
+    for key in (("a", None), ("a", "m")):
+        h = router._health[key]
+        assert not h.trial_in_flight, f"{key}: trial still claimed after losing the hedge"
+        assert h.samples and max(h.samples) >= 0.02, f"{key}: loser latency not recorded"
+    assert router.is_available("a", "m"), "half-open provider should allow a new trial"
+    print("hedge loser releases its half-open trial: ok")
+
+
+async def main():
+    await check_hedge_loser_releases_trial()
+    for hedge in (False, True):
+        lat, router = await run(hedge)
+        snap = router.snapshot()
+        print(
+            f"hedge={str(hedge):5}  p50={pct(lat, 0.5):6.1f}ms  p95={pct(lat, 0.95):6.1f}ms  "
+            f"p99={pct(lat, 0.99):6.1f}ms  max={max(lat):6.1f}ms  "
+            f"hedges={snap['hedges_started']} won={snap['hedges_won']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
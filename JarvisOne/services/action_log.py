@@ -0,0 +1,173 @@
+"""
+Action Log
+
+Structured records of tool calls (ToolBelt tools and ExecutorAgent steps) in
+the actions_log table, read by GET /public/actions.
+
+log() only queues the request and response objects; a BatchWriter thread
+serializes them and does the rest, so callers never wait on JSON encoding,
+SQLite or the disk:
+- payloads longer than ACTION_LOG_PAYLOAD_CHARS are stored truncated, and the
+  full request and response are spilled to a gzip-compressed JSON file under
+  ACTION_LOG_SPILL_DIR/<date>/ (payload_path); day directories older than
+  ACTION_LOG_SPILL_MAX_AGE_DAYS are deleted,
+- when the queue (ACTION_LOG_QUEUE_SIZE) is full, actions are dropped and
+  counted instead of blocking the caller.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..config import (
+    ACTION_LOG_PAYLOAD_CHARS, ACTION_LOG_SPILL_DIR, ACTION_LOG_SPILL_MAX_AGE_DAYS, ACTION_LOG_QUEUE_SIZE,
+)
+from .batch_writer import BatchWriter
+
+# actions_log comes from 001_init.sql; 009_actions_log.sql adds the structured columns
+ACTIONS_LOG_MIGRATION = "009_actions_log.sql"
+ROW_FIELDS = ("mission_id", "step_name", "tool_used", "request_payload", "response_payload", "success",
+              "created_at", "strategy_id", "action", "duration_ms", "request_bytes", "response_bytes",
+              "payload_path", "error")
+DROP_REPORT_INTERVAL = 10.0
+
+def _to_json(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    try:
+        return json.dumps(value, default=str, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+class _ActionLogWriter(BatchWriter):
+    """BatchWriter whose rows are finished (truncated, spilled) on the writer thread."""
+
+    def __init__(self, logger: "ActionLogger", **kwargs: Any):
+        super().__init__(
+            f"INSERT INTO actions_log ({', '.join(ROW_FIELDS)}) VALUES ({', '.join('?' * len(ROW_FIELDS))})",
+            migration=ACTIONS_LOG_MIGRATION,
+            **kwargs,
+        )
+        self._logger = logger
+
+    def _write(self, batch) -> None:
+        super()._write([self._logger._row(entry) for (entry,) in batch])
+
+
+class ActionLogger:
+    def __init__(self, payload_chars: int = ACTION_LOG_PAYLOAD_CHARS, spill_dir: str = ACTION_LOG_SPILL_DIR,
+                 spill_max_age_days: float = ACTION_LOG_SPILL_MAX_AGE_DAYS, max_queue: int = ACTION_LOG_QUEUE_SIZE):
+        self.payload_chars = max(200, payload_chars)
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.spill_max_age_days = spill_max_age_days
+        self.writer = _ActionLogWriter(self, max_queue=max_queue, name="ActionLog")
+        self._payload_stats = {"truncated": 0, "spilled": 0, "spill_failed": 0}
+        self._last_drop_report = 0.0
+        self._last_prune_day: Optional[str] = None
+
+    def log(self, tool: str, action: Optional[str], request: Any, response: Any, success: bool,
+            strategy_id: Optional[str] = None, mission_id: Optional[str] = None, step_name: Optional[str] = None,
+            duration_ms: Optional[float] = None, error: Optional[str] = None) -> bool:
+        """Queue one action; returns False if it was dropped because the queue is full.
+
+        request and response are serialized later on the writer thread, so
+        callers must not mutate them after logging.
+        """
+        now = time.time()
+        entry = {
+            "tool": tool, "action": action, "strategy_id": strategy_id, "mission_id": mission_id,
+            "step_name": step_name, "success": bool(success), "duration_ms": duration_ms, "error": error,
+            "request": request, "response": response,
+            # UTC like CURRENT_TIMESTAMP, with milliseconds so rows written in one batch keep their order
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}",
+        }
+        queued = self.writer.submit((entry,))
+        if not queued and time.monotonic() - self._last_drop_report >= DROP_REPORT_INTERVAL:
+            self._last_drop_report = time.monotonic()
+            print(f"[ActionLog] Queue full; {self.writer.stats()['dropped']} actions dropped so far")
+        return queued
+
+    # ---------------- Writer thread ----------------
+
+    def _row(self, entry: Dict[str, Any]) -> tuple:
+        entry["request"], entry["response"] = _to_json(entry["request"]), _to_json(entry["response"])
+        request, response = entry["request"], entry["response"]
+        payload_path = None
+        if len(request) > self.payload_chars or len(response) > self.payload_chars:
+            self._payload_stats["truncated"] += 1
+            payload_path = self._spill(entry)
+            where = f"; full payload in {payload_path}" if payload_path else ""
+            request = self._truncate(request, where)
+            response = self._truncate(response, where)
+        return (
+            entry["mission_id"], entry["step_name"], entry["tool"], request, response, int(entry["success"]),
+            entry["created_at"], entry["strategy_id"], entry["action"], entry["duration_ms"],
+            len(entry["request"].encode("utf-8")), len(entry["response"].encode("utf-8")), payload_path, entry["error"],
+        )
+
+    def _truncate(self, text: str, where: str) -> str:
+        if len(text) <= self.payload_chars:
+            return text
+        return text[:self.payload_chars] + f" … [truncated, {len(text)} chars{where}]"
+
+    def _spill(self, entry: Dict[str, Any]) -> Optional[str]:
+        if self.spill_dir is None:
+            return None
+        day = entry["created_at"][:10]
+        path = self.spill_dir / day / f"{uuid.uuid4().hex}.json.gz"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump({k: entry[k] for k in ("tool", "action", "strategy_id", "mission_id", "step_name",
+                                                 "created_at", "request", "response")}, f)
+            self._payload_stats["spilled"] += 1
+        except OSError as e:
+            self._payload_stats["spill_failed"] += 1
+            print(f"[ActionLog] Could not spill payload to {path}: {e}")
+            return None
+        if day != self._last_prune_day:
+            self._last_prune_day = day
+            self._prune_spills()
+        return str(path)
+
+    def _prune_spills(self) -> None:
+        if not self.spill_max_age_days or not self.spill_dir.is_dir():
+            return
+        cutoff = time.strftime("%Y-%m-%d", time.gmtime(time.time() - self.spill_max_age_days * 86400))
+        for entry in self.spill_dir.iterdir():
+            if entry.is_dir() and len(entry.name) == 10 and entry.name < cutoff:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    # ---------------- Reading ----------------
+
+    def load_payload(self, payload_path: str) -> Optional[Dict[str, Any]]:
+        """The full spilled payload of an action, if the file is inside the spill directory."""
+        if not payload_path or self.spill_dir is None:
+            return None
+        path = Path(payload_path).resolve()
+        if self.spill_dir.resolve() not in path.parents:
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.writer.stats(), **self._payload_stats, "payload_chars": self.payload_chars,
+                "spill_dir": str(self.spill_dir) if self.spill_dir else None}
+
+
+action_logger = ActionLogger()
@@ -0,0 +1,119 @@
+"""
+Batch Writer
+
+Buffers rows in memory and inserts them from a background thread with one
+executemany per batch, so hot paths (LLM calls, step logs) never wait on
+SQLite. When the buffer is full new rows are dropped and counted rather than
+blocking the caller.
+"""
+from __future__ import annotations
+
+import atexit
+import queue
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..database.database import get_connection, ensure_migration
+
+
+class BatchWriter:
+    def __init__(
+        self,
+        sql: str,
+        migration: Optional[str] = None,
+        flush_interval: float = 1.0,
+        max_batch: int = 200,
+        max_queue: int = 10000,
+        name: str = "BatchWriter",
+        on_written: Optional[Callable[[List[tuple]], None]] = None,
+    ):
+        self.sql = sql
+        self.migration = migration
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.name = name
+        self.on_written = on_written  # called from the writer thread with each committed batch
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._atexit_registered = False
+        self._stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0}
+
+    def _ensure_started(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def submit(self, row: Sequence[Any]) -> bool:
+        """Queue one row; returns False (and counts a drop) if the buffer is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(tuple(row))
+        except queue.Full:
+            self._stats["dropped"] += 1
+            return False
+        self._stats["queued"] += 1
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch) -> None:
+        conn = None
+        try:
+            if self.migration:
+                ensure_migration(self.migration)
+            conn = get_connection()
+            conn.executemany(self.sql, batch)
+            conn.commit()
+            self._stats["written"] += len(batch)
+        except (sqlite3.Error, OSError) as e:
+            self._stats["failed"] += len(batch)
+            print(f"[{self.name}] failed to write {len(batch)} rows: {e}")
+            return
+        finally:
+            if conn:
+                conn.close()
+        if self.on_written:
+            try:
+                self.on_written(batch)
+            except Exception as e:
+                print(f"[{self.name}] on_written callback failed: {e}")
+
+    def flush(self) -> None:
+        """Block until every row queued so far has been written (or failed)."""
+        if self._thread and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, int]:
+        out = dict(self._stats)
+        out["pending"] = self._queue.qsize()
+        return out
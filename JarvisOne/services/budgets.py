@@ -0,0 +1,266 @@
+"""
+Spending Budgets
+
+Caps what one strategy (tokens and active wall-clock time across the board
+discussion and execution) and one user (tokens over a rolling 24 hours) can
+spend on LLM calls. Callers ask admit() before each call: past
+BUDGET_DOWNGRADE_AT of any budget the model is swapped for its cheaper
+MODEL_DOWNGRADES entry and max_tokens is clipped to what is left; an
+exhausted budget raises BudgetExceeded (a hard stop).
+
+Token usage is read from llm_calls, which every process writes to, so the
+API and the executor workers see each other's spend and budgets survive
+restarts. It is re-read whenever run() starts (each board discussion or
+executor job) and before a check when the last read is older than
+BUDGET_REFRESH_SECONDS; the queries run outside the tracker's lock. Calls
+recorded in this process but not yet flushed by the telemetry writer are
+charged on top until the writer reports them written. Active time is still
+counted per process.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import (
+    STRATEGY_TOKEN_BUDGET,
+    STRATEGY_TIME_BUDGET_SECONDS,
+    USER_DAILY_TOKEN_BUDGET,
+    BUDGET_DOWNGRADE_AT,
+    BUDGET_REFRESH_SECONDS,
+    MODEL_DOWNGRADES,
+)
+from ..database.database import get_connection, ensure_migration
+
+
+class BudgetExceeded(RuntimeError):
+    def __init__(self, scope: str, kind: str, used: float, limit: float, strategy_id: Optional[str] = None):
+        self.scope = scope  # strategy | user
+        self.kind = kind  # tokens | time
+        self.used = used
+        self.limit = limit
+        self.strategy_id = strategy_id
+        unit = "s" if kind == "time" else " tokens"
+        super().__init__(f"{scope.capitalize()} {kind} budget exhausted: used {used:.0f}{unit} of {limit:.0f}{unit}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"scope": self.scope, "kind": self.kind, "used": self.used, "limit": self.limit,
+                "strategy_id": self.strategy_id}
+
+
+class _TokenUsage:
+    """Tokens in llm_calls at the last read plus those charged here but not yet written."""
+
+    def __init__(self):
+        self.stored = 0
+        self.unflushed = 0
+        self.read_at = 0.0  # monotonic time of the last read, 0 = never
+
+    @property
+    def tokens(self) -> int:
+        return self.stored + self.unflushed
+
+
+class _StrategyUsage(_TokenUsage):
+    def __init__(self, user_id: Optional[int]):
+        super().__init__()
+        self.user_id = user_id
+        self.active_s = 0.0
+        self.active_runs = 0
+        self.run_started = 0.0
+
+    def elapsed(self, now: float) -> float:
+        return self.active_s + ((now - self.run_started) if self.active_runs else 0.0)
+
+
+class BudgetTracker:
+    def __init__(
+        self,
+        strategy_tokens: int = STRATEGY_TOKEN_BUDGET,
+        strategy_seconds: float = STRATEGY_TIME_BUDGET_SECONDS,
+        user_daily_tokens: int = USER_DAILY_TOKEN_BUDGET,
+        downgrade_at: float = BUDGET_DOWNGRADE_AT,
+        downgrades: Optional[Dict[str, str]] = None,
+        refresh_seconds: float = BUDGET_REFRESH_SECONDS,
+    ):
+        self.strategy_tokens = strategy_tokens
+        self.strategy_seconds = strategy_seconds
+        self.user_daily_tokens = user_daily_tokens
+        self.downgrade_at = downgrade_at
+        self.downgrades = dict(downgrades if downgrades is not None else MODEL_DOWNGRADES)
+        self.refresh_seconds = refresh_seconds
+        self._strategies: Dict[str, _StrategyUsage] = {}
+        self._users: Dict[int, _TokenUsage] = {}
+        self._lock = threading.RLock()
+
+    # ---------------- Reading llm_calls ----------------
+    @staticmethod
+    def _query(sql: str, params: tuple):
+        conn = None
+        try:
+            ensure_migration("003_board_runs.sql")
+            ensure_migration("004_llm_calls.sql")
+            conn = get_connection()
+            return conn.execute(sql, params).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[Budget] could not read past usage: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def _stale(self, usage: Optional[_TokenUsage], force: bool) -> bool:
+        return usage is None or force or time.monotonic() - usage.read_at >= self.refresh_seconds
+
+    def _refresh(self, strategy_id: str, user_id: Optional[int] = None, force: bool = False) -> None:
+        """Re-read the strategy's and its user's token usage from llm_calls if stale, without holding the lock."""
+        with self._lock:
+            usage = self._strategies.get(strategy_id)
+            stale = self._stale(usage, force)
+        if stale:
+            row = self._query(
+                """
+                SELECT
+                    (SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM llm_calls
+                     WHERE strategy_id = ? AND cached = 0 AND error IS NULL),
+                    COALESCE((SELECT user_id FROM strategies WHERE strategy_id = ?),
+                             (SELECT user_id FROM board_runs WHERE strategy_id = ?))
+                """,
+                (strategy_id, strategy_id, strategy_id),
+            )
+            with self._lock:
+                usage = self._strategies.setdefault(strategy_id, _StrategyUsage(None))
+                if row:
+                    usage.stored = int(row[0])
+                    if usage.user_id is None:
+                        usage.user_id = row[1]
+                usage.read_at = time.monotonic()
+        with self._lock:
+            if user_id is not None and usage.user_id is None:
+                usage.user_id = user_id
+            user_id = usage.user_id
+            if user_id is None:
+                return
+            stale = self._stale(self._users.get(user_id), force)
+        if not stale:
+            return
+        row = self._query(
+            """
+            SELECT COALESCE(SUM(c.prompt_tokens + c.completion_tokens), 0) FROM llm_calls c
+            WHERE c.cached = 0 AND c.error IS NULL AND c.created_at >= datetime('now', '-1 day')
+              AND COALESCE((SELECT user_id FROM strategies s WHERE s.strategy_id = c.strategy_id),
+                           (SELECT user_id FROM board_runs r WHERE r.strategy_id = c.strategy_id)) = ?
+            """,
+            (user_id,),
+        )
+        with self._lock:
+            user = self._users.setdefault(user_id, _TokenUsage())
+            if row:
+                user.stored = int(row[0])
+            user.read_at = time.monotonic()
+
+    # ---------------- Active time ----------------
+    @contextmanager
+    def run(self, strategy_id: str, user_id: Optional[int] = None):
+        """Count wall-clock time spent inside the block against the strategy (and re-read its usage up front)."""
+        self._refresh(strategy_id, user_id, force=True)
+        with self._lock:
+            usage = self._strategies[strategy_id]
+            if usage.active_runs == 0:
+                usage.run_started = time.monotonic()
+            usage.active_runs += 1
+        try:
+            yield usage
+        finally:
+            with self._lock:
+                usage.active_runs -= 1
+                if usage.active_runs == 0:
+                    usage.active_s += time.monotonic() - usage.run_started
+
+    # ---------------- Accounting ----------------
+    def charge(self, strategy_id: Optional[str], tokens: int) -> None:
+        """Count a call recorded in this process until the telemetry writer has stored it."""
+        if not strategy_id or not tokens:
+            return
+        self._refresh(strategy_id)
+        with self._lock:
+            usage = self._strategies[strategy_id]
+            usage.unflushed += int(tokens)
+            if usage.user_id is not None:
+                self._users.setdefault(usage.user_id, _TokenUsage()).unflushed += int(tokens)
+
+    def written(self, strategy_id: Optional[str], tokens: int) -> None:
+        """A charged call is now in llm_calls; the next read counts it instead."""
+        if not strategy_id or not tokens:
+            return
+        with self._lock:
+            usage = self._strategies.get(strategy_id)
+            if usage is None:
+                return
+            usage.unflushed = max(0, usage.unflushed - int(tokens))
+            user = self._users.get(usage.user_id) if usage.user_id is not None else None
+            if user is not None:
+                user.unflushed = max(0, user.unflushed - int(tokens))
+
+    def usage(self, strategy_id: str) -> Dict[str, Any]:
+        """Used amounts, limits and used fractions (0 limit = unlimited)."""
+        self._refresh(strategy_id)
+        with self._lock:
+            usage = self._strategies[strategy_id]
+            user = self._users.get(usage.user_id) if usage.user_id is not None else None
+            tokens = usage.tokens
+            user_tokens = user.tokens if user is not None else 0
+            elapsed = usage.elapsed(time.monotonic())
+        budgets = {
+            ("strategy", "tokens"): (tokens, self.strategy_tokens),
+            ("strategy", "time"): (elapsed, self.strategy_seconds),
+        }
+        if usage.user_id is not None:
+            budgets[("user", "tokens")] = (user_tokens, self.user_daily_tokens)
+        return {
+            "strategy_id": strategy_id,
+            "user_id": usage.user_id,
+            "budgets": [
+                {"scope": scope, "kind": kind, "used": round(used, 2), "limit": limit,
+                 "fraction": (used / limit) if limit else 0.0}
+                for (scope, kind), (used, limit) in budgets.items()
+            ],
+        }
+
+    def check(self, strategy_id: Optional[str]) -> float:
+        """Raise BudgetExceeded if any budget is exhausted; returns the highest used fraction."""
+        if not strategy_id:
+            return 0.0
+        worst = 0.0
+        for b in self.usage(strategy_id)["budgets"]:
+            if b["limit"] and b["used"] >= b["limit"]:
+                raise BudgetExceeded(b["scope"], b["kind"], b["used"], b["limit"], strategy_id)
+            worst = max(worst, b["fraction"])
+        return worst
+
+    def remaining_tokens(self, strategy_id: str) -> Optional[int]:
+        left = [b["limit"] - b["used"] for b in self.usage(strategy_id)["budgets"]
+                if b["kind"] == "tokens" and b["limit"]]
+        return int(min(left)) if left else None
+
+    def admit(self, strategy_id: Optional[str], model: str, max_tokens: int) -> Tuple[str, int]:
+        """Model and max_tokens to use for the next call, or BudgetExceeded.
+
+        Near a limit the model is downgraded; max_tokens never exceeds the
+        tokens left in any budget.
+        """
+        if not strategy_id:
+            return model, max_tokens
+        fraction = self.check(strategy_id)
+        if fraction >= self.downgrade_at:
+            model = self.downgrades.get(model, model)
+        remaining = self.remaining_tokens(strategy_id)
+        if remaining is not None:
+            max_tokens = max(1, min(max_tokens, remaining))
+        return model, max_tokens
+
+
+budget_tracker = BudgetTracker()
@@ -0,0 +1,242 @@
+"""
+Build Cache
+
+Lets terminal steps that build, lint or test a generated app skip the command
+when none of its inputs changed, in the spirit of a local build cache. A step
+opts in by declaring its inputs (and optionally its outputs) as globs relative
+to the command's working directory:
+
+    {"tool": "terminal", "params": {"command": "npm run build",
+        "inputs": ["src/**/*.ts", "package.json"], "outputs": ["dist/**"]}}
+
+The cache key hashes the command and the path and content of every input
+file. After a successful run the outputs are archived, and the log and
+stdout/stderr tails are kept; on a later run with the same key the command is
+skipped and the outputs are restored instead. Entries live under
+APPS_ROOT/<app>/.jarvis/build_cache/ with an index.json that also keeps
+cumulative hit/miss statistics.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CACHE_DIR = Path(".jarvis") / "build_cache"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+# Never hashed or archived: installed dependencies and Jarvis' own state
+EXCLUDED_DIRS = {"node_modules", ".jarvis", ".git", "__pycache__"}
+
+
+class BuildCacheError(ValueError):
+    pass
+
+
+def _check_patterns(patterns: Any, what: str) -> List[str]:
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    if not isinstance(patterns, list) or not all(isinstance(p, str) and p.strip() for p in patterns):
+        raise BuildCacheError(f"'{what}' must be a glob or a list of globs")
+    for pattern in patterns:
+        if os.path.isabs(pattern) or ".." in Path(pattern).parts:
+            raise BuildCacheError(f"'{what}' glob {pattern!r} must stay inside the working directory")
+    return [p.strip() for p in patterns]
+
+
+def match_files(base: Path, patterns: Iterable[str]) -> List[Path]:
+    """Files under base matching any glob (a directory glob matches everything below it), sorted."""
+    found = set()
+    for pattern in patterns:
+        for path in base.glob(pattern):
+            rel_parts = path.relative_to(base).parts
+            if any(part in EXCLUDED_DIRS for part in rel_parts):
+                continue
+            if path.is_dir():
+                found.update(p for p in path.rglob("*") if p.is_file()
+                             and not any(part in EXCLUDED_DIRS for part in p.relative_to(base).parts))
+            elif path.is_file():
+                found.add(path)
+    return sorted(found)
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def step_key(command: str, base: Path, inputs: List[str], outputs: List[str]) -> Tuple[str, int]:
+    """Cache key of a terminal step and the number of input files it covers."""
+    h = hashlib.sha256()
+    h.update(json.dumps({"command": command, "inputs": inputs, "outputs": outputs}, sort_keys=True).encode("utf-8"))
+    files = match_files(base, inputs)
+    for path in files:
+        h.update(path.relative_to(base).as_posix().encode("utf-8") + b"\0")
+        h.update(_file_digest(path).encode("ascii"))
+    return h.hexdigest(), len(files)
+
+
+class BuildCache:
+    def __init__(self, app_root: Path, max_entries: int = 200):
+        self.app_root = Path(app_root)
+        self.root = self.app_root / CACHE_DIR
+        self.index_path = self.root / INDEX_NAME
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "time_saved_s": 0.0, "restored_files": 0}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION and isinstance(data.get("entries"), dict):
+                self._entries = data["entries"]
+                self.stats.update(data.get("stats") or {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        payload = {"version": INDEX_VERSION, "entries": self._entries, "stats": self.stats}
+        tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if not entry:
+            return None
+        if entry.get("archive") and not (self.root / entry["archive"]).is_file():
+            return None
+        return entry
+
+    def restore(self, entry: Dict[str, Any], base: Path) -> int:
+        """Put the entry's recorded outputs back under base; returns the number of files written."""
+        outputs = entry.get("outputs") or {}
+        stale = [rel for rel, digest in outputs.items()
+                 if not (base / rel).is_file() or _file_digest(base / rel) != digest]
+        if not stale or not entry.get("archive"):
+            return 0
+        with tarfile.open(self.root / entry["archive"], "r:gz") as tar:
+            for rel in stale:
+                member = tar.getmember(rel)
+                src = tar.extractfile(member)
+                if src is None:
+                    continue
+                dest = base / rel
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dest.with_name(f".{dest.name}.restore")
+                with src, open(tmp, "wb") as out:
+                    shutil.copyfileobj(src, out)
+                os.chmod(tmp, member.mode & 0o777 or 0o644)
+                os.replace(tmp, dest)
+        return len(stale)
+
+    def record(self, key: str, command: str, base: Path, outputs: List[str], result: Dict[str, Any],
+               duration_s: float, log_path: Optional[str] = None, input_files: int = 0) -> Dict[str, Any]:
+        """Store a successful run: archive its outputs, keep its log and output tails."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = match_files(base, outputs) if outputs else []
+        archive = None
+        digests: Dict[str, str] = {}
+        if files:
+            archive = f"{key[:32]}.tar.gz"
+            tmp = self.root / f".{archive}.tmp"
+            with tarfile.open(tmp, "w:gz") as tar:
+                for path in files:
+                    rel = path.relative_to(base).as_posix()
+                    tar.add(path, arcname=rel, recursive=False)
+                    digests[rel] = _file_digest(path)
+            os.replace(tmp, self.root / archive)
+        log = None
+        if log_path and os.path.isfile(log_path):
+            log = f"{key[:32]}.log.gz"
+            shutil.copyfile(log_path, self.root / log)
+        entry = {
+            "command": command,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_s": round(duration_s, 3),
+            "input_files": input_files,
+            "outputs": digests,
+            "archive": archive,
+            "log": log,
+            "stdout": (result.get("stdout") or "")[-4000:],
+            "stderr": (result.get("stderr") or "")[-4000:],
+            "lines": result.get("lines"),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._evict()
+            self.stats["stored"] += 1
+            self._save_quietly()
+        return entry
+
+    def note_hit(self, entry: Dict[str, Any], restored: int) -> None:
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["restored_files"] += restored
+            self.stats["time_saved_s"] = round(self.stats["time_saved_s"] + float(entry.get("duration_s") or 0.0), 3)
+            entry["last_hit"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._save_quietly()
+
+    def note_miss(self) -> None:
+        with self._lock:
+            self.stats["misses"] += 1
+            self._save_quietly()
+
+    def log_path(self, entry: Dict[str, Any]) -> Optional[str]:
+        return str(self.root / entry["log"]) if entry.get("log") else None
+
+    def summary(self) -> Dict[str, Any]:
+        """Entries, disk use and cumulative statistics of this app's cache."""
+        with self._lock:
+            entries = dict(self._entries)
+            stats = dict(self.stats)
+        size = 0
+        if self.root.is_dir():
+            size = sum(p.stat().st_size for p in self.root.iterdir() if p.is_file())
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "entries": len(entries),
+            "bytes": size,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else None,
+            **stats,
+            "commands": sorted({e.get("command") for e in entries.values() if e.get("command")}),
+        }
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            oldest = min(self._entries, key=lambda k: self._entries[k].get("last_hit") or self._entries[k].get("created") or "")
+            entry = self._entries.pop(oldest)
+            for name in (entry.get("archive"), entry.get("log")):
+                if name:
+                    try:
+                        (self.root / name).unlink()
+                    except OSError:
+                        pass
+
+    def _save_quietly(self) -> None:
+        try:
+            self._save()
+        except OSError as e:
+            print(f"[BuildCache] failed to save {self.index_path}: {e}")
+
+
+def declared(params: Dict[str, Any]) -> Optional[Tuple[List[str], List[str]]]:
+    """(inputs, outputs) globs of a terminal step that opted in to caching, else None."""
+    if not params.get("inputs") or params.get("cache") is False:
+        return None
+    inputs = _check_patterns(params["inputs"], "inputs")
+    outputs = _check_patterns(params["outputs"], "outputs") if params.get("outputs") else []
+    return inputs, outputs
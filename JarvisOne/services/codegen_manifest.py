@@ -0,0 +1,98 @@
+"""
+Code Generation Manifest
+
+Records, per generated app, which inputs produced each file so re-executing a
+strategy can skip code_generator calls whose output would not change. The
+manifest lives at APPS_ROOT/<app>/.jarvis/codegen_manifest.json and maps a
+file's path (relative to the app) to the hash of its inputs (prompt, model,
+language, path) and the hash of the content that was written.
+
+A file is reused when its inputs hash matches and the file on disk still has
+the recorded content hash, i.e. nobody edited it since it was generated.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MANIFEST_DIR = ".jarvis"
+MANIFEST_NAME = "codegen_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: Path) -> Optional[str]:
+    try:
+        return content_hash(path.read_bytes())
+    except OSError:
+        return None
+
+
+def inputs_hash(prompt: str, model: str, language: Optional[str], rel_path: str) -> str:
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "language": language or "", "path": rel_path},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CodegenManifest:
+    def __init__(self, app_root: Path):
+        self.app_root = Path(app_root)
+        self.path = self.app_root / MANIFEST_DIR / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION and isinstance(data.get("files"), dict):
+                self._files = data["files"]
+        except (OSError, ValueError):
+            self._files = {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self._files}, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def relative(self, dest: Path) -> str:
+        try:
+            return Path(dest).resolve().relative_to(self.app_root.resolve()).as_posix()
+        except ValueError:
+            return Path(dest).resolve().as_posix()
+
+    def lookup(self, dest: Path, key: str) -> Optional[Dict[str, Any]]:
+        """The manifest entry if dest was generated from the same inputs and is unmodified."""
+        with self._lock:
+            entry = self._files.get(self.relative(dest))
+        if not entry or entry.get("inputs") != key:
+            return None
+        if file_hash(Path(dest)) != entry.get("content_sha256"):
+            return None
+        return entry
+
+    def record(self, dest: Path, key: str, data: bytes, **extra: Any) -> None:
+        entry = {
+            "inputs": key,
+            "content_sha256": content_hash(data),
+            "bytes": len(data),
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **extra,
+        }
+        with self._lock:
+            self._files[self.relative(dest)] = entry
+            try:
+                self._save()
+            except OSError as e:
+                print(f"[CodegenManifest] failed to save {self.path}: {e}")
@@ -0,0 +1,95 @@
+"""
+Executor Progress Events
+
+Structured progress of ExecutorAgent runs (execution/mission/step started and
+finished, exit codes, bytes written, durations), published per strategy so
+clients do not have to poll after POST /public/execute returns.
+
+The latest state of every step is kept in memory; a new subscriber receives
+that snapshot first and then the live events. The board WebSocket exposes a
+strategy's events on the channel "executor:<strategy_id>".
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .output_stream import OutputHub
+
+CHANNEL_PREFIX = "executor:"
+MAX_STRATEGIES = 50
+
+
+def channel_for(strategy_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{strategy_id}"
+
+
+def strategy_from_channel(channel: str) -> Optional[str]:
+    if channel and channel.startswith(CHANNEL_PREFIX) and len(channel) > len(CHANNEL_PREFIX):
+        return channel[len(CHANNEL_PREFIX):]
+    return None
+
+
+class ExecutorEventStream:
+    def __init__(self, max_strategies: int = MAX_STRATEGIES, queue_size: int = 5000):
+        self.max_strategies = max_strategies
+        self.hub = OutputHub(queue_size=queue_size)
+        self._state: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _strategy_state(self, strategy_id: str) -> Dict[str, Any]:
+        state = self._state.get(strategy_id)
+        if state is None:
+            state = {"strategy_id": strategy_id, "status": "idle", "missions": {}, "steps": {}, "report": None}
+            self._state[strategy_id] = state
+            while len(self._state) > self.max_strategies:
+                self._state.popitem(last=False)
+        self._state.move_to_end(strategy_id)
+        return state
+
+    def emit(self, strategy_id: str, event: str, **fields: Any) -> Dict[str, Any]:
+        """Apply an event to the strategy's state and publish it to subscribers."""
+        return self.apply({"type": "executor_event", "channel": channel_for(strategy_id), "event": event,
+                           "strategy_id": strategy_id, "ts": time.time(), **fields})
+
+    def apply(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply an already built event payload (e.g. one forwarded from an executor worker process)."""
+        strategy_id, event = payload["strategy_id"], payload["event"]
+        fields = {k: v for k, v in payload.items() if k not in ("type", "channel", "event", "strategy_id", "ts")}
+        state = self._strategy_state(strategy_id)
+        if event == "execution_started":
+            state.update(status="running", started_at=payload["ts"], finished_at=None, report=None,
+                         missions={}, steps={})
+            for key, title in (fields.get("missions") or {}).items():
+                state["missions"][key] = {"mission": key, "title": title, "status": "pending"}
+        elif event == "execution_finished":
+            state.update(status=fields.get("status", "completed"), finished_at=payload["ts"],
+                         report=fields.get("report"))
+        elif event.startswith("mission_"):
+            mission = state["missions"].setdefault(fields.get("mission"), {"mission": fields.get("mission")})
+            mission.update({k: v for k, v in fields.items() if k != "mission"})
+        elif event.startswith("step_"):
+            key = f"{fields.get('mission_id')}:{fields.get('step_index')}"
+            state["steps"][key] = {**state["steps"].get(key, {}), **fields, "updated_at": payload["ts"]}
+        self.hub.publish(strategy_id, payload)
+        return payload
+
+    def snapshot(self, strategy_id: str) -> Dict[str, Any]:
+        state = self._state.get(strategy_id) or {"strategy_id": strategy_id, "status": "idle",
+                                                 "missions": {}, "steps": {}, "report": None}
+        return {
+            **state,
+            "missions": {k: dict(v) for k, v in state["missions"].items()},
+            "steps": {k: dict(v) for k, v in state["steps"].items()},
+        }
+
+    def subscribe(self, strategy_id: str) -> Tuple[Dict[str, Any], asyncio.Queue]:
+        """Snapshot plus a queue of later events (no event can fall between the two)."""
+        return self.snapshot(strategy_id), self.hub.subscribe(strategy_id)
+
+    def unsubscribe(self, strategy_id: str, queue: asyncio.Queue) -> None:
+        self.hub.unsubscribe(strategy_id, queue)
+
+
+executor_events = ExecutorEventStream()
@@ -0,0 +1,236 @@
+"""
+LLM Completion Cache
+
+A content-addressed, SQLite-backed cache for chat completions. Entries are keyed
+by a hash of (provider, model, messages, temperature, max_tokens), expire after a
+TTL and are evicted least-recently-used once the stored size exceeds a limit.
+Only temperature 0 calls are cached unless LLM_CACHE_MODE=all: replaying a
+sampled completion would make every rerun of a board turn identical.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MODE,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_DISABLED_AGENTS,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    cache_key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    latency_ms REAL DEFAULT 0,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access);
+"""
+
+
+def make_cache_key(provider: str, model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    """Stable content hash of everything that determines a completion."""
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe completion cache; safe to call from asyncio.to_thread workers."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        mode: str = LLM_CACHE_MODE,
+        enabled: bool = LLM_CACHE_ENABLED,
+        disabled_agents: Optional[set] = None,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode if mode in {"all", "deterministic"} else "deterministic"
+        self.enabled = enabled
+        self.disabled_agents = set(disabled_agents if disabled_agents is not None else LLM_CACHE_DISABLED_AGENTS)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_prompt_tokens": 0,
+            "saved_completion_tokens": 0,
+            "saved_latency_ms": 0.0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def applies(self, temperature: float, agent_name: Optional[str] = None, opt_out: bool = False) -> bool:
+        """Whether a call with these settings may use the cache at all."""
+        if not self.enabled or opt_out:
+            return False
+        if agent_name and agent_name in self.disabled_agents:
+            return False
+        if self.mode == "deterministic" and float(temperature) != 0.0:
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT response, prompt_tokens, completion_tokens, latency_ms, created_at "
+                    "FROM completions WHERE cache_key = ?",
+                    (key,),
+                ).fetchone()
+                if row and self.ttl_seconds > 0 and now - row[4] > self.ttl_seconds:
+                    conn.execute("DELETE FROM completions WHERE cache_key = ?", (key,))
+                    conn.commit()
+                    row = None
+                if not row:
+                    self._stats["misses"] += 1
+                    return None
+                conn.execute(
+                    "UPDATE completions SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                    (now, key),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] read failed: {e}")
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["saved_prompt_tokens"] += int(row[1] or 0)
+            self._stats["saved_completion_tokens"] += int(row[2] or 0)
+            self._stats["saved_latency_ms"] += float(row[3] or 0.0)
+            return {
+                "response": row[0],
+                "prompt_tokens": row[1],
+                "completion_tokens": row[2],
+                "latency_ms": row[3],
+            }
+
+    def put(
+        self,
+        key: str,
+        provider: str,
+        model: str,
+        response: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency_ms: float = 0.0,
+    ) -> None:
+        if not response:
+            return
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if self.max_bytes > 0 and size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO completions (
+                        cache_key, provider, model, response, prompt_tokens,
+                        completion_tokens, latency_ms, size_bytes, created_at, last_access, hits
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                    """,
+                    (key, provider, model, response, int(prompt_tokens or 0), int(completion_tokens or 0),
+                     float(latency_ms or 0.0), size, now, now),
+                )
+                self._stats["stores"] += 1
+                self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows until under max_bytes."""
+        if self.ttl_seconds > 0:
+            cur = conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._stats["evictions"] += max(cur.rowcount, 0)
+        if self.max_bytes <= 0:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for cache_key, size in conn.execute("SELECT cache_key, size_bytes FROM completions ORDER BY last_access ASC"):
+            victims.append((cache_key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM completions WHERE cache_key = ?", victims)
+        self._stats["evictions"] += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            try:
+                row = self._connection().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM completions"
+                ).fetchone()
+                out["entries"], out["size_bytes"] = row[0], row[1]
+            except sqlite3.Error:
+                out["entries"], out["size_bytes"] = None, None
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = (out["hits"] / lookups) if lookups else 0.0
+        out["enabled"] = self.enabled
+        out["mode"] = self.mode
+        out["max_bytes"] = self.max_bytes
+        out["ttl_seconds"] = self.ttl_seconds
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM completions")
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[LLMCache] clear failed: {e}")
+
+
+llm_cache = LLMCache()
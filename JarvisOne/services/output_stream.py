@@ -0,0 +1,172 @@
+"""
+Terminal Output Streaming
+
+Captures a subprocess's stdout/stderr line by line while it runs, instead of
+buffering everything until it exits:
+- the last lines of each stream are kept in a bounded ring buffer (the step
+  result only carries this tail),
+- the full log is spooled to a gzip file under the app's workspace,
+- each line is published to live subscribers (OutputHub, e.g. a WebSocket),
+- and new lines are handed to a persistence callback at most once per
+  interval (the ExecutorAgent stores them as mission activities).
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+READ_CHUNK = 64 * 1024
+MAX_LINE_CHARS = 4000
+
+
+class OutputRing:
+    """Last max_lines lines per stream, plus totals for what was dropped."""
+
+    def __init__(self, max_lines: int):
+        self.max_lines = max_lines
+        self._lines: Dict[str, Deque[str]] = {"stdout": deque(maxlen=max_lines), "stderr": deque(maxlen=max_lines)}
+        self.total_lines = {"stdout": 0, "stderr": 0}
+        self.total_bytes = 0
+
+    def append(self, stream: str, line: str) -> None:
+        self._lines[stream].append(line)
+        self.total_lines[stream] += 1
+        self.total_bytes += len(line) + 1
+
+    def text(self, stream: str) -> str:
+        return "\n".join(self._lines[stream])
+
+    @property
+    def truncated(self) -> bool:
+        return any(self.total_lines[s] > len(self._lines[s]) for s in self._lines)
+
+
+class OutputHub:
+    """In-process pub/sub of output events per key (strategy id); slow subscribers drop events."""
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.dropped = 0
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call listener(key, event) for every published event, e.g. to forward events out of an executor worker process."""
+        self._listeners.append(listener)
+
+    def subscribe(self, key: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(key, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, key: str, queue: asyncio.Queue) -> None:
+        subs = self._subscribers.get(key)
+        if subs:
+            subs.discard(queue)
+            if not subs:
+                del self._subscribers[key]
+
+    def publish(self, key: Optional[str], event: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(key or "", event)
+            except Exception as e:
+                print(f"[OutputHub] listener failed: {e}")
+        for queue in list(self._subscribers.get(key or "", ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def has_subscribers(self, key: Optional[str]) -> bool:
+        return bool(self._subscribers.get(key or ""))
+
+
+terminal_output_hub = OutputHub()
+
+
+class OutputCapture:
+    def __init__(
+        self,
+        ring_lines: int,
+        spool_path: Optional[Path] = None,
+        hub_key: Optional[str] = None,
+        event_fields: Optional[Dict[str, Any]] = None,
+        on_flush: Optional[Callable[[List[Tuple[str, str]], "OutputCapture"], None]] = None,
+        flush_interval: float = 5.0,
+        hub: OutputHub = terminal_output_hub,
+    ):
+        self.ring = OutputRing(ring_lines)
+        self.spool_path = spool_path
+        self.hub = hub
+        self.hub_key = hub_key
+        self.event_fields = event_fields or {}
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, str]] = []
+        self._last_flush = time.monotonic()
+        self._spool = None
+        if spool_path is not None:
+            try:
+                spool_path.parent.mkdir(parents=True, exist_ok=True)
+                self._spool = gzip.open(spool_path, "wt", encoding="utf-8", newline="\n")
+            except OSError as e:
+                print(f"[Terminal] could not open log spool {spool_path}: {e}")
+                self.spool_path = None
+
+    def line(self, stream: str, text: str) -> None:
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + " …"
+        self.ring.append(stream, text)
+        if self._spool:
+            self._spool.write(("E| " if stream == "stderr" else "") + text + "\n")
+        self.hub.publish(self.hub_key, {"type": "terminal_line", "stream": stream, "line": text, **self.event_fields})
+        if self.on_flush:
+            self._pending.append((stream, text))
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        """Hand lines received since the last flush to on_flush."""
+        self._last_flush = time.monotonic()
+        if self.on_flush and self._pending:
+            pending, self._pending = self._pending, []
+            try:
+                self.on_flush(pending, self)
+            except Exception as e:
+                print(f"[Terminal] failed to persist output: {e}")
+
+    async def pump(self, reader: Optional[asyncio.StreamReader], stream: str) -> None:
+        """Read a stream in chunks and split it into lines (no per-line length limit)."""
+        if reader is None:
+            return
+        partial = b""
+        while True:
+            chunk = await reader.read(READ_CHUNK)
+            if not chunk:
+                break
+            partial += chunk
+            *lines, partial = partial.split(b"\n")
+            for raw in lines:
+                self.line(stream, raw.rstrip(b"\r").decode(errors="replace"))
+            if len(partial) > MAX_LINE_CHARS * 4:
+                # A huge line with no newline yet: emit what we have so memory stays bounded
+                self.line(stream, partial.decode(errors="replace"))
+                partial = b""
+        if partial:
+            self.line(stream, partial.rstrip(b"\r").decode(errors="replace"))
+
+    def close(self, exit_event: Optional[Dict[str, Any]] = None) -> None:
+        self.flush()
+        if self._spool:
+            try:
+                self._spool.close()
+            except OSError:
+                pass
+            self._spool = None
+        if exit_event is not None:
+            self.hub.publish(self.hub_key, {"type": "terminal_exit", **self.event_fields, **exit_event})
@@ -0,0 +1,119 @@
+"""
+Compiled Plan Cache
+
+ExecutorAgent._load_plan introspects the strategies/missions schema, queries a
+strategy's missions, decodes every step blob and re-parses the LeadAgent's
+final plan message. Entry points that only need the app name (quick_edit,
+open_app) used to pay all of that per request.
+
+This cache keeps the compiled plan per strategy_id together with the
+strategy's plan version (plan_versions, bumped by triggers on every
+strategies/missions write and every LeadAgent message, migration
+006_plan_versions.sql) and the database schema version. A lookup is a single
+indexed query comparing both; writes from any process or connection
+invalidate the entry. Table column lists are cached per schema version too.
+"""
+from __future__ import annotations
+
+import copy
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from ..database import database
+from ..database.database import ensure_migration, get_connection
+
+PLAN_VERSIONS_MIGRATION = "006_plan_versions.sql"
+
+_VERSION_SQL = (
+    "SELECT (SELECT schema_version FROM pragma_schema_version), "
+    "(SELECT version FROM plan_versions WHERE strategy_id = ?)"
+)
+
+
+class CompiledPlanCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+        self._columns: Dict[Tuple[str, int, str], Set[str]] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        # Per-thread connection for version checks; a fresh connection would re-read the schema every time
+        self._local = threading.local()
+
+    def _version_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "path", None) != database.DB_PATH:
+            if conn is not None:
+                conn.close()
+            conn = get_connection()
+            self._local.conn, self._local.path = conn, database.DB_PATH
+        return conn
+
+    def version(self, conn: sqlite3.Connection, strategy_id: str) -> Tuple[int, int]:
+        """(schema version, plan version) of a strategy; (schema, 0) before its first tracked write."""
+        ensure_migration(PLAN_VERSIONS_MIGRATION)
+        row = conn.execute(_VERSION_SQL, (strategy_id,)).fetchone()
+        return int(row[0] or 0), int(row[1] or 0)
+
+    def columns(self, conn: sqlite3.Connection, table: str, schema_version: Optional[int] = None) -> Set[str]:
+        """Column names of a table, introspected once per schema version."""
+        if schema_version is None:
+            schema_version = int(conn.execute("PRAGMA schema_version").fetchone()[0])
+        key = (database.DB_PATH, schema_version, table)
+        cols = self._columns.get(key)
+        if cols is None:
+            cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+            self._columns[key] = cols
+        return cols
+
+    def get(self, strategy_id: str, compile_plan: Callable[[sqlite3.Connection, int], Dict[str, Any]],
+            conn: Optional[sqlite3.Connection] = None) -> Tuple[Dict[str, Any], bool]:
+        """The compiled plan (a private copy the caller may modify) and whether it came from the cache.
+
+        compile_plan(conn, schema_version) builds the plan on a miss.
+        """
+        own = conn is None
+        conn = conn or get_connection()
+        try:
+            version = self.version(self._version_conn(), strategy_id)
+            key = (database.DB_PATH, strategy_id)
+            with self._lock:
+                cached = self._plans.get(key)
+                if cached and cached[0] == version:
+                    self._plans.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return copy.deepcopy(cached[1]), True
+                self.stats["misses"] += 1
+            plan = compile_plan(conn, version[0])
+            # A write that landed while compiling makes this result stale; don't cache it
+            if self.version(self._version_conn(), strategy_id) == version:
+                with self._lock:
+                    self._plans[key] = (version, copy.deepcopy(plan))
+                    self._plans.move_to_end(key)
+                    while len(self._plans) > self.max_entries:
+                        self._plans.popitem(last=False)
+            return plan, False
+        finally:
+            if own:
+                conn.close()
+
+    def peek(self, strategy_id: str, field: str, compile_plan: Callable[[sqlite3.Connection, int], Dict[str, Any]]) -> Any:
+        """One top-level field of the compiled plan (e.g. app_name) without copying the whole plan."""
+        version = self.version(self._version_conn(), strategy_id)
+        with self._lock:
+            cached = self._plans.get((database.DB_PATH, strategy_id))
+            if cached and cached[0] == version:
+                self.stats["hits"] += 1
+                return cached[1].get(field)
+        plan, _ = self.get(strategy_id, compile_plan)
+        return plan.get(field)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self._columns.clear()
+
+
+plan_cache = CompiledPlanCache()
@@ -0,0 +1,279 @@
+"""
+Provider Router
+
+Tracks per-provider and per-model health (EWMA latency, EWMA error rate and a
+window of recent latencies), opens a circuit breaker after repeated failures and
+runs calls across an ordered list of (provider, model) candidates. Latency
+critical calls can be hedged: if the primary has not answered by its p95
+latency, the next candidate is started as well and the first success wins.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import (
+    ROUTER_EWMA_ALPHA,
+    ROUTER_FAILURE_THRESHOLD,
+    ROUTER_COOLDOWN_SECONDS,
+    ROUTER_HEDGE_QUANTILE,
+    ROUTER_HEDGE_MIN_SAMPLES,
+    ROUTER_HEDGE_DEFAULT_DELAY,
+)
+
+Candidate = Tuple[str, str]  # (provider, model)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Health:
+    """Rolling health for one provider or one provider/model pair."""
+
+    def __init__(self, window: int = 200):
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.samples: deque = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ewma_latency_s": self.ewma_latency,
+            "ewma_error_rate": self.ewma_error,
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "calls": self.calls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ProviderRouter:
+    def __init__(
+        self,
+        alpha: float = ROUTER_EWMA_ALPHA,
+        failure_threshold: int = ROUTER_FAILURE_THRESHOLD,
+        cooldown_seconds: float = ROUTER_COOLDOWN_SECONDS,
+        hedge_quantile: float = ROUTER_HEDGE_QUANTILE,
+        hedge_min_samples: int = ROUTER_HEDGE_MIN_SAMPLES,
+        hedge_default_delay: float = ROUTER_HEDGE_DEFAULT_DELAY,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self._health: Dict[Tuple[str, Optional[str]], _Health] = {}
+        self._lock = threading.Lock()
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def _get(self, provider: str, model: Optional[str]) -> _Health:
+        key = (provider, model)
+        h = self._health.get(key)
+        if h is None:
+            h = self._health[key] = _Health()
+        return h
+
+    # ---------------- Recording ----------------
+    def record_success(self, provider: str, model: str, latency_s: float) -> None:
+        with self._lock:
+            for h in (self._get(provider, None), self._get(provider, model)):
+                h.calls += 1
+                h.samples.append(latency_s)
+                h.ewma_latency = latency_s if h.ewma_latency is None else (
+                    self.alpha * latency_s + (1 - self.alpha) * h.ewma_latency
+                )
+                h.ewma_error = (1 - self.alpha) * h.ewma_error
+                h.consecutive_failures = 0
+                h.state = CLOSED
+                h.trial_in_flight = False
+
+    def record_failure(self, provider: str, model: str, latency_s: Optional[float] = None) -> None:
+        with self._lock:
+            for label, h in ((provider, self._get(provider, None)), (f"{provider}/{model}", self._get(provider, model))):
+                h.calls += 1
+                h.failures += 1
+                h.consecutive_failures += 1
+                h.ewma_error = self.alpha + (1 - self.alpha) * h.ewma_error
+                h.trial_in_flight = False
+                if h.state == HALF_OPEN or h.consecutive_failures >= self.failure_threshold:
+                    if h.state != OPEN:
+                        print(f"[Router] circuit opened for {label}")
+                    h.state = OPEN
+                    h.opened_at = time.monotonic()
+
+    def record_cancelled(self, provider: str, model: str, latency_s: float) -> None:
+        """A call abandoned before it answered (e.g. it lost a hedge): release a half-open trial
+        and keep its elapsed time as a latency sample, so the hedge threshold also sees slow calls."""
+        with self._lock:
+            for h in (self._get(provider, None), self._get(provider, model)):
+                h.trial_in_flight = False
+                h.samples.append(latency_s)
+
+    # ---------------- Circuit breaker ----------------
+    def _allows(self, h: _Health, claim: bool) -> bool:
+        if h.state == CLOSED:
+            return True
+        if h.state == OPEN and time.monotonic() - h.opened_at >= self.cooldown_seconds:
+            h.state = HALF_OPEN
+        if h.state == HALF_OPEN and not h.trial_in_flight:
+            if claim:
+                h.trial_in_flight = True
+            return True
+        return False
+
+    def is_available(self, provider: str, model: Optional[str] = None, claim: bool = False) -> bool:
+        """True when neither the provider nor the model circuit is open.
+
+        With claim=True a half-open circuit reserves its single trial call.
+        """
+        with self._lock:
+            keys = [(provider, None)] + ([(provider, model)] if model else [])
+            if not all(self._allows(self._get(*k), claim=False) for k in keys):
+                return False
+            if claim:
+                for k in keys:
+                    self._allows(self._get(*k), claim=True)
+            return True
+
+    def rank(self, candidates: List[Candidate]) -> List[Candidate]:
+        """Order candidates by health score; open circuits go last.
+
+        The score is EWMA latency inflated by the EWMA error rate. Candidates
+        without data get the mean known score so declared order breaks ties.
+        """
+        with self._lock:
+            scores: Dict[int, Optional[float]] = {}
+            for idx, (provider, model) in enumerate(candidates):
+                h = self._health.get((provider, model)) or self._health.get((provider, None))
+                if h and h.ewma_latency is not None:
+                    scores[idx] = h.ewma_latency * (1 + 4 * h.ewma_error)
+                else:
+                    scores[idx] = None
+        known = [v for v in scores.values() if v is not None]
+        neutral = sum(known) / len(known) if known else 0.0
+        indexed = list(enumerate(candidates))
+        healthy = [c for c in indexed if self.is_available(*c[1])]
+        blocked = [c for c in indexed if c not in healthy]
+        healthy.sort(key=lambda c: (scores[c[0]] if scores[c[0]] is not None else neutral, c[0]))
+        return [c for _, c in healthy] + [c for _, c in blocked]
+
+    def hedge_delay(self, provider: str, model: str) -> float:
+        with self._lock:
+            h = self._health.get((provider, model))
+            if not h or len(h.samples) < self.hedge_min_samples:
+                return self.hedge_default_delay
+            return h.quantile(self.hedge_quantile) or self.hedge_default_delay
+
+    # ---------------- Execution ----------------
+    async def _attempt(self, fn: Callable[[str, str], Any], candidate: Candidate) -> Any:
+        provider, model = candidate
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(fn, provider, model)
+        except asyncio.CancelledError:
+            self.record_cancelled(provider, model, time.perf_counter() - started)
+            raise
+        except Exception:
+            self.record_failure(provider, model, time.perf_counter() - started)
+            raise
+        self.record_success(provider, model, time.perf_counter() - started)
+        return result
+
+    async def call(
+        self,
+        candidates: List[Candidate],
+        fn: Callable[[str, str], Any],
+        hedge: bool = False,
+    ) -> Tuple[Any, Candidate, Dict[str, Any]]:
+        """Run fn(provider, model) over candidates; returns (result, candidate, info).
+
+        Candidates are tried in ranked order. Open circuits are skipped unless
+        nothing else is left. With hedge=True the next candidate is started
+        once the running one exceeds its p95 latency.
+        """
+        order = self.rank(candidates)
+        if not order:
+            raise RuntimeError("No provider candidates")
+        queue = list(order)
+        primary = queue[0]
+        pending: Dict[asyncio.Task, Candidate] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch_next() -> bool:
+            while queue:
+                cand = queue.pop(0)
+                # Skip open circuits while another candidate remains
+                if not self.is_available(*cand, claim=True) and (queue or pending):
+                    errors.append(f"{cand[0]}:{cand[1]} circuit open")
+                    continue
+                pending[asyncio.create_task(self._attempt(fn, cand))] = cand
+                return True
+            return False
+
+        launch_next()
+        try:
+            while pending:
+                timeout = None
+                if hedge and not hedged and queue and len(pending) == 1:
+                    running = next(iter(pending.values()))
+                    timeout = self.hedge_delay(*running)
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if launch_next():
+                        self.hedges_started += 1
+                    continue
+                for task in done:
+                    cand = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None:
+                        if hedged and cand != primary:
+                            self.hedges_won += 1
+                        info = {"fallback": cand != primary, "hedged": hedged, "errors": errors}
+                        return task.result(), cand, info
+                    errors.append(f"{cand[0]}:{cand[1]} {exc}")
+                    print(f"[Router] {cand[0]}:{cand[1]} failed: {exc}")
+                if not pending:
+                    launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Let cancelled attempts record their outcome (and release half-open trials) before returning
+                await asyncio.wait(pending.keys())
+        raise RuntimeError("All providers failed: " + "; ".join(errors))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "providers": {
+                    (p if m is None else f"{p}/{m}"): h.as_dict()
+                    for (p, m), h in self._health.items()
+                },
+                "hedges_started": self.hedges_started,
+                "hedges_won": self.hedges_won,
+            }
+
+
+provider_router = ProviderRouter()
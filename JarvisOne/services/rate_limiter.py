@@ -0,0 +1,495 @@
+"""
+Provider Rate Limiter
+
+Request-per-minute and token-per-minute buckets per provider and model,
+shared by the Board planner and the ExecutorAgent. Callers reserve a request
+plus an estimated token count before each call and wait in FIFO order per lane
+instead of bursting into 429s. Responses feed the buckets back: actual usage
+settles the estimate, x-ratelimit-* headers resync the remaining budget and a
+429's Retry-After pauses the whole lane.
+
+Bucket levels live in SQLite (rate_limit_lanes, migration 008) and are read
+and written in one short transaction per grant or adjustment, so the API
+process and every executor worker draw on the same provider budget. FIFO
+order holds within a process; across processes the first to find room wins.
+With RATE_LIMIT_SHARED=0 the buckets stay in memory and each process is
+limited separately.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import (
+    LLM_RATE_LIMITS,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_COMPLETION_ESTIMATE,
+    RATE_LIMIT_MAX_WAIT_SECONDS,
+    RATE_LIMIT_SHARED,
+)
+from ..database.database import get_connection, ensure_migration
+from .tokens import estimate_messages_tokens
+
+RATE_LIMIT_MIGRATION = "008_rate_limits.sql"
+
+# Free-tier defaults; "*" applies to models without their own entry. 0 = unlimited.
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, Dict[str, int]]] = {
+    "groq": {
+        "*": {"rpm": 30, "tpm": 6000},
+        "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000},
+    },
+    "deepseek": {
+        "*": {"rpm": 60, "tpm": 0},
+    },
+}
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a caller would have to wait longer than the configured maximum."""
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Parse '1.5', '7.66s', '2m59.56s' or '120ms' into seconds."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(text)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(num) * scale[unit] for num, unit in parts)
+
+
+def parse_rate_limit_headers(headers: Any) -> Dict[str, Optional[float]]:
+    """Extract Retry-After and x-ratelimit-* values (seconds / counts) from response headers."""
+    if not headers:
+        return {}
+
+    def get(name: str):
+        try:
+            return headers.get(name)
+        except Exception:
+            return None
+
+    def num(name: str) -> Optional[float]:
+        val = get(name)
+        try:
+            return float(val) if val is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    retry_after = parse_duration(get("retry-after"))
+    retry_after_ms = num("retry-after-ms")
+    if retry_after_ms is not None:
+        retry_after = retry_after_ms / 1000.0
+    return {
+        "retry_after": retry_after,
+        "limit_requests": num("x-ratelimit-limit-requests"),
+        "remaining_requests": num("x-ratelimit-remaining-requests"),
+        "reset_requests": parse_duration(get("x-ratelimit-reset-requests")),
+        "limit_tokens": num("x-ratelimit-limit-tokens"),
+        "remaining_tokens": num("x-ratelimit-remaining-tokens"),
+        "reset_tokens": parse_duration(get("x-ratelimit-reset-tokens")),
+    }
+
+
+def rate_limit_details(exc: BaseException) -> Optional[Dict[str, Optional[float]]]:
+    """If exc is a 429 from the Groq/OpenAI SDKs, return its parsed headers, else None."""
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status != 429 and type(exc).__name__ != "RateLimitError":
+        return None
+    return parse_rate_limit_headers(getattr(response, "headers", None))
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity per minute.
+
+    Times are wall-clock (time.time()) so levels stored by one process stay
+    meaningful in another.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        if self.unlimited:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Give back (positive) or charge (negative) tokens after the fact."""
+        if self.unlimited:
+            return
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+    def sync(self, remaining: Optional[float], now: float) -> None:
+        """Trust the provider's view of what is left in the window."""
+        if self.unlimited or remaining is None:
+            return
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class _Lane:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue: deque = deque()
+        self.blocked_until = 0.0
+        self.granted = 0
+        self.waited_s = 0.0
+        self.rate_limited = 0
+
+
+class Reservation:
+    """Handle returned by acquire(); pass it to settle() once usage is known, or release() on failure."""
+
+    def __init__(self, key: Tuple[str, str], tokens: int, waited_s: float):
+        self.key = key
+        self.tokens = tokens
+        self.waited_s = waited_s
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, Dict[str, int]]]] = None,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        shared: bool = RATE_LIMIT_SHARED,
+    ):
+        self.limits: Dict[str, Dict[str, Dict[str, int]]] = {p: dict(m) for p, m in DEFAULT_RATE_LIMITS.items()}
+        for provider, models in (limits if limits is not None else LLM_RATE_LIMITS).items():
+            self.limits.setdefault(provider, {}).update(models or {})
+        self.enabled = enabled
+        self.shared = shared
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._cond = threading.Condition()
+        self._tickets = itertools.count()
+        self._shared_warned = False
+
+    @contextmanager
+    def _synced(self, key: Tuple[str, str], lane: _Lane, write: bool = True):
+        """Under the lock: load the lane's shared levels, run the block, store them back.
+
+        One IMMEDIATE transaction, so no other process changes the row in
+        between. If SQLite is unavailable the in-memory levels are used.
+        """
+        if not self.shared:
+            yield
+            return
+        conn = None
+        try:
+            ensure_migration(RATE_LIMIT_MIGRATION)
+            conn = get_connection()
+            conn.isolation_level = None
+            # Transactions here are tiny; do not stall the caller (or its event loop) behind a long writer
+            conn.execute("PRAGMA busy_timeout = 1000")
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT requests, tokens, updated_at, blocked_until FROM rate_limit_lanes WHERE provider = ? AND model = ?",
+                key,
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            if conn:
+                conn.close()
+            if not self._shared_warned:
+                self._shared_warned = True
+                print(f"[RateLimiter] shared buckets unavailable, limiting this process only: {e}")
+            yield
+            return
+        try:
+            if row:
+                lane.requests.tokens = min(lane.requests.capacity, row["requests"])
+                lane.tokens.tokens = min(lane.tokens.capacity, row["tokens"])
+                lane.requests.updated = lane.tokens.updated = row["updated_at"]
+                lane.blocked_until = row["blocked_until"]
+            yield
+            if write:
+                now = time.time()
+                lane.requests._refill(now)
+                lane.tokens._refill(now)
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO rate_limit_lanes (provider, model, requests, tokens, updated_at, blocked_until)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (*key, lane.requests.tokens, lane.tokens.tokens, now, lane.blocked_until),
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[RateLimiter] could not store bucket levels for {key[0]}:{key[1]}: {e}")
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            conn.close()
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        key = (provider, model)
+        lane = self._lanes.get(key)
+        if lane is None:
+            by_model = self.limits.get(provider, {})
+            cfg = by_model.get(model) or by_model.get("*") or {}
+            lane = self._lanes[key] = _Lane(int(cfg.get("rpm", 0)), int(cfg.get("tpm", 0)))
+        return lane
+
+    def _try_grant(self, key: Tuple[str, str], lane: _Lane, ticket: int, tokens: int) -> Optional[float]:
+        """Under the lock: grant if ticket is at the head and budget allows.
+
+        Returns None when granted, otherwise the seconds to wait before retrying.
+        """
+        if not lane.queue or lane.queue[0] != ticket:
+            return 0.05
+        with self._synced(key, lane):
+            now = time.time()
+            wait = max(
+                lane.blocked_until - now,
+                lane.requests.wait_time(1, now),
+                lane.tokens.wait_time(tokens, now),
+            )
+            if wait > 0:
+                return wait
+            lane.requests.take(1, now)
+            lane.tokens.take(tokens, now)
+        lane.queue.popleft()
+        lane.granted += 1
+        self._cond.notify_all()
+        return None
+
+    def _enqueue(self, provider: str, model: str) -> Tuple[_Lane, int]:
+        with self._cond:
+            lane = self._lane(provider, model)
+            ticket = next(self._tickets)
+            lane.queue.append(ticket)
+            return lane, ticket
+
+    def _abandon(self, lane: _Lane, ticket: int) -> None:
+        with self._cond:
+            try:
+                lane.queue.remove(ticket)
+            except ValueError:
+                pass
+            self._cond.notify_all()
+
+    def acquire(self, provider: str, model: str, tokens: int) -> Reservation:
+        """Block (FIFO per lane) until a request and `tokens` fit in the buckets."""
+        started = time.monotonic()
+        if not self.enabled:
+            return Reservation((provider, model), tokens, 0.0)
+        lane, ticket = self._enqueue(provider, model)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_grant((provider, model), lane, ticket, tokens)
+                    if wait is None:
+                        break
+                    if time.monotonic() - started + wait > RATE_LIMIT_MAX_WAIT_SECONDS:
+                        raise RateLimitTimeout(f"Rate limit wait for {provider}:{model} exceeds {RATE_LIMIT_MAX_WAIT_SECONDS}s")
+                    self._cond.wait(timeout=min(wait, 1.0))
+        except BaseException:
+            self._abandon(lane, ticket)
+            raise
+        waited = time.monotonic() - started
+        lane.waited_s += waited
+        return Reservation((provider, model), tokens, waited)
+
+    async def acquire_async(self, provider: str, model: str, tokens: int) -> Reservation:
+        """Async variant of acquire(); waits with asyncio.sleep so the loop stays free."""
+        started = time.monotonic()
+        if not self.enabled:
+            return Reservation((provider, model), tokens, 0.0)
+        lane, ticket = self._enqueue(provider, model)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant((provider, model), lane, ticket, tokens)
+                if wait is None:
+                    break
+                if time.monotonic() - started + wait > RATE_LIMIT_MAX_WAIT_SECONDS:
+                    raise RateLimitTimeout(f"Rate limit wait for {provider}:{model} exceeds {RATE_LIMIT_MAX_WAIT_SECONDS}s")
+                await asyncio.sleep(min(wait, 0.25))
+        except BaseException:
+            self._abandon(lane, ticket)
+            raise
+        waited = time.monotonic() - started
+        lane.waited_s += waited
+        return Reservation((provider, model), tokens, waited)
+
+    def settle(self, reservation: Reservation, actual_tokens: Optional[int]) -> None:
+        """Reconcile the estimate with the provider-reported token usage."""
+        if not self.enabled or actual_tokens is None:
+            return
+        with self._cond:
+            lane = self._lane(*reservation.key)
+            with self._synced(reservation.key, lane):
+                lane.tokens.adjust(reservation.tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def release(self, reservation: Reservation) -> None:
+        """Give back the tokens of a call that failed; its request stays counted, as the provider saw it."""
+        self.settle(reservation, 0)
+
+    def observe_headers(self, provider: str, model: str, headers: Any) -> None:
+        """Resync buckets from x-ratelimit-remaining-* response headers."""
+        info = parse_rate_limit_headers(headers)
+        if not self.enabled or not info:
+            return
+        with self._cond:
+            lane = self._lane(provider, model)
+            with self._synced((provider, model), lane):
+                now = time.time()
+                lane.requests.sync(info.get("remaining_requests"), now)
+                lane.tokens.sync(info.get("remaining_tokens"), now)
+
+    def penalize(self, provider: str, model: str, info: Optional[Dict[str, Optional[float]]]) -> float:
+        """Pause a lane after a 429; returns the pause in seconds."""
+        info = info or {}
+        delay = info.get("retry_after")
+        if delay is None:
+            resets = [v for v in (info.get("reset_requests"), info.get("reset_tokens")) if v]
+            delay = max(resets) if resets else 2.0
+        with self._cond:
+            lane = self._lane(provider, model)
+            lane.rate_limited += 1
+            if self.enabled:
+                with self._synced((provider, model), lane):
+                    now = time.time()
+                    lane.blocked_until = max(lane.blocked_until, now + delay)
+                    lane.requests.sync(info.get("remaining_requests"), now)
+                    lane.tokens.sync(info.get("remaining_tokens"), now)
+            self._cond.notify_all()
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out = {}
+            for (provider, model), lane in self._lanes.items():
+                with self._synced((provider, model), lane, write=False):
+                    now = time.time()
+                    lane.requests._refill(now)
+                    lane.tokens._refill(now)
+                out[f"{provider}/{model}"] = {
+                    "rpm": lane.requests.capacity,
+                    "tpm": lane.tokens.capacity,
+                    "requests_available": None if lane.requests.unlimited else round(lane.requests.tokens, 2),
+                    "tokens_available": None if lane.tokens.unlimited else round(lane.tokens.tokens, 1),
+                    "queued": len(lane.queue),
+                    "granted": lane.granted,
+                    "rate_limited": lane.rate_limited,
+                    "total_wait_s": round(lane.waited_s, 3),
+                    "blocked_for_s": round(max(0.0, lane.blocked_until - now), 3),
+                }
+            return {"enabled": self.enabled, "shared": self.shared, "lanes": out}
+
+
+rate_limiter = RateLimiter()
+
+
+def preflight_tokens(messages: list, max_tokens: int) -> int:
+    """Tokens to reserve: estimated prompt plus the expected completion size."""
+    return estimate_messages_tokens(messages) + min(int(max_tokens or 0), RATE_LIMIT_COMPLETION_ESTIMATE)
+
+
+def call_with_rate_limit(
+    provider: str,
+    model: str,
+    messages: list,
+    max_tokens: int,
+    fn: Callable[[], Tuple[Any, Any, Any]],
+) -> Tuple[Any, Any, float]:
+    """Run a blocking provider call under the limiter, retrying 429s.
+
+    fn() must return (result, usage, headers). Returns (result, usage, queue_wait_s).
+    """
+    estimate = preflight_tokens(messages, max_tokens)
+    waited = 0.0
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        reservation = rate_limiter.acquire(provider, model, estimate)
+        waited += reservation.waited_s
+        try:
+            result, usage, headers = fn()
+        except BaseException as e:
+            # Nothing (or an unknown amount) was billed: return the reserved tokens before retrying or raising
+            rate_limiter.release(reservation)
+            info = rate_limit_details(e) if isinstance(e, Exception) else None
+            if info is None or attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            delay = rate_limiter.penalize(provider, model, info)
+            print(f"[RateLimiter] 429 from {provider}:{model}; retrying in {delay:.1f}s")
+            continue
+        rate_limiter.observe_headers(provider, model, headers)
+        rate_limiter.settle(reservation, getattr(usage, "total_tokens", None))
+        return result, usage, waited
+    raise RuntimeError(f"Rate limited by {provider}:{model}")
+
+
+async def call_with_rate_limit_async(
+    provider: str,
+    model: str,
+    messages: list,
+    max_tokens: int,
+    fn: Callable[[], Any],
+) -> Tuple[Any, Any, float]:
+    """Async counterpart of call_with_rate_limit; fn() is awaited and returns (result, usage, headers)."""
+    estimate = preflight_tokens(messages, max_tokens)
+    waited = 0.0
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        reservation = await rate_limiter.acquire_async(provider, model, estimate)
+        waited += reservation.waited_s
+        try:
+            result, usage, headers = await fn()
+        except BaseException as e:
+            # Nothing (or an unknown amount) was billed: return the reserved tokens before retrying or raising
+            rate_limiter.release(reservation)
+            info = rate_limit_details(e) if isinstance(e, Exception) else None
+            if info is None or attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            delay = rate_limiter.penalize(provider, model, info)
+            print(f"[RateLimiter] 429 from {provider}:{model}; retrying in {delay:.1f}s")
+            continue
+        rate_limiter.observe_headers(provider, model, headers)
+        rate_limiter.settle(reservation, getattr(usage, "total_tokens", None))
+        return result, usage, waited
+    raise RuntimeError(f"Rate limited by {provider}:{model}")
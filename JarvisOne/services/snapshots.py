@@ -0,0 +1,271 @@
+"""
+Workspace Snapshots
+
+Point-in-time copies of an app directory under APPS_ROOT, taken before each
+execution and each mission, so a failed execution can be rolled back as a
+whole (and inspected with a diff first).
+
+Snapshots live in APPS_ROOT/<app>/.jarvis/snapshots/<id>/ as a tree plus a
+meta.json manifest (size, mtime and mode of every file). Files are reflinked
+where the filesystem supports copy-on-write clones, otherwise copied, so a
+snapshot never shares data an in-place write could change. Hardlinks are only
+used in the explicit "hardlink" mode; such files share their inode with the
+app: the executor's own writers replace files (temp file + rename) so they
+never modify a snapshot, and a snapshot file that was changed in place by some
+other program is detected through the manifest and reported as "corrupted"
+instead of being restored.
+
+node_modules (restored from the dependency cache instead), .git and the
+.jarvis state directory are not part of snapshots.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .workspace_bootstrap import reflink
+
+SNAPSHOT_DIR = Path(".jarvis") / "snapshots"
+META_NAME = "meta.json"
+EXCLUDED_DIRS = {".jarvis", "node_modules", ".git", "__pycache__"}
+MODES = ("auto", "reflink", "hardlink", "copy")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _walk_files(root: Path):
+    """(relative posix path, absolute path) of regular files and symlinks under root, skipping EXCLUDED_DIRS."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = Path(dirpath).relative_to(root)
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+        for name in list(dirnames):
+            if os.path.islink(os.path.join(dirpath, name)):
+                dirnames.remove(name)
+                filenames.append(name)
+        for name in filenames:
+            yield (rel_dir / name).as_posix(), Path(dirpath) / name
+
+
+def _stat_entry(path: Path) -> List[Any]:
+    st = os.lstat(path)
+    return [st.st_size, st.st_mtime_ns, st.st_mode & 0o7777, os.readlink(path) if os.path.islink(path) else None]
+
+
+def _same_content(a: Path, b: Path) -> bool:
+    try:
+        sa, sb = os.lstat(a), os.lstat(b)
+    except OSError:
+        return False
+    if (sa.st_ino, sa.st_dev) == (sb.st_ino, sb.st_dev):
+        return True
+    if os.path.islink(a) or os.path.islink(b):
+        return os.path.islink(a) and os.path.islink(b) and os.readlink(a) == os.readlink(b)
+    if sa.st_size != sb.st_size:
+        return False
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            ca, cb = fa.read(1024 * 1024), fb.read(1024 * 1024)
+            if ca != cb:
+                return False
+            if not ca:
+                return True
+
+
+class SnapshotStore:
+    def __init__(self, app_root: Path, mode: str = "auto"):
+        self.app_root = Path(app_root)
+        self.root = self.app_root / SNAPSHOT_DIR
+        self.mode = mode if mode in MODES else "auto"
+        self._lock = threading.Lock()
+
+    # ---------------- Creating ----------------
+
+    def _place(self, src: Path, dst: Path, mode: str) -> str:
+        """Put a copy of src at dst using mode ('auto' tries reflink, then copy). Returns the mode used."""
+        if os.path.islink(src):
+            os.symlink(os.readlink(src), dst)
+            return "symlink"
+        if mode in ("auto", "reflink") and reflink(src, dst):
+            return "reflink"
+        if mode == "hardlink":
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        return "copy"
+
+    def create(self, label: str = "", **info: Any) -> Dict[str, Any]:
+        """Snapshot the app directory; returns the snapshot's metadata (without the manifest)."""
+        if not self.app_root.is_dir():
+            raise SnapshotError(f"app directory {self.app_root} does not exist")
+        started = time.monotonic()
+        snap_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        staging = self.root / f".{snap_id}.tmp"
+        tree = staging / "tree"
+        tree.mkdir(parents=True)
+        counts = {"reflink": 0, "hardlink": 0, "copy": 0, "symlink": 0}
+        manifest: Dict[str, List[Any]] = {}
+        mode = self.mode
+        try:
+            for rel, src in _walk_files(self.app_root):
+                dst = tree / rel
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    used = self._place(src, dst, mode)
+                except FileNotFoundError:
+                    continue  # removed while we were walking
+                counts[used] += 1
+                if mode == "auto" and used == "copy":
+                    mode = "copy"  # no reflinks on this filesystem; don't retry them per file
+                manifest[rel] = _stat_entry(dst)
+            meta = {
+                "id": snap_id,
+                "label": label,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "created_ts": time.time(),
+                "files": len(manifest),
+                "bytes": sum(entry[0] for entry in manifest.values()),
+                "modes": counts,
+                "seconds": round(time.monotonic() - started, 3),
+                **info,
+            }
+            (staging / META_NAME).write_text(json.dumps({**meta, "manifest": manifest}), encoding="utf-8")
+            os.replace(staging, self.root / snap_id)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return meta
+
+    # ---------------- Reading ----------------
+
+    def _load(self, snap_id: str) -> Dict[str, Any]:
+        if not snap_id or "/" in snap_id or "\\" in snap_id or snap_id.startswith("."):
+            raise SnapshotError(f"invalid snapshot id {snap_id!r}")
+        try:
+            return json.loads((self.root / snap_id / META_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            raise SnapshotError(f"snapshot {snap_id} not found")
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Snapshots of this app, newest first (metadata only)."""
+        if not self.root.is_dir():
+            return []
+        metas = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            try:
+                meta = self._load(entry.name)
+            except SnapshotError:
+                continue
+            meta.pop("manifest", None)
+            metas.append(meta)
+        return sorted(metas, key=lambda m: m.get("created_ts", 0), reverse=True)
+
+    def diff(self, snap_id: str) -> Dict[str, Any]:
+        """Changes in the app since the snapshot: added, removed and modified files.
+
+        'corrupted' lists snapshot files that were modified in place through a
+        shared hardlink; they cannot be restored.
+        """
+        meta = self._load(snap_id)
+        manifest: Dict[str, List[Any]] = meta.get("manifest") or {}
+        tree = self.root / snap_id / "tree"
+        current = dict(_walk_files(self.app_root))
+        added = sorted(rel for rel in current if rel not in manifest)
+        removed, modified, corrupted = [], [], []
+        for rel, recorded in manifest.items():
+            snap_file = tree / rel
+            try:
+                intact = _stat_entry(snap_file)[:2] == recorded[:2]
+            except OSError:
+                intact = False
+            if not intact:
+                corrupted.append(rel)
+            if rel not in current:
+                removed.append(rel)
+            elif intact and not _same_content(current[rel], snap_file):
+                modified.append(rel)
+            elif not intact:
+                modified.append(rel)
+        return {"id": snap_id, "label": meta.get("label"), "created": meta.get("created"),
+                "added": added, "removed": sorted(removed), "modified": sorted(modified),
+                "corrupted": sorted(corrupted)}
+
+    # ---------------- Rolling back ----------------
+
+    def rollback(self, snap_id: str) -> Dict[str, Any]:
+        """Make the app match the snapshot: restore removed/modified files and delete added ones.
+
+        The result carries the snapshot's strategy_id and created_ts so the
+        caller can reset the executor steps that ran after it.
+        """
+        with self._lock:
+            meta = self._load(snap_id)
+            changes = self.diff(snap_id)
+            tree = self.root / snap_id / "tree"
+            corrupted = set(changes["corrupted"])
+            restored, skipped = [], []
+            for rel in changes["removed"] + changes["modified"]:
+                if rel in corrupted:
+                    skipped.append(rel)
+                    continue
+                dest = self.app_root / rel
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dest.with_name(f".{dest.name}.rollback-{uuid.uuid4().hex[:6]}")
+                self._place(tree / rel, tmp, self.mode)
+                if dest.is_dir() and not dest.is_symlink():
+                    shutil.rmtree(dest)
+                os.replace(tmp, dest)
+                restored.append(rel)
+            deleted = []
+            for rel in changes["added"]:
+                try:
+                    os.unlink(self.app_root / rel)
+                    deleted.append(rel)
+                except FileNotFoundError:
+                    pass
+            self._prune_empty_dirs(changes["added"])
+        return {"id": snap_id, "restored": restored, "deleted": deleted, "skipped_corrupted": skipped,
+                "strategy_id": meta.get("strategy_id"), "created_ts": meta.get("created_ts")}
+
+    def _prune_empty_dirs(self, removed_files: List[str]) -> None:
+        dirs = {Path(rel).parent for rel in removed_files}
+        for rel_dir in sorted(dirs, key=lambda p: len(p.parts), reverse=True):
+            path = self.app_root / rel_dir
+            while rel_dir.parts and path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+                rel_dir, path = rel_dir.parent, path.parent
+
+    # ---------------- Retention ----------------
+
+    def delete(self, snap_id: str) -> None:
+        self._load(snap_id)
+        shutil.rmtree(self.root / snap_id, ignore_errors=True)
+
+    def gc(self, keep: int, max_age_days: float = 0) -> List[str]:
+        """Delete snapshots beyond the newest `keep`, and those older than max_age_days (0 = no age limit)."""
+        removed = []
+        cutoff = time.time() - max_age_days * 86400 if max_age_days > 0 else None
+        for index, meta in enumerate(self.list()):
+            too_many = keep > 0 and index >= keep
+            too_old = cutoff is not None and meta.get("created_ts", 0) < cutoff
+            if too_many or too_old:
+                shutil.rmtree(self.root / meta["id"], ignore_errors=True)
+                removed.append(meta["id"])
+        # Leftovers of interrupted snapshots (recent ones may still be in progress)
+        if self.root.is_dir():
+            for entry in self.root.iterdir():
+                if entry.name.startswith(".") and entry.name.endswith(".tmp") and time.time() - entry.stat().st_mtime > 3600:
+                    shutil.rmtree(entry, ignore_errors=True)
+        return removed
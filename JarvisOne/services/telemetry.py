@@ -0,0 +1,232 @@
+"""
+LLM Call Telemetry
+
+Records one row per provider attempt (board turns and executor tools) into the
+llm_calls table through a BatchWriter, and aggregates them into per strategy /
+agent / model totals and latency percentiles.
+
+Strategy, agent and fallback details are carried in a context variable, so
+code deep in a call chain can record a call without threading them through
+every signature; asyncio tasks and asyncio.to_thread inherit the context.
+"""
+from __future__ import annotations
+
+import contextvars
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..config import LLM_USAGE_DEFAULT_WINDOW_HOURS
+from ..database.database import get_connection, ensure_migration
+from .batch_writer import BatchWriter
+from .budgets import budget_tracker
+
+LLM_CALLS_MIGRATION = "004_llm_calls.sql"
+GROUP_COLUMNS = ("strategy_id", "source", "agent", "provider", "model")
+
+_call_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("llm_call_context", default={})
+
+
+def _calls_written(rows: List[tuple]) -> None:
+    """Hand billed rows over from the budget's in-memory charges to its llm_calls reads."""
+    for strategy_id, _, _, _, _, prompt_tokens, completion_tokens, _, _, cached, _, error in rows:
+        if not cached and not error:
+            budget_tracker.written(strategy_id, prompt_tokens + completion_tokens)
+
+
+llm_call_writer = BatchWriter(
+    """
+    INSERT INTO llm_calls (
+        strategy_id, source, agent, provider, model, prompt_tokens, completion_tokens,
+        queue_wait_ms, latency_ms, cached, fallback, error
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    migration=LLM_CALLS_MIGRATION,
+    name="LLMTelemetry",
+    on_written=_calls_written,
+)
+
+
+@contextmanager
+def llm_call_context(**fields: Any):
+    """Attach strategy_id / source / agent / fallback to calls recorded inside the block."""
+    token = _call_context.set({**_call_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_call_context() -> Dict[str, Any]:
+    return dict(_call_context.get())
+
+
+def record_llm_call(
+    provider: str,
+    model: str,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    queue_wait_s: float = 0.0,
+    latency_s: float = 0.0,
+    cached: bool = False,
+    error: Optional[str] = None,
+    **overrides: Any,
+) -> None:
+    """Queue one call record and charge its tokens to the strategy's budget.
+
+    Never blocks or raises into the caller.
+    """
+    ctx = {**_call_context.get(), **overrides}
+    try:
+        if not cached and not error:
+            budget_tracker.charge(ctx.get("strategy_id"), int(prompt_tokens or 0) + int(completion_tokens or 0))
+        llm_call_writer.submit((
+            ctx.get("strategy_id"),
+            ctx.get("source"),
+            ctx.get("agent"),
+            provider,
+            model,
+            int(prompt_tokens or 0),
+            int(completion_tokens or 0),
+            round(float(queue_wait_s or 0.0) * 1000.0, 2),
+            round(float(latency_s or 0.0) * 1000.0, 2),
+            1 if cached else 0,
+            1 if ctx.get("fallback") else 0,
+            (str(error)[:500] if error else None),
+        ))
+    except Exception as e:
+        print(f"[Telemetry] failed to record call: {e}")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of values (q in 0..1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Ranks round half up, as in the SQL of _group_rows()
+    idx = min(len(ordered) - 1, max(0, int(q * (len(ordered) - 1) + 0.5)))
+    return ordered[idx]
+
+
+# A call counts as failed when error is non-empty; billed calls are the successful, uncached ones
+_FAILED = "COALESCE(error, '') != ''"
+_BILLED = f"NOT ({_FAILED}) AND COALESCE(cached, 0) = 0"
+
+
+def _group_rows(conn: sqlite3.Connection, keys: List[str], where: str, params: list) -> Dict[tuple, Dict[str, Any]]:
+    """Per-group counts, token sums and percentiles, computed by SQLite; {} key tuple = everything."""
+    cols = ", ".join(keys)
+    select_keys = f"{cols}, " if keys else ""
+    group = f" GROUP BY {cols}" if keys else ""
+    partition = f"PARTITION BY {cols} " if keys else ""
+    out: Dict[tuple, Dict[str, Any]] = {}
+    for row in conn.execute(
+        f"""
+        SELECT {select_keys}
+            COUNT(*) AS calls,
+            SUM({_FAILED}) AS errors,
+            SUM(NOT ({_FAILED}) AND COALESCE(cached, 0) != 0) AS cached,
+            SUM(COALESCE(fallback, 0) != 0) AS fallbacks,
+            SUM(CASE WHEN {_BILLED} THEN COALESCE(prompt_tokens, 0) ELSE 0 END) AS prompt_tokens,
+            SUM(CASE WHEN {_BILLED} THEN COALESCE(completion_tokens, 0) ELSE 0 END) AS completion_tokens,
+            MAX(CASE WHEN {_BILLED} THEN latency_ms END) AS latency_max,
+            SUM(queue_wait_ms) AS queue_wait_total
+        FROM llm_calls{where}{group}
+        """,
+        params,
+    ):
+        out[tuple(row[k] for k in keys)] = dict(row)
+    # Nearest-rank percentiles (as percentile()) with window functions, so rows never leave SQLite
+    for column, condition, quantiles in (("latency_ms", _BILLED, (0.50, 0.95, 0.99)),
+                                         ("queue_wait_ms", "1", (0.50, 0.95))):
+        picks = ", ".join(
+            f"MAX(CASE WHEN rn = 1 + CAST(ROUND({q} * (n - 1)) AS INTEGER) THEN v END) AS p{int(q * 100)}"
+            for q in quantiles
+        )
+        sql = f"""
+            WITH ranked AS (
+                SELECT {select_keys}{column} AS v,
+                       ROW_NUMBER() OVER ({partition}ORDER BY {column}) AS rn,
+                       COUNT(*) OVER ({partition.strip()}) AS n
+                FROM llm_calls{where}{" AND " if where else " WHERE "}{condition}
+            )
+            SELECT {select_keys}{picks} FROM ranked{group}
+        """
+        for row in conn.execute(sql, params):
+            group_row = out.get(tuple(row[k] for k in keys))
+            if group_row is not None:
+                group_row[column] = {f"p{int(q * 100)}": row[f"p{int(q * 100)}"] for q in quantiles}
+    return out
+
+
+def _summary(row: Dict[str, Any]) -> Dict[str, Any]:
+    latency = row.get("latency_ms") or {}
+    waits = row.get("queue_wait_ms") or {}
+    prompt, completion = int(row["prompt_tokens"] or 0), int(row["completion_tokens"] or 0)
+    return {
+        "calls": row["calls"],
+        "errors": int(row["errors"] or 0),
+        "cached": int(row["cached"] or 0),
+        "fallbacks": int(row["fallbacks"] or 0),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+        "latency_ms": {
+            "p50": latency.get("p50"),
+            "p95": latency.get("p95"),
+            "p99": latency.get("p99"),
+            "max": row["latency_max"],
+        },
+        "queue_wait_ms": {
+            "p50": waits.get("p50"),
+            "p95": waits.get("p95"),
+            "total": round(row["queue_wait_total"] or 0.0, 2),
+        },
+    }
+
+
+def llm_usage(
+    group_by: Iterable[str] = ("strategy_id", "agent", "model"),
+    strategy_id: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Totals and percentiles over llm_calls, overall and per group.
+
+    group_by may combine strategy_id, source, agent, provider and model.
+    since filters on created_at (SQLite timestamp, e.g. '2025-01-31 12:00:00');
+    without since or strategy_id, only the last LLM_USAGE_DEFAULT_WINDOW_HOURS
+    are covered. Aggregation runs in SQL; calls still queued in the writer
+    (writer.pending) are not included yet.
+    """
+    keys = [k for k in group_by if k in GROUP_COLUMNS]
+    ensure_migration(LLM_CALLS_MIGRATION)
+    if not since and not strategy_id and LLM_USAGE_DEFAULT_WINDOW_HOURS > 0:
+        since = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - LLM_USAGE_DEFAULT_WINDOW_HOURS * 3600))
+    clauses, params = [], []
+    if strategy_id:
+        clauses.append("strategy_id = ?")
+        params.append(strategy_id)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    conn = get_connection()
+    try:
+        totals = _group_rows(conn, [], where, params).get(())
+        groups = _group_rows(conn, keys, where, params) if keys else {}
+    finally:
+        conn.close()
+    empty = {"calls": 0, "errors": 0, "cached": 0, "fallbacks": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "latency_max": None, "queue_wait_total": 0.0}
+    return {
+        "group_by": keys,
+        "since": since,
+        "totals": _summary(totals if totals and totals["calls"] else empty),
+        "groups": [
+            {**dict(zip(keys, group)), **_summary(row)}
+            for group, row in sorted(groups.items(), key=lambda kv: tuple(str(v) for v in kv[0]))
+        ],
+        "writer": llm_call_writer.stats(),
+    }
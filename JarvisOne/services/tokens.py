@@ -0,0 +1,26 @@
+"""
+Token estimation helpers.
+
+A cheap, dependency-free approximation (~4 characters per token) used for
+pre-flight budgeting. Provider usage numbers replace these estimates whenever
+a response reports them.
+"""
+from typing import Iterable
+
+CHARS_PER_TOKEN = 4
+# Per-message overhead for role/formatting tokens in chat completions
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def estimate_messages_tokens(messages: Iterable[dict]) -> int:
+    total = 2
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        total += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(content if isinstance(content, str) else "")
+    return total
@@ -7,6 +7,9 @@ and logging actions.
 """
 import time
 
+from ..config import EXECUTOR_LOG_LEVEL
+from .action_log import action_logger
+
 class ToolBelt:
     def execute_tool(self, tool: str, action: str, params: dict):
         """
@@ -19,29 +22,32 @@ class ToolBelt:
         
         # Retry logic
         for i in range(3):
+            started = time.monotonic()
             try:
                 result = handler(action, params)
-                self.log_action(tool, action, params, result, success=True)
+                self.log_action(tool, action, params, result, success=True,
+                                duration_ms=(time.monotonic() - started) * 1000.0)
                 return result
             except Exception as e:
                 print(f"[ToolBelt]: Attempt {i+1} failed for {tool}.{action}. Error: {e}")
                 if i < 2:
                     time.sleep((i+1) * 2) # Exponential backoff: 2s, 4s
                 else:
-                    self.log_action(tool, action, params, str(e), success=False)
+                    self.log_action(tool, action, params, str(e), success=False,
+                                    duration_ms=(time.monotonic() - started) * 1000.0)
                     raise e # Re-raise the exception after final attempt
 
-    def log_action(self, tool, action, request, response, success):
+    def log_action(self, tool, action, request, response, success, duration_ms=None, mission_id=None):
         """
-        Logs the tool action to the database.
-        (This is a stub for now).
+        Logs the tool action to actions_log (queued; see services/action_log.py).
         """
-        print(f"--- Action Log ---")
-        print(f"  Tool: {tool}.{action}")
-        print(f"  Success: {success}")
-        print(f"  Request: {request}")
-        print(f"  Response: {response}")
-        print(f"--------------------")
+        action_logger.log(tool, action, request, response, success, mission_id=mission_id,
+                          step_name=f"{tool}.{action}", duration_ms=duration_ms,
+                          error=None if success else str(response))
+        # Failures are always printed; per-call success lines only at EXECUTOR_LOG_LEVEL=debug
+        if not success or EXECUTOR_LOG_LEVEL == "debug":
+            print(f"[ToolBelt]: {tool}.{action} {'succeeded' if success else 'failed'}"
+                  + (f" in {duration_ms:.0f} ms" if duration_ms is not None else ""))
 
 
     # --- Tool Implementations (Stubs) ---
@@ -0,0 +1,153 @@
+"""
+Topic Similarity Index
+
+Finds earlier strategies whose topic is a near-duplicate of a new one, so a
+resubmitted topic can reuse or fork an existing strategy instead of running a
+full board discussion again.
+
+Topics are normalized (lowercase, punctuation and stopwords removed) and
+turned into a local hashed embedding: word shingles (unigrams and bigrams)
+plus character trigrams, feature-hashed into a fixed number of buckets and
+L2-normalized. Similarity is the cosine between two embeddings. Embeddings
+are computed once per strategy and the index picks up new strategies and
+in-flight board runs from the database on each lookup.
+"""
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from ..config import TOPIC_SIMILARITY_THRESHOLD
+from ..database.database import get_connection, ensure_migration
+
+EMBEDDING_DIM = 1024
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or that the this to with "
+    "it's their them they we you your our can could should would will".split()
+)
+
+
+def normalize_topic(text: str) -> str:
+    words = _WORD.findall((text or "").lower())
+    return " ".join(w for w in words if w not in _STOPWORDS)
+
+
+def topic_shingles(normalized: str) -> Counter:
+    """Word unigrams/bigrams and character trigrams of a normalized topic."""
+    words = normalized.split()
+    feats: Counter = Counter(f"w:{w}" for w in words)
+    feats.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    padded = f" {normalized} "
+    feats.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return feats
+
+
+def embed_topic(text: str, dim: int = EMBEDDING_DIM) -> Dict[int, float]:
+    """Sparse, L2-normalized hashed embedding of a topic (bucket -> weight)."""
+    vec: Dict[int, float] = {}
+    for feat, count in topic_shingles(normalize_topic(text)).items():
+        h = zlib.crc32(feat.encode("utf-8"))
+        bucket = h % dim
+        # Signed hashing keeps collisions from only ever adding similarity
+        sign = 1.0 if (h >> 31) & 1 == 0 else -1.0
+        vec[bucket] = vec.get(bucket, 0.0) + sign * (1.0 + math.log(count))
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {k: v / norm for k, v in vec.items()} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class TopicIndex:
+    def __init__(self, threshold: float = TOPIC_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "offers": 0, "reused": 0, "forked": 0, "regenerated": 0,
+                       "discussions_avoided": 0, "turns_avoided": 0}
+
+    def refresh(self) -> None:
+        """Index strategies (and still-running board discussions) not seen yet."""
+        conn = None
+        try:
+            ensure_migration("003_board_runs.sql")
+            conn = get_connection()
+            rows = conn.execute(
+                """
+                SELECT strategy_id, user_id, topic, status, created_at FROM strategies
+                WHERE topic IS NOT NULL AND COALESCE(status, '') != 'rejected'
+                UNION ALL
+                SELECT strategy_id, user_id, topic, 'discussing', started_at FROM board_runs
+                WHERE status = 'running' AND strategy_id NOT IN (SELECT strategy_id FROM strategies)
+                """
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[TopicIndex] refresh failed: {e}")
+            return
+        finally:
+            if conn:
+                conn.close()
+        with self._lock:
+            seen = set()
+            for row in rows:
+                sid = row["strategy_id"]
+                seen.add(sid)
+                entry = self._entries.get(sid)
+                if entry is None or entry["topic"] != row["topic"]:
+                    self._entries[sid] = entry = {"topic": row["topic"], "vector": embed_topic(row["topic"])}
+                entry.update(user_id=row["user_id"], status=row["status"], created_at=row["created_at"], pinned=False)
+            # Drop rejected/deleted strategies and runs that ended without a strategy;
+            # entries added via add() stay until their board run shows up in the database
+            for sid in [s for s, e in self._entries.items() if s not in seen and not e.get("pinned")]:
+                del self._entries[sid]
+
+    def add(self, strategy_id: str, topic: str, status: str = "discussing", user_id: Optional[int] = None) -> None:
+        """Index a discussion right away, before its board run is checkpointed."""
+        with self._lock:
+            self._entries[strategy_id] = {"topic": topic, "vector": embed_topic(topic), "status": status,
+                                          "user_id": user_id, "created_at": None, "pinned": True}
+
+    def similar(self, topic: str, threshold: Optional[float] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Indexed strategies at or above the similarity threshold, best first."""
+        self.refresh()
+        cutoff = self.threshold if threshold is None else threshold
+        query = embed_topic(topic)
+        with self._lock:
+            self._stats["lookups"] += 1
+            scored = [
+                {"strategy_id": sid, "topic": e["topic"], "status": e["status"], "user_id": e["user_id"],
+                 "created_at": e["created_at"], "similarity": round(cosine(query, e["vector"]), 4)}
+                for sid, e in self._entries.items()
+            ]
+        matches = [m for m in scored if m["similarity"] >= cutoff]
+        matches.sort(key=lambda m: (-m["similarity"], str(m["created_at"] or "")))
+        return matches[:limit]
+
+    def record(self, decision: str, discussions: int = 1, turns_avoided: int = 0) -> None:
+        """Count an outcome (offer, reused, forked or regenerated) and the board turns it saved."""
+        with self._lock:
+            key = {"offer": "offers"}.get(decision, decision)
+            if key in self._stats:
+                self._stats[key] += discussions
+            if decision == "reused":
+                self._stats["discussions_avoided"] += discussions
+            self._stats["turns_avoided"] += turns_avoided
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["indexed"] = len(self._entries)
+        out["threshold"] = self.threshold
+        return out
+
+
+topic_index = TopicIndex()
@@ -0,0 +1,416 @@
+"""
+Workspace Bootstrapper
+
+Scaffolds generated apps from the local templates in templates/ and shares
+installed dependencies between apps, so a strategy does not spend minutes on
+`npx create-...` and `npm install` for every app it builds.
+
+- Templates are copied into APPS_ROOT/<app> with {{PLACEHOLDER}} variables
+  rendered in file names and contents. Each file is written atomically (temp
+  file + rename), and files that already exist in the app are left alone.
+  Template files are reflinked where the filesystem supports it (copy-on-write),
+  otherwise copied; they are never hardlinked since tools rewrite app files in
+  place.
+- node_modules trees are kept in a content-addressed store under
+  DEPENDENCY_CACHE_ROOT, keyed by a hash of package.json dependencies (and the
+  lockfile, if any). Files enter the store as reflinks/copies, never as links
+  to the app's own files, and are made read-only there (as pnpm does). A new
+  app with the same dependencies gets the tree as hardlinks to those read-only
+  files (falling back to reflinks/copies across devices), so an in-place write
+  fails instead of changing the store and every app sharing it.
+- npm/yarn/pnpm/pip install commands in terminal steps are rewritten to use a
+  shared package cache in prefer-offline mode; a plain `npm install` whose
+  node_modules was restored from the store is skipped, and
+  `npx create-expo-app` is served from the expo template.
+"""
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ..config import WORKSPACE_TEMPLATES_DIR
+
+TEMPLATES_ROOT = Path(WORKSPACE_TEMPLATES_DIR)
+# npx scaffolding commands that a local template can replace
+CREATE_COMMAND_TEMPLATES = {
+    "create-expo-app": "expo-template",
+    "create-expo": "expo-template",
+}
+COMPLETE_MARKER = ".jarvis-complete"
+_PLACEHOLDER = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+_SEPARATORS = re.compile(r"(\s*(?:&&|\|\||;)\s*)")
+FICLONE = 0x40049409  # Linux ioctl: share the source file's extents (btrfs, xfs, ...)
+WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class CommandRewrite(NamedTuple):
+    command: str
+    env: Dict[str, str]
+    action: str  # "run" | "skip" | "template"
+    note: str = ""
+    template: Optional[str] = None
+    target: Optional[str] = None
+    installs: bool = False
+
+
+# ---------------- File primitives ----------------
+
+def reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone of src to dst; False where the platform/filesystem has no reflinks."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+
+
+def clone_file(src: Path, dst: Path) -> str:
+    """Reflink src to dst if possible, else copy it. Returns the mode used."""
+    if reflink(src, dst):
+        return "reflink"
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def link_tree(src: Path, dst: Path, hardlink: bool = True, read_only: bool = False) -> Dict[str, int]:
+    """Recreate the tree src at dst with hardlinked files (reflink/copy where linking fails).
+
+    hardlink=False clones every file instead; read_only=True strips the write
+    bits from the files created at dst.
+    """
+    counts = {"hardlink": 0, "reflink": 0, "copy": 0, "symlink": 0}
+    src = Path(src)
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = Path(dirpath).relative_to(src)
+        target_dir = Path(dst) / rel
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for name in list(dirnames):
+            if os.path.islink(os.path.join(dirpath, name)):
+                # os.walk does not descend into symlinked dirs; recreate the link itself
+                dirnames.remove(name)
+                filenames.append(name)
+        for name in filenames:
+            s, d = Path(dirpath) / name, target_dir / name
+            if os.path.lexists(d):
+                continue
+            if os.path.islink(s):
+                os.symlink(os.readlink(s), d)
+                counts["symlink"] += 1
+                continue
+            if not hardlink:
+                counts[clone_file(s, d)] += 1
+            else:
+                try:
+                    os.link(s, d)
+                    counts["hardlink"] += 1
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+                        raise
+                    counts[clone_file(s, d)] += 1
+            if read_only:
+                os.chmod(d, stat.S_IMODE(os.lstat(d).st_mode) & ~WRITE_BITS)
+    return counts
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write data to path via a temp file in the same directory and os.replace."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ---------------- Templates ----------------
+
+def available_templates() -> List[str]:
+    if not TEMPLATES_ROOT.is_dir():
+        return []
+    return sorted(p.name for p in TEMPLATES_ROOT.iterdir() if p.is_dir())
+
+
+def resolve_template(name: Optional[str]) -> Optional[Path]:
+    """Template directory for 'expo-template' or 'expo'; None if there is no such template."""
+    if not name:
+        return None
+    for candidate in (name, f"{name}-template"):
+        path = TEMPLATES_ROOT / candidate
+        if candidate and "/" not in candidate and "\\" not in candidate and path.is_dir():
+            return path
+    return None
+
+
+def template_variables(app_name: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    slug = re.sub(r"[^a-z0-9]+", "-", app_name.lower()).strip("-") or "app"
+    ident = slug.replace("-", "")
+    component = "".join(part.capitalize() for part in slug.split("-")) or "Main"
+    values = {
+        "APP_NAME": app_name,
+        "APP_SLUG": slug,
+        "APP_SCHEME": ident,
+        "BUNDLE_ID": f"com.jarvis.{ident}",
+        "PACKAGE_NAME": f"com.jarvis.{ident}",
+        "MODULE_NAME": slug,
+        "MODULE_COMPONENT": f"{component}Screen",
+        "API_ENDPOINT": "",
+    }
+    values.update({str(k).upper(): str(v) for k, v in (overrides or {}).items()})
+    return values
+
+
+def render(text: str, variables: Dict[str, str]) -> str:
+    return _PLACEHOLDER.sub(lambda m: variables.get(m.group(1), m.group(0)), text)
+
+
+def materialize_template(template: str, app_root: Path, variables: Dict[str, str]) -> Dict[str, Any]:
+    """Copy a template into app_root; existing files are kept. Returns counts and the files written."""
+    source = resolve_template(template)
+    if source is None:
+        raise FileNotFoundError(f"unknown template {template!r} (available: {', '.join(available_templates()) or 'none'})")
+    app_root = Path(app_root)
+    written: List[str] = []
+    counts = {"rendered": 0, "reflink": 0, "copy": 0, "kept": 0}
+    for src in sorted(p for p in source.rglob("*") if p.is_file()):
+        rel = Path(render(src.relative_to(source).as_posix(), variables))
+        dest = app_root / rel
+        if dest.exists():
+            counts["kept"] += 1
+            continue
+        data = src.read_bytes()
+        if b"{{" in data:
+            try:
+                write_atomic(dest, render(data.decode("utf-8"), variables).encode("utf-8"))
+                counts["rendered"] += 1
+                written.append(rel.as_posix())
+                continue
+            except UnicodeDecodeError:
+                pass
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=".tmp", dir=str(dest.parent))
+        os.close(fd)
+        try:
+            counts[clone_file(src, Path(tmp))] += 1
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        written.append(rel.as_posix())
+    return {"template": source.name, "files": written, **counts}
+
+
+# ---------------- Shared dependency cache ----------------
+
+def _hash_json(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+class DependencyCache:
+    def __init__(self, root: Path, offline: bool = True):
+        self.root = Path(root)
+        self.offline = offline
+        self._lock = threading.Lock()
+        self.stats = {"restored": 0, "stored": 0, "skipped_installs": 0, "templates": 0, "rewritten": 0}
+
+    @property
+    def npm_cache(self) -> Path:
+        return self.root / "npm"
+
+    @property
+    def pip_cache(self) -> Path:
+        return self.root / "pip"
+
+    @property
+    def wheelhouse(self) -> Path:
+        return self.root / "wheels"
+
+    def node_key(self, app_root: Path) -> Optional[str]:
+        """Hash of package.json dependencies plus the lockfile; None without a readable package.json."""
+        app_root = Path(app_root)
+        try:
+            pkg = json.loads((app_root / "package.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        lock = ""
+        for name in ("package-lock.json", "yarn.lock", "pnpm-lock.yaml"):
+            path = app_root / name
+            if path.is_file():
+                lock = hashlib.sha256(path.read_bytes()).hexdigest()
+                break
+        deps = {k: pkg.get(k) or {} for k in ("dependencies", "devDependencies", "optionalDependencies")}
+        if not any(deps.values()):
+            return None
+        return _hash_json({"deps": deps, "lock": lock})
+
+    def _node_entry(self, key: str) -> Path:
+        return self.root / "node_modules" / key
+
+    def restore_node_modules(self, app_root: Path) -> Optional[Dict[str, Any]]:
+        """Hardlink a cached node_modules with the same dependency hash into the app, if there is one.
+
+        The linked files are the store's read-only copies; package managers
+        replace them (unlink + create) rather than writing through the link.
+        """
+        app_root = Path(app_root)
+        key = self.node_key(app_root)
+        if not key or (app_root / "node_modules").exists():
+            return None
+        entry = self._node_entry(key)
+        if not (entry / COMPLETE_MARKER).exists():
+            return None
+        counts = link_tree(entry / "node_modules", app_root / "node_modules")
+        write_atomic(app_root / "node_modules" / COMPLETE_MARKER, key.encode("ascii"))
+        self.stats["restored"] += 1
+        return {"key": key, **counts}
+
+    def store_node_modules(self, app_root: Path) -> Optional[Dict[str, Any]]:
+        """Copy the app's installed node_modules into the store, read-only, unless its hash is cached.
+
+        Files are reflinked or copied rather than hardlinked, so later edits
+        to the app's own node_modules never reach the store.
+        """
+        app_root = Path(app_root)
+        key = self.node_key(app_root)
+        modules = app_root / "node_modules"
+        if not key or not modules.is_dir():
+            return None
+        entry = self._node_entry(key)
+        with self._lock:
+            if (entry / COMPLETE_MARKER).exists():
+                return None
+            # Build the entry beside its final name, then rename, so readers never see a partial tree
+            staging = entry.with_name(f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                counts = link_tree(modules, staging / "node_modules", hardlink=False, read_only=True)
+                (staging / COMPLETE_MARKER).write_text(key, encoding="ascii")
+                shutil.rmtree(entry, ignore_errors=True)
+                os.replace(staging, entry)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+                if (entry / COMPLETE_MARKER).exists():
+                    return None  # another process stored it first
+                raise
+        write_atomic(modules / COMPLETE_MARKER, key.encode("ascii"))
+        self.stats["stored"] += 1
+        return {"key": key, **counts}
+
+    def node_modules_current(self, app_root: Path) -> bool:
+        """True if the app's node_modules came from (or was stored as) the entry for its current dependencies."""
+        key = self.node_key(app_root)
+        try:
+            return bool(key) and (Path(app_root) / "node_modules" / COMPLETE_MARKER).read_text(encoding="ascii") == key
+        except OSError:
+            return False
+
+    def rewrite_command(self, command: str, cwd: Optional[str]) -> CommandRewrite:
+        """Point install commands at the shared caches; recognise commands a template or restore makes redundant."""
+        env: Dict[str, str] = {}
+        segments = _SEPARATORS.split(command.strip())
+        if len(segments) == 1:
+            words = segments[0].split()
+            created = self._template_for(words)
+            if created:
+                template, target = created
+                self.stats["templates"] += 1
+                return CommandRewrite(command, env, "template", f"served from local template {template}",
+                                      template=template, target=target)
+            if cwd and self._is_bare_node_install(words) and self.node_modules_current(Path(cwd)):
+                self.stats["skipped_installs"] += 1
+                return CommandRewrite(command, env, "skip", "node_modules restored from the dependency cache")
+        installs = False
+        out: List[str] = []
+        for seg in segments:
+            if _SEPARATORS.fullmatch(seg) or not seg.strip():
+                out.append(seg)
+                continue
+            words = seg.split()
+            if self._is_node_install(words):
+                installs = True
+                env["npm_config_cache"] = str(self.npm_cache)
+                env["YARN_CACHE_FOLDER"] = str(self.npm_cache / "yarn")
+                if self.offline and words[0] == "npm":
+                    seg += "".join(f" {flag}" for flag in ("--prefer-offline", "--no-audit", "--no-fund") if flag not in words)
+                elif self.offline and words[0] in ("yarn", "pnpm") and "--prefer-offline" not in words:
+                    seg += " --prefer-offline"
+            elif self._is_pip_install(words):
+                env["PIP_CACHE_DIR"] = str(self.pip_cache)
+                env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
+                if self.offline and self.wheelhouse.is_dir() and "--find-links" not in seg:
+                    seg += f" --find-links {self.wheelhouse}"
+            out.append(seg)
+        rewritten = "".join(out)
+        if env:
+            self.stats["rewritten"] += 1
+        return CommandRewrite(rewritten, env, "run", "using the shared package cache" if env else "", installs=installs)
+
+    @staticmethod
+    def _template_for(words: List[str]):
+        if len(words) < 2 or words[0] not in ("npx", "npm", "yarn", "pnpm"):
+            return None
+        rest = words[1:]
+        if words[0] == "npm" and rest[:2] in (["init", "expo-app"], ["create", "expo-app"]):
+            rest = ["create-expo-app"] + rest[2:]
+        elif words[0] in ("yarn", "pnpm") and rest and rest[0] == "create":
+            rest = [f"create-{rest[1]}"] + rest[2:] if len(rest) > 1 else rest
+        rest = [w for w in rest if w not in ("-y", "--yes")]
+        if not rest:
+            return None
+        tool = rest[0].split("@", 1)[0] if not rest[0].startswith("@") else rest[0]
+        template = CREATE_COMMAND_TEMPLATES.get(tool)
+        if not template or resolve_template(template) is None:
+            return None
+        args = rest[1:]
+        # Only plain invocations: a target directory and no options that change the result
+        if any(a.startswith("-") for a in args) or len(args) > 1:
+            return None
+        return template, (args[0] if args else ".")
+
+    @staticmethod
+    def _is_node_install(words: List[str]) -> bool:
+        if not words:
+            return False
+        if words[0] == "npm":
+            return len(words) > 1 and words[1] in ("install", "i", "ci", "add")
+        if words[0] in ("yarn", "pnpm"):
+            return len(words) == 1 or words[1] in ("install", "add", "i")
+        return False
+
+    @staticmethod
+    def _is_bare_node_install(words: List[str]) -> bool:
+        if words[:1] == ["npm"]:
+            return words[1:] in (["install"], ["i"], ["ci"])
+        return words in (["yarn"], ["yarn", "install"], ["pnpm", "install"], ["pnpm", "i"])
+
+    @staticmethod
+    def _is_pip_install(words: List[str]) -> bool:
+        if words[:1] in (["pip"], ["pip3"]):
+            return words[1:2] == ["install"]
+        return len(words) > 3 and words[0].startswith("python") and words[1:4] == ["-m", "pip", "install"]
@@ -0,0 +1,691 @@
+"""
+Executor Service
+
+Runs ExecutorAgent work (executions and quick edits) and workspace snapshot
+operations outside the API event loop, in a bounded pool of worker processes
+fed by a persisted queue (executor_jobs, migration 007_executor_jobs.sql):
+- at most EXECUTOR_WORKERS jobs run at once, each in a worker process
+  (spawned on demand and reused for later jobs),
+- jobs that share an app directory never run at the same time (lock_key lists
+  every app the job writes: the plan's, its missions' and its steps'),
+- a queued job can be cancelled outright; a running one is cancelled inside
+  its worker (which kills its terminal command), and the worker is terminated
+  if the job has not stopped after EXECUTOR_CANCEL_GRACE_SECONDS,
+- on shutdown the service stops claiming jobs and waits up to
+  EXECUTOR_DRAIN_SECONDS for running ones; jobs still running are interrupted
+  and queued again, and resume from their completed steps on the next start,
+- running jobs carry a heartbeat; jobs orphaned by a crashed service are
+  queued again (up to EXECUTOR_JOB_MAX_ATTEMPTS attempts).
+
+Progress events and terminal output of a job are forwarded from its worker to
+the service process, so the board and terminal WebSockets keep working when
+the service is embedded in the API server (EXECUTOR_SERVICE_EMBEDDED). Run it
+on its own with:
+
+    python -m JarvisOne.workers.executor_service [--workers N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import (
+    APPS_ROOT, EXECUTOR_WORKERS, EXECUTOR_DRAIN_SECONDS, EXECUTOR_CANCEL_GRACE_SECONDS, EXECUTOR_JOB_MAX_ATTEMPTS,
+    WORKSPACE_SNAPSHOT_MODE,
+)
+from ..database import database
+from ..database.database import ensure_migration, get_connection
+from ..agents.executor_agent import ExecutorAgent
+from ..services.executor_events import executor_events
+from ..services.snapshots import SnapshotError, SnapshotStore
+from ..services.output_stream import terminal_output_hub
+from ..services.action_log import action_logger
+from ..services.telemetry import llm_call_writer
+
+EXECUTOR_JOBS_MIGRATION = "007_executor_jobs.sql"
+JOB_KINDS = ("execute", "quick_edit", "snapshot")
+SNAPSHOT_ACTIONS = ("create", "rollback", "delete", "gc")
+FINISHED = ("completed", "failed", "cancelled")
+HEARTBEAT_SECONDS = 5.0
+# A running job whose owner has not refreshed its heartbeat for this long was orphaned by a crash
+STALE_SECONDS = 60.0
+POLL_SECONDS = 1.0
+
+
+# ---------------- Job queue (usable from any process) ----------------
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _job_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    for field in ("params", "result"):
+        if job.get(field):
+            try:
+                job[field] = json.loads(job[field])
+            except ValueError:
+                pass
+    job["cancel_requested"] = bool(job.get("cancel_requested"))
+    return job
+
+
+def lock_key_for(strategy_id: str, app_names: Iterable[Optional[str]]) -> str:
+    """Comma-separated keys of the directories a job writes; jobs sharing a key never run together.
+
+    A strategy without any app name locks itself.
+    """
+    keys = list(dict.fromkeys(f"app:{name}" for name in app_names if name))
+    return ",".join(keys) if keys else f"strategy:{strategy_id}"
+
+
+def enqueue_job(kind: str, strategy_id: str, params: Optional[Dict[str, Any]] = None,
+                app_name: Optional[str] = None, app_names: Iterable[str] = ()) -> Dict[str, Any]:
+    """Queue a job for app_name (its main app); app_names are the other app directories it writes."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"unknown executor job kind {kind!r}")
+    ensure_migration(EXECUTOR_JOBS_MIGRATION)
+    job_id = uuid.uuid4().hex
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO executor_jobs (job_id, kind, strategy_id, app_name, lock_key, params)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (job_id, kind, strategy_id, app_name, lock_key_for(strategy_id, [app_name, *app_names]),
+             json.dumps(params or {})),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """A job, with its position in the queue while it is queued (0 = next)."""
+    ensure_migration(EXECUTOR_JOBS_MIGRATION)
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT rowid, * FROM executor_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = _job_from_row(row)
+        if job["status"] == "queued":
+            job["position"] = conn.execute(
+                "SELECT COUNT(*) FROM executor_jobs WHERE status = 'queued' AND rowid < ?", (row["rowid"],)
+            ).fetchone()[0]
+        job.pop("rowid", None)
+        return job
+    finally:
+        conn.close()
+
+
+def list_jobs(status: Optional[str] = None, strategy_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent jobs first."""
+    ensure_migration(EXECUTOR_JOBS_MIGRATION)
+    clauses, args = [], []
+    if status:
+        clauses.append("status = ?")
+        args.append(status)
+    if strategy_id:
+        clauses.append("strategy_id = ?")
+        args.append(strategy_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT * FROM executor_jobs {where} ORDER BY rowid DESC LIMIT ?", (*args, max(1, min(limit, 500)))
+        ).fetchall()
+        return [_job_from_row(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def request_cancel(job_id: str) -> Optional[str]:
+    """Cancel a queued job, or flag a running one for its owner. Returns the job's status afterwards."""
+    ensure_migration(EXECUTOR_JOBS_MIGRATION)
+    conn = get_connection()
+    try:
+        cur = conn.execute(
+            "UPDATE executor_jobs SET status = 'cancelled', finished_at = ?, error = 'cancelled' "
+            "WHERE job_id = ? AND status = 'queued'",
+            (_now(), job_id),
+        )
+        if not cur.rowcount:
+            conn.execute("UPDATE executor_jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,))
+        conn.commit()
+        row = conn.execute("SELECT status FROM executor_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+    finally:
+        conn.close()
+
+
+# ---------------- Worker process ----------------
+
+async def _run_execute(job: Dict[str, Any]) -> Dict[str, Any]:
+    params = job.get("params") or {}
+    # A job that was interrupted (shutdown or crash) continues from the steps it completed
+    resume = bool(params.get("resume")) or int(job.get("attempts") or 1) > 1
+    agent = ExecutorAgent(strategy_id=job["strategy_id"], force_regenerate=bool(params.get("force")), resume=resume,
+                          user_id=params.get("user_id"))
+    await agent.execute()
+    report = agent.report or {}
+    return {"ok": report.get("ok", True), "error": report.get("error"), "resume": resume,
+            "report": agent.report, "snapshots": agent.snapshots}
+
+
+async def _run_quick_edit(job: Dict[str, Any]) -> Dict[str, Any]:
+    params = job.get("params") or {}
+    agent = ExecutorAgent(strategy_id=job["strategy_id"], user_id=params.get("user_id"))
+    try:
+        return await agent._execute_file_editor({
+            "file_path": params.get("file_path"),
+            "instruction": params.get("instruction"),
+            "app_name": job.get("app_name") or ExecutorAgent.app_name_for(job["strategy_id"]),
+            "model": params.get("model") or "llama-3.1-8b-instant",
+        })
+    finally:
+        await agent.aclose()
+
+
+async def _run_snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Create, roll back, delete or gc snapshots of job['app_name'] while no execution writes that app."""
+    params = job.get("params") or {}
+    action = params.get("action")
+    store = SnapshotStore(Path(APPS_ROOT) / job["app_name"], WORKSPACE_SNAPSHOT_MODE)
+    try:
+        if action == "create":
+            return await asyncio.to_thread(store.create, params.get("label") or "manual")
+        if action == "delete":
+            await asyncio.to_thread(store.delete, params.get("snapshot_id"))
+            return {"deleted": params.get("snapshot_id")}
+        if action == "gc":
+            return {"removed": await asyncio.to_thread(store.gc, int(params.get("keep") or 0),
+                                                       float(params.get("max_age_days") or 0))}
+        if action != "rollback":
+            return {"ok": False, "error": f"unknown snapshot action {action!r}"}
+        result = await asyncio.to_thread(store.rollback, params.get("snapshot_id"))
+    except SnapshotError as e:
+        return {"ok": False, "error": str(e), "not_found": True}
+    # Steps of the snapshot's strategy that ran after it are undone on disk; run them again on resume
+    result["steps_reset"] = 0
+    if result.get("strategy_id") and result.get("created_ts"):
+        result["steps_reset"] = await asyncio.to_thread(
+            ExecutorAgent.reset_steps_since, result["strategy_id"], result["created_ts"])
+    return result
+
+
+_JOB_RUNNERS = {"execute": _run_execute, "quick_edit": _run_quick_edit, "snapshot": _run_snapshot}
+
+
+async def _run_job(job: Dict[str, Any], current: Dict[str, Any]) -> Tuple[str, Any, Optional[str]]:
+    current["job"] = (job["job_id"], asyncio.get_running_loop(), asyncio.current_task())
+    try:
+        result = await _JOB_RUNNERS[job["kind"]](job)
+    except asyncio.CancelledError:
+        return "cancelled", None, "cancelled"
+    except Exception as e:
+        return "failed", None, str(e) or type(e).__name__
+    finally:
+        current.pop("job", None)
+    if isinstance(result, dict) and result.get("ok") is False:
+        return "failed", result, result.get("error") or "failed"
+    return "completed", result, None
+
+
+def _worker_main(conn, db_path: str) -> None:
+    """Entry point of a worker process: runs the jobs the service sends, one at a time."""
+    database.DB_PATH = db_path
+    # Ctrl+C reaches the whole process group; the service decides when a job stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    send_lock = threading.Lock()
+
+    def send(msg) -> None:
+        with send_lock:
+            try:
+                conn.send(msg)
+            except (OSError, ValueError):
+                pass  # the service went away; the reader below stops the job
+
+    terminal_output_hub.add_listener(lambda key, event: send(("event", "terminal", key, event)))
+    executor_events.hub.add_listener(lambda key, event: send(("event", "executor", key, event)))
+
+    inbox: "queue.Queue[tuple]" = queue.Queue()
+    current: Dict[str, Any] = {}
+
+    def read() -> None:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                msg = ("stop", "service connection lost")
+            running = current.get("job")
+            # ("stop", None) lets the current job finish; a lost service cancels it
+            if running and ((msg[0] == "cancel" and msg[1] == running[0]) or (msg[0] == "stop" and msg[1])):
+                running[1].call_soon_threadsafe(running[2].cancel)
+            if msg[0] == "cancel":
+                continue
+            inbox.put(msg)
+            if msg[0] == "stop":
+                return
+
+    threading.Thread(target=read, name="executor-worker-inbox", daemon=True).start()
+    send(("ready", os.getpid()))
+    while True:
+        msg = inbox.get()
+        if msg[0] == "stop":
+            break
+        job = msg[1]
+        status, result, error = asyncio.run(_run_job(job, current))
+        send(("done", job["job_id"], status, json.dumps(result, default=str) if result is not None else None, error))
+    # Worker processes exit without running atexit handlers; write out what is still queued
+    for writer in (action_logger.writer, llm_call_writer):
+        writer.close()
+
+
+# ---------------- Service ----------------
+
+class _Worker:
+    """Service-side handle of a worker process; a reader thread hands its messages to the service's loop."""
+
+    def __init__(self, service: "ExecutorService"):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, database.DB_PATH),
+                                   name="jarvis-executor-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job_id: Optional[str] = None
+        self.cancelling = False
+        self._send_lock = threading.Lock()
+        self._service = service
+        threading.Thread(target=self._read, name=f"executor-worker-{self.process.pid}", daemon=True).start()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def send(self, msg) -> bool:
+        with self._send_lock:
+            try:
+                self.conn.send(msg)
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def _read(self) -> None:
+        while True:
+            try:
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                msg = ("exit",)
+            try:
+                self._service._loop.call_soon_threadsafe(self._service._on_message, self, msg)
+            except RuntimeError:
+                return  # the service's loop is closed
+            if msg[0] == "exit":
+                return
+
+
+class ExecutorService:
+    def __init__(self, workers: int = EXECUTOR_WORKERS, drain_seconds: float = EXECUTOR_DRAIN_SECONDS,
+                 cancel_grace_seconds: float = EXECUTOR_CANCEL_GRACE_SECONDS,
+                 max_attempts: int = EXECUTOR_JOB_MAX_ATTEMPTS):
+        self.max_workers = max(1, workers)
+        self.drain_seconds = drain_seconds
+        self.cancel_grace_seconds = cancel_grace_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._workers: List[_Worker] = []
+        self._running: Dict[str, _Worker] = {}
+        self._interrupting: Set[str] = set()
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._records: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.accepting = False
+        self.stats = {"completed": 0, "failed": 0, "cancelled": 0, "requeued": 0}
+
+    # ---------------- Lifecycle ----------------
+
+    async def start(self) -> None:
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.accepting = True
+        requeued = await asyncio.to_thread(self._requeue_stale)
+        if requeued:
+            print(f"[ExecutorService] Queued {requeued} interrupted job(s) again")
+        self._task = asyncio.create_task(self._dispatch_loop())
+        print(f"[ExecutorService] Started with up to {self.max_workers} worker process(es)")
+
+    async def stop(self, drain_seconds: Optional[float] = None) -> None:
+        """Stop claiming jobs, let running ones finish (or interrupt and requeue them), then stop the workers."""
+        if not self._task:
+            return
+        self.accepting = False
+        self._wake.set()
+        await self._task
+        self._task = None
+        timeout = self.drain_seconds if drain_seconds is None else drain_seconds
+        if self._running:
+            print(f"[ExecutorService] Draining {len(self._running)} running job(s) (up to {timeout:.0f}s)")
+            await self._wait_idle(timeout)
+        if self._running:
+            print(f"[ExecutorService] Interrupting {len(self._running)} job(s); they will be queued again")
+            for job_id, worker in list(self._running.items()):
+                if not worker.cancelling:  # jobs cancelled by a user stay cancelled
+                    self._interrupting.add(job_id)
+                    self._cancel_running(job_id)
+            await self._wait_idle(self.cancel_grace_seconds + 5)
+        if self._records:
+            await asyncio.gather(*self._records, return_exceptions=True)
+        for worker in list(self._workers):
+            worker.send(("stop", None))
+        for worker in list(self._workers):
+            await asyncio.to_thread(worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._workers.clear()
+        print("[ExecutorService] Stopped")
+
+    async def _wait_idle(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    # ---------------- Submitting and waiting ----------------
+
+    async def submit(self, kind: str, strategy_id: str, params: Optional[Dict[str, Any]] = None,
+                     app_name: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job; it runs when a worker is free and no other job holds any of its app directories.
+
+        Without app_name, the job locks every app the strategy's plan writes (missions may have their own).
+        The strategy's owner is recorded in params["user_id"] so the job is charged to their daily budget.
+        """
+        params = dict(params or {})
+        if strategy_id and params.get("user_id") is None:
+            params["user_id"] = await asyncio.to_thread(ExecutorAgent.user_id_for, strategy_id)
+        app_names: List[str] = []
+        if app_name is None:
+            try:
+                app_names = await asyncio.to_thread(ExecutorAgent.app_names_for, strategy_id)
+            except sqlite3.Error:
+                app_names = []
+            app_name = app_names[0] if app_names else None
+        job = await asyncio.to_thread(enqueue_job, kind, strategy_id, params, app_name, app_names)
+        if self._wake:
+            self._wake.set()
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once it finished, or as it is when the timeout expires."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(get_job, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            # Jobs run by this service resolve the future; others are polled
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(job_id, []).append(future)
+            try:
+                await asyncio.wait_for(future, min(remaining, POLL_SECONDS * 2))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                waiters = self._waiters.get(job_id)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiters[job_id]
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        status = await asyncio.to_thread(request_cancel, job_id)
+        if status == "running" and job_id in self._running:
+            self._cancel_running(job_id)
+        # A job running in another service process is cancelled by its owner on the next heartbeat
+        return await asyncio.to_thread(get_job, job_id)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "accepting": self.accepting,
+            "max_workers": self.max_workers,
+            "workers": [{"pid": w.pid, "alive": w.process.is_alive(), "job_id": w.job_id} for w in self._workers],
+            "running": len(self._running),
+            "stats": dict(self.stats),
+        }
+
+    # ---------------- Dispatching ----------------
+
+    async def _dispatch_loop(self) -> None:
+        last_beat = 0.0
+        while self.accepting:
+            self._wake.clear()
+            try:
+                if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                    last_beat = time.monotonic()
+                    to_cancel = await asyncio.to_thread(self._heartbeat)
+                    for job_id in to_cancel:
+                        self._cancel_running(job_id)
+                while self.accepting and len(self._running) < self.max_workers:
+                    job = await asyncio.to_thread(self._claim_next)
+                    if job is None:
+                        break
+                    self._start_job(job)
+            except Exception as e:
+                print(f"[ExecutorService] Dispatch error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Oldest queued job none of whose lock keys is held by a running job, marked running by this service."""
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, lock_key FROM executor_jobs WHERE status = 'queued' ORDER BY rowid LIMIT 100"
+            ).fetchall()
+            for row in rows:
+                keys = row["lock_key"].split(",")
+                held = " OR ".join("instr(',' || lock_key || ',', ?) > 0" for _ in keys)
+                cur = conn.execute(
+                    f"""
+                    UPDATE executor_jobs
+                    SET status = 'running', owner = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ?,
+                        finished_at = NULL, error = NULL
+                    WHERE job_id = ? AND status = 'queued'
+                      AND NOT EXISTS (SELECT 1 FROM executor_jobs WHERE status = 'running' AND ({held}))
+                    """,
+                    (self.owner, _now(), time.time(), row["job_id"], *(f",{key}," for key in keys)),
+                )
+                conn.commit()
+                if cur.rowcount:
+                    return _job_from_row(conn.execute("SELECT * FROM executor_jobs WHERE job_id = ?",
+                                                      (row["job_id"],)).fetchone())
+            return None
+        finally:
+            conn.close()
+
+    def _heartbeat(self) -> List[str]:
+        """Refresh this service's running jobs, requeue orphaned ones; returns jobs flagged for cancellation."""
+        self._requeue_stale()
+        running = {job_id: worker.pid for job_id, worker in list(self._running.items())}
+        if not running:
+            return []
+        conn = get_connection()
+        try:
+            now = time.time()
+            conn.executemany(
+                "UPDATE executor_jobs SET heartbeat_at = ?, worker_pid = ? WHERE job_id = ? AND owner = ?",
+                [(now, pid, job_id, self.owner) for job_id, pid in running.items()],
+            )
+            conn.commit()
+            marks = ",".join("?" * len(running))
+            rows = conn.execute(
+                f"SELECT job_id FROM executor_jobs WHERE cancel_requested = 1 AND job_id IN ({marks})", tuple(running)
+            ).fetchall()
+            return [row["job_id"] for row in rows]
+        finally:
+            conn.close()
+
+    def _requeue_stale(self) -> int:
+        ensure_migration(EXECUTOR_JOBS_MIGRATION)
+        conn = get_connection()
+        try:
+            cur = conn.execute(
+                """
+                UPDATE executor_jobs
+                SET status = CASE WHEN cancel_requested = 1 THEN 'cancelled'
+                                  WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                    error = 'interrupted: the executor service running it stopped responding',
+                    finished_at = CASE WHEN cancel_requested = 1 OR attempts >= ? THEN ? ELSE NULL END,
+                    owner = NULL, worker_pid = NULL
+                WHERE status = 'running' AND owner IS NOT ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+                """,
+                (self.max_attempts, self.max_attempts, _now(), self.owner, time.time() - STALE_SECONDS),
+            )
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    def _start_job(self, job: Dict[str, Any]) -> None:
+        worker = next((w for w in self._workers if w.job_id is None and w.process.is_alive()), None)
+        if worker is None:
+            worker = _Worker(self)
+            self._workers.append(worker)
+        worker.job_id, worker.cancelling = job["job_id"], False
+        self._running[job["job_id"]] = worker
+        print(f"[ExecutorService] {job['kind']} job {job['job_id'][:8]} for {job['strategy_id']} "
+              f"({job['lock_key']}) started in worker {worker.pid}")
+        if not worker.send(("job", job)):
+            self._on_message(worker, ("exit",))
+
+    def _cancel_running(self, job_id: str) -> None:
+        worker = self._running.get(job_id)
+        if worker is None or worker.cancelling:
+            return
+        worker.cancelling = True
+        worker.send(("cancel", job_id))
+        self._loop.call_later(self.cancel_grace_seconds, self._terminate_if_stuck, worker, job_id)
+
+    def _terminate_if_stuck(self, worker: _Worker, job_id: str) -> None:
+        if worker.job_id == job_id and worker.process.is_alive():
+            print(f"[ExecutorService] Job {job_id[:8]} did not stop within {self.cancel_grace_seconds:.0f}s; "
+                  f"terminating worker {worker.pid}")
+            worker.process.terminate()
+
+    # ---------------- Worker messages (on the service's loop) ----------------
+
+    def _on_message(self, worker: _Worker, msg: tuple) -> None:
+        kind = msg[0]
+        if kind == "event":
+            _, channel, key, payload = msg
+            if channel == "terminal":
+                terminal_output_hub.publish(key, payload)
+            else:
+                try:
+                    executor_events.apply(payload)
+                except Exception as e:
+                    print(f"[ExecutorService] Bad executor event from worker {worker.pid}: {e}")
+        elif kind == "done":
+            _, job_id, status, result, error = msg
+            self._finish(worker, job_id, status, result, error)
+        elif kind == "exit":
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if worker.job_id:
+                code = worker.process.exitcode
+                status = "cancelled" if worker.cancelling else "failed"
+                self._finish(worker, worker.job_id, status, None,
+                             "cancelled" if worker.cancelling else f"worker process exited (code {code})")
+
+    def _finish(self, worker: _Worker, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+        worker.job_id, worker.cancelling = None, False
+        self._running.pop(job_id, None)
+        requeue = job_id in self._interrupting and status == "cancelled"
+        self._interrupting.discard(job_id)
+        self.stats["requeued" if requeue else status] = self.stats.get("requeued" if requeue else status, 0) + 1
+        print(f"[ExecutorService] Job {job_id[:8]} " + ("interrupted, queued again" if requeue else status)
+              + (f": {error}" if error and not requeue else ""))
+        task = asyncio.ensure_future(self._record(job_id, status, result, error, requeue))
+        self._records.add(task)
+        task.add_done_callback(self._records.discard)
+        if self._wake:
+            self._wake.set()
+
+    async def _record(self, job_id: str, status: str, result: Optional[str], error: Optional[str], requeue: bool) -> None:
+        try:
+            await asyncio.to_thread(self._store_outcome, job_id, status, result, error, requeue)
+        except Exception as e:
+            print(f"[ExecutorService] Failed to record job {job_id}: {e}")
+        for future in self._waiters.pop(job_id, []):
+            if not future.done():
+                future.set_result(None)
+
+    def _store_outcome(self, job_id: str, status: str, result: Optional[str], error: Optional[str], requeue: bool) -> None:
+        conn = get_connection()
+        try:
+            if requeue:
+                conn.execute(
+                    "UPDATE executor_jobs SET status = 'queued', owner = NULL, worker_pid = NULL, "
+                    "error = 'interrupted by shutdown' WHERE job_id = ?",
+                    (job_id,),
+                )
+            else:
+                conn.execute(
+                    "UPDATE executor_jobs SET status = ?, result = ?, error = ?, finished_at = ?, worker_pid = NULL "
+                    "WHERE job_id = ?",
+                    (status, result, error, _now(), job_id),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+executor_service = ExecutorService()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the executor service on its own.")
+    parser.add_argument("--workers", type=int, default=EXECUTOR_WORKERS, help="worker processes")
+    parser.add_argument("--drain-seconds", type=float, default=EXECUTOR_DRAIN_SECONDS,
+                        help="how long running jobs may take to finish on shutdown")
+    args = parser.parse_args()
+    service = ExecutorService(workers=args.workers, drain_seconds=args.drain_seconds)
+
+    async def run():
+        await service.start()
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stopping.set))
+        await stopping.wait()
+        await service.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()